@@ -2,4 +2,4 @@ from flask import Flask
 
 app = Flask(__name__)
 
-from app import routes
\ No newline at end of file
+from app import routes, server
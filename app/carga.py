@@ -0,0 +1,446 @@
+"""
+Gerador de carga local para a API de simulação.
+
+Sobe o app Flask num processo separado (ou usa --url de um servidor já
+em execução) e simula muitos clientes concorrentes com asyncio, cada um
+registando um agente e alternando /movimento, /status/<id> e /actualizar.
+Os pedidos partilham um pool de conexões HTTP/1.1 persistentes. No fim
+mostra, por endpoint, a vazão e as latências p50/p95/p99, e quantos
+pedidos reaproveitaram uma conexão já aberta.
+
+O servidor local usa o wsgiref em HTTP/1.1 com keep-alive, porque o de
+desenvolvimento do Werkzeug fecha cada conexão e o pool nunca seria
+reaproveitado; com --url as conexões seguem o que o servidor permitir.
+
+Uso:
+    python -m app.carga --clientes 50 --conexoes 20 --duracao 10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import multiprocessing
+import random
+import time
+from http.server import BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit
+from wsgiref.simple_server import ServerHandler, WSGIRequestHandler, WSGIServer
+
+import numpy as np
+
+from entidades.Tabelas import formatar_tabela
+
+# Peso de cada ação no ciclo de um cliente simulado
+PESOS_PADRAO = {'movimento': 5, 'status': 2, 'actualizar': 3}
+
+# Vizinhos para onde um agente pode andar
+DESLOCAMENTOS = ((0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class Resposta:
+    def __init__(self, status, cabecalhos, corpo, manter):
+        self.status = status
+        self.cabecalhos = cabecalhos
+        self.corpo = corpo
+        self.manter = manter  # A conexão pode voltar ao pool
+
+    def json(self):
+        return json.loads(self.corpo)
+
+
+class PoolConexoes:
+    """
+    Pool de conexões HTTP/1.1 keep-alive para um único servidor.
+
+    No máximo max_conexoes pedidos correm ao mesmo tempo; os restantes
+    esperam por uma conexão livre em vez de abrir novas.
+    """
+
+    def __init__(self, host, porta, max_conexoes=20):
+        self.host = host
+        self.porta = porta
+        self.semaforo = asyncio.Semaphore(max_conexoes)
+        self.livres = []
+        self.abertas = 0  # Total de conexões abertas durante o teste
+        self.pedidos = 0  # Total de pedidos enviados (incluindo repetições)
+
+    def taxa_reaproveitamento(self):
+        """
+        Fração dos pedidos enviados numa conexão já aberta.
+        """
+        return 1 - self.abertas / self.pedidos if self.pedidos else 0.0
+
+    async def abrir(self):
+        self.abertas += 1
+        return await asyncio.open_connection(self.host, self.porta)
+
+    async def pedido(self, metodo, caminho, corpo=None, cabecalhos=None):
+        """
+        Envia um pedido e retorna a Resposta.
+
+        Uma conexão reaproveitada que o servidor já fechou é trocada por
+        uma nova e o pedido é repetido uma vez.
+        """
+        async with self.semaforo:
+            for tentativa in range(2):
+                reaproveitada = bool(self.livres)
+                conexao = self.livres.pop() if reaproveitada else await self.abrir()
+                self.pedidos += 1
+                try:
+                    resposta = await self.enviar(conexao, metodo, caminho, corpo, cabecalhos)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conexao[1].close()
+                    if reaproveitada and tentativa == 0:
+                        continue
+                    raise
+                except BaseException:
+                    conexao[1].close()
+                    raise
+
+                if resposta.manter:
+                    self.livres.append(conexao)
+                else:
+                    conexao[1].close()
+                return resposta
+
+    async def enviar(self, conexao, metodo, caminho, corpo, cabecalhos):
+        leitor, escritor = conexao
+        dados = b'' if corpo is None else json.dumps(corpo).encode()
+        linhas = [f"{metodo} {caminho} HTTP/1.1", f"Host: {self.host}:{self.porta}",
+                  "Connection: keep-alive", f"Content-Length: {len(dados)}"]
+        if corpo is not None:
+            linhas.append("Content-Type: application/json")
+        linhas += [f"{nome}: {valor}" for nome, valor in (cabecalhos or {}).items()]
+        escritor.write(("\r\n".join(linhas) + "\r\n\r\n").encode('latin-1') + dados)
+        await escritor.drain()
+
+        linha_status = await leitor.readline()
+        if not linha_status:
+            raise ConnectionError("Conexão fechada pelo servidor")
+        versao_http, status = linha_status.split()[:2]
+
+        cabecalhos_resposta = {}
+        while True:
+            linha = await leitor.readline()
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, valor = linha.decode('latin-1').split(':', 1)
+            cabecalhos_resposta[nome.strip().lower()] = valor.strip()
+
+        manter = (versao_http == b'HTTP/1.1'
+                  and cabecalhos_resposta.get('connection', '').lower() != 'close')
+        if 'chunked' in cabecalhos_resposta.get('transfer-encoding', '').lower():
+            corpo_resposta = await self.ler_chunked(leitor)
+        elif 'content-length' in cabecalhos_resposta:
+            corpo_resposta = await leitor.readexactly(int(cabecalhos_resposta['content-length']))
+        elif int(status) in (204, 304):
+            corpo_resposta = b''
+        else:
+            # Sem tamanho declarado: o corpo vai até o servidor fechar a conexão
+            corpo_resposta = await leitor.read()
+            manter = False
+        return Resposta(int(status), cabecalhos_resposta, corpo_resposta, manter)
+
+    @staticmethod
+    async def ler_chunked(leitor):
+        """
+        Lê um corpo com Transfer-Encoding: chunked, incluindo os trailers,
+        deixando a conexão pronta para o próximo pedido.
+        """
+        partes = []
+        while True:
+            linha = await leitor.readline()
+            if not linha:
+                raise ConnectionError("Conexão fechada a meio de um corpo chunked")
+            tamanho = int(linha.split(b';', 1)[0].strip(), 16)
+            if tamanho == 0:
+                break
+            partes.append(await leitor.readexactly(tamanho))
+            await leitor.readexactly(2)  # CRLF no fim de cada bloco
+
+        while (await leitor.readline()) not in (b'\r\n', b'\n', b''):
+            pass  # Trailers, ignorados
+        return b''.join(partes)
+
+    def fechar(self):
+        for _, escritor in self.livres:
+            escritor.close()
+        self.livres.clear()
+
+
+class Medidas:
+    """
+    Latências e erros por endpoint.
+    """
+
+    def __init__(self):
+        self.latencias = {}
+        self.erros = {}
+
+    async def medir(self, pool, endpoint, metodo, caminho, corpo=None, cabecalhos=None):
+        """
+        Faz o pedido, registando a latência; retorna a Resposta (None em erro).
+        """
+        self.latencias.setdefault(endpoint, [])
+        self.erros.setdefault(endpoint, 0)
+        inicio = time.perf_counter()
+        try:
+            resposta = await pool.pedido(metodo, caminho, corpo, cabecalhos)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.erros[endpoint] += 1
+            return None
+        self.latencias[endpoint].append(time.perf_counter() - inicio)
+        if resposta.status >= 400:
+            self.erros[endpoint] += 1
+        return resposta
+
+    def relatorio(self, duracao):
+        """
+        Retorna uma linha por endpoint, mais a linha 'TOTAL', com vazão e
+        percentis de latência (ms).
+        """
+        grupos = [(endpoint, self.latencias[endpoint], self.erros[endpoint])
+                  for endpoint in sorted(self.latencias)]
+        grupos.append(('TOTAL', [l for _, latencias, _ in grupos for l in latencias],
+                       sum(erros for _, _, erros in grupos)))
+
+        linhas = []
+        for endpoint, latencias, erros in grupos:
+            latencias = np.array(latencias) * 1000
+            vazio = len(latencias) == 0
+            p50, p95, p99 = (0.0, 0.0, 0.0) if vazio else np.percentile(latencias, (50, 95, 99))
+            linhas.append({
+                'endpoint': endpoint,
+                'pedidos': len(latencias),
+                'erros': erros,
+                'pedidos_s': len(latencias) / duracao,
+                'p50_ms': p50,
+                'p95_ms': p95,
+                'p99_ms': p99,
+                'max_ms': 0.0 if vazio else latencias.max()
+            })
+        return linhas
+
+
+async def cliente_simulado(pool, medidas, prefixo, tamanho, fim, pesos, rng):
+    """
+    Um cliente: regista um agente e alterna ações até `fim` (perf_counter).
+    Quando o agente morre, regista outro.
+    """
+    acoes, pesos = list(pesos), list(pesos.values())
+    agente_id = None
+    x = y = versao = 0
+
+    while time.perf_counter() < fim:
+        if agente_id is None:
+            x, y = rng.randrange(tamanho), rng.randrange(tamanho)
+            resposta = await medidas.medir(pool, 'POST /registrar', 'POST',
+                                           f"{prefixo}/registrar", {'x': x, 'y': y})
+            if resposta is None or resposta.status != 200:
+                continue
+            agente_id = resposta.json()['id']
+            continue
+
+        acao = rng.choices(acoes, pesos)[0]
+        if acao == 'movimento':
+            dx, dy = rng.choice(DESLOCAMENTOS)
+            x, y = min(max(x + dx, 0), tamanho - 1), min(max(y + dy, 0), tamanho - 1)
+            resposta = await medidas.medir(pool, 'POST /movimento', 'POST', f"{prefixo}/movimento",
+                                           {'id': agente_id, 'x': x, 'y': y})
+            if resposta is not None and resposta.status == 200 and resposta.json().get('status') == 'morto':
+                agente_id = None
+        elif acao == 'status':
+            await medidas.medir(pool, 'GET /status/<id>', 'GET', f"{prefixo}/status/{agente_id}")
+        else:
+            # Como um painel: pede só o que mudou desde a última versão
+            resposta = await medidas.medir(pool, 'GET /actualizar', 'GET',
+                                           f"{prefixo}/actualizar?versao={versao}&formato=bytes",
+                                           cabecalhos={'If-None-Match': f'"{versao}"'})
+            if resposta is not None and 'etag' in resposta.cabecalhos:
+                versao = int(resposta.cabecalhos['etag'].strip('W/"'))
+
+
+async def executar_carga(url, clientes=50, conexoes=20, duracao=10, tamanho=30,
+                         nova_sessao=True, pesos=None, seed=0):
+    """
+    Executa o teste de carga contra um servidor.
+
+    Args:
+        url: Endereço do servidor (ex: 'http://127.0.0.1:5000')
+        clientes: Clientes simulados concorrentes
+        conexoes: Tamanho do pool de conexões
+        duracao: Duração do teste em segundos
+        tamanho: Tamanho do grid da sessão criada para o teste
+        nova_sessao: Se True, usa uma sessão nova (removida no fim);
+                     senão usa a sessão padrão
+        pesos: Peso de cada ação (padrão: PESOS_PADRAO)
+        seed: Seed dos clientes simulados
+
+    Returns:
+        dict: {'linhas': relatório por endpoint (a última é 'TOTAL'),
+               'duracao', 'pedidos', 'conexoes_abertas', 'reaproveitamento'}
+
+    Raises:
+        RuntimeError: Se o servidor não criar a sessão de teste
+    """
+    endereco = urlsplit(url)
+    pool = PoolConexoes(endereco.hostname, endereco.port or 80, conexoes)
+    medidas = Medidas()
+
+    try:
+        if nova_sessao:
+            resposta = await pool.pedido('POST', '/sessoes', {'tamanho': tamanho})
+            if resposta.status != 201:
+                raise RuntimeError(f"O servidor não criou a sessão de teste "
+                                   f"(HTTP {resposta.status}): {descrever_erro(resposta)}")
+            sessao_id = resposta.json()['id']
+            prefixo = f"/sessoes/{sessao_id}"
+        else:
+            sessao_id, prefixo = None, ''
+            resposta = await pool.pedido('GET', '/sessoes/padrao')
+            if resposta.status != 200:
+                raise RuntimeError(f"Sessão padrão indisponível "
+                                   f"(HTTP {resposta.status}): {descrever_erro(resposta)}")
+            tamanho = resposta.json()['tamanho']
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            cliente_simulado(pool, medidas, prefixo, tamanho, inicio + duracao,
+                             pesos or PESOS_PADRAO, random.Random(seed + i))
+            for i in range(clientes)
+        ))
+        decorrido = time.perf_counter() - inicio
+
+        if sessao_id is not None:
+            await pool.pedido('DELETE', prefixo)
+    finally:
+        pool.fechar()
+
+    return {'linhas': medidas.relatorio(decorrido), 'duracao': decorrido,
+            'pedidos': pool.pedidos, 'conexoes_abertas': pool.abertas,
+            'reaproveitamento': pool.taxa_reaproveitamento()}
+
+
+def descrever_erro(resposta):
+    """
+    Mensagem de erro de uma resposta da API ({"erro": ...}) ou o corpo em texto.
+    """
+    try:
+        return resposta.json()['erro']
+    except (ValueError, KeyError, TypeError):
+        return resposta.corpo.decode('utf-8', 'replace').strip() or "sem detalhes"
+
+
+class _RespostaHTTP11(ServerHandler):
+    http_version = "1.1"
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        # Sem Content-Length o fim do corpo só se sabe pelo fecho da conexão
+        if 'Content-Length' not in self.headers:
+            self.headers['Connection'] = 'close'
+            self.request_handler.close_connection = True
+
+
+class _ManterConexao(WSGIRequestHandler):
+    """
+    Atende vários pedidos por conexão. O servidor de desenvolvimento do
+    Werkzeug fecha sempre a conexão, mesmo em HTTP/1.1, e assim o pool
+    nunca seria reaproveitado localmente.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    handle = BaseHTTPRequestHandler.handle
+
+    def handle_one_request(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        if not self.raw_requestline or len(self.raw_requestline) > 65536:
+            self.close_connection = True
+            return
+        if not self.parse_request():
+            return
+
+        # O corpo é lido por inteiro para a conexão ficar no início do
+        # próximo pedido, mesmo que a rota não o leia
+        corpo = io.BytesIO(self.rfile.read(int(self.headers.get('Content-Length') or 0)))
+        resposta = _RespostaHTTP11(
+            corpo, self.wfile, self.get_stderr(), self.get_environ(),
+            multithread=True,
+        )
+        resposta.request_handler = self
+        resposta.run(self.server.get_app())
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class _ServidorLocal(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def _servir(conexao, porta):
+    from app import app
+
+    servidor = _ServidorLocal(('127.0.0.1', porta), _ManterConexao)
+    servidor.set_app(app)
+    conexao.send(servidor.server_port)
+    servidor.serve_forever()
+
+
+@contextlib.contextmanager
+def servidor_local(porta=0):
+    """
+    Sobe o app Flask (app/__init__.py) num processo separado, para que o
+    gerador de carga não dispute o GIL com o servidor.
+
+    Yields:
+        str: URL do servidor
+    """
+    contexto = multiprocessing.get_context('spawn')
+    recebe, envia = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=_servir, args=(envia, porta), daemon=True)
+    processo.start()
+    try:
+        if not recebe.poll(60):
+            raise RuntimeError("O servidor local não arrancou")
+        yield f"http://127.0.0.1:{recebe.recv()}"
+    finally:
+        processo.terminate()
+        processo.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API de simulação")
+    parser.add_argument('--url', help="Servidor já em execução (padrão: sobe um local)")
+    parser.add_argument('--clientes', type=int, default=50, help="Clientes simulados")
+    parser.add_argument('--conexoes', type=int, default=20, help="Tamanho do pool de conexões")
+    parser.add_argument('--duracao', type=float, default=10, help="Duração em segundos")
+    parser.add_argument('--tamanho', type=int, default=30, help="Tamanho do grid da sessão de teste")
+    parser.add_argument('--sessao-padrao', action='store_true',
+                        help="Usa a sessão padrão em vez de criar uma nova")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as pilha:
+        url = args.url or pilha.enter_context(servidor_local())
+        try:
+            resultado = asyncio.run(executar_carga(
+                url, clientes=args.clientes, conexoes=args.conexoes, duracao=args.duracao,
+                tamanho=args.tamanho, nova_sessao=not args.sessao_padrao
+            ))
+        except RuntimeError as erro:
+            parser.exit(1, f"Erro: {erro}\n")
+        except OSError as erro:
+            parser.exit(1, f"Erro de conexão com {url}: {erro}\n")
+
+    print(formatar_tabela(resultado['linhas']))
+    print(f"\n{args.clientes} clientes, {resultado['duracao']:.1f}s, "
+          f"{resultado['pedidos']} pedidos em {resultado['conexoes_abertas']} conexões "
+          f"({resultado['reaproveitamento']:.0%} reaproveitadas)")
+
+
+if __name__ == "__main__":
+    main()
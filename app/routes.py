@@ -1,21 +1,62 @@
-from flask import render_template, jsonify
+import json
+import time
+
+from flask import render_template, request, Response
 from app import app
-from entidades.Ambiente import criar_ambiente
-from entidades.Agente import Agente
+from app.server import rota, obter_sessao
+from app.simulacao import FORMATOS
 
-#INICIALIZANDO O AMBIENTE E AGENTES
-ambiente = criar_ambiente()
-agentes = [Agente(id = i, posicao = (0, 0), ambiente = ambiente) for i in range(2)]
+# Intervalo mínimo entre dois eventos enviados ao mesmo cliente (segundos)
+INTERVALO_MINIMO = 0.05
+# Intervalo máximo: acima disto o cliente prende uma thread sem receber nada
+INTERVALO_MAXIMO = 5
+# Sem alterações, um comentário é enviado a cada KEEPALIVE segundos
+KEEPALIVE = 15
 
-@app.route("/")
-def index():
+# /sessoes/<id>/ mostra a mesma interface, a seguir o stream dessa sessão
+@rota("/")
+def index(sessao_id):
+    obter_sessao(sessao_id)
     return render_template("interface.html")
 
-@app.route("/actualizar", methods = ["GET"])
-def actualizar():
-    estado= {
-        "ambiente": ambiente.tolist(),
-        "agentes:": [{"id": a.id, "posicao": a.posicao, "vivo": a.vivo} for a in agentes]
-    }
+@rota("/stream", methods = ["GET"])
+def stream(sessao_id):
+    """
+    Server-Sent Events com as células e agentes alterados.
+
+    Cada cliente guarda apenas a última versão que recebeu. Um cliente lento
+    bloqueia o próprio envio; quando volta a receber, ganha um único delta
+    com tudo o que mudou desde essa versão (cada célula uma vez, com o
+    valor atual). Nada fica acumulado em fila por cliente. O stream termina
+    quando a sessão é removida.
+    """
+    simulacao = obter_sessao(sessao_id)
+    versao = request.args.get("versao", type = int)
+    if versao is None:
+        # Reconexão do EventSource: continua a partir do último evento recebido
+        versao = request.headers.get("Last-Event-ID", 0, type = int)
+    if not 0 <= versao <= simulacao.versao:
+        # Versão de outro mundo (servidor reiniciado, outra sessão): como em
+        # Simulacao.estado(), recomeça com o estado completo
+        versao = 0
+    # A ordem dos argumentos faz um NaN cair no mínimo
+    intervalo = min(INTERVALO_MAXIMO, max(INTERVALO_MINIMO, request.args.get("intervalo", INTERVALO_MINIMO, type = float)))
+    formato = request.args.get("formato", "json")
+    if formato not in FORMATOS:
+        return {"erro": f"Formato inválido! Use um de {', '.join(FORMATOS)}"}, 400
+
+    def eventos(versao):
+        while not simulacao.encerrada:
+            if not simulacao.aguardar_alteracao(versao, timeout = KEEPALIVE):
+                if simulacao.encerrada:
+                    break
+                yield ": keepalive\n\n"
+                continue
+            delta = simulacao.delta(versao, formato)
+            versao = delta["versao"]
+            yield f"id: {versao}\nevent: delta\ndata: {json.dumps(delta)}\n\n"
+            # Limita a taxa por cliente; o que mudar até lá vai no próximo delta
+            time.sleep(intervalo)
 
-    return jsonify(estado)
\ No newline at end of file
+    return Response(eventos(versao), mimetype = "text/event-stream",
+                    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
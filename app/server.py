@@ -1,49 +1,178 @@
-from flask import Flask, jsonify, request
-from entidades.Ambiente import criar_ambiente
-from entidades.Agente import registrar_agente, mover_agente, get_status_agente
+from flask import abort, jsonify, make_response, request, Response
 from app import app
+from app.simulacao import FORMATOS, GerenciadorSessoes, Simulacao
 
+SESSAO_PADRAO = "padrao"
+MAX_MOVIMENTOS_LOTE = 10000
+MAX_TURNOS_PASSO = 10000  # Turnos por pedido a /passo (valores maiores são reduzidos)
+MAX_ESPERA_PASSO = 60  # Segundos que /passo espera, no máximo, com "esperar"
 
-# Inicializa o servidor Flask
-app = Flask(__name__)
+# Sessões de simulação; as rotas sem /sessoes/<id> usam a sessão padrão
+sessoes = GerenciadorSessoes()
+simulacao = Simulacao()
+sessoes.adicionar(simulacao, SESSAO_PADRAO, fixa=True)
 
-# Ambiente e agentes globais
-ambiente = criar_ambiente()
-agentes = {}
-proximo_id = 1  # Contador global para os IDs dos agentes
 
-# Rota para atualizar o estado do ambiente
-@app.route("/actualizar", methods=["GET"])
-def atualizar():
-    return jsonify({"ambiente": ambiente.tolist()})
+def rota(caminho, **opcoes):
+    """
+    Registra a rota para a sessão padrão (caminho) e para /sessoes/<sessao_id>/caminho.
+    """
+    def decorador(funcao):
+        app.route(caminho, defaults={"sessao_id": SESSAO_PADRAO}, **opcoes)(funcao)
+        app.route("/sessoes/<sessao_id>" + caminho, **opcoes)(funcao)
+        return funcao
+    return decorador
+
+
+def obter_sessao(sessao_id):
+    try:
+        return sessoes.obter(sessao_id)
+    except KeyError:
+        abort(make_response(jsonify({"erro": f"Sessão {sessao_id} não encontrada!"}), 404))
+
+# Rota para criar uma nova sessão (parâmetros de Simulacao.criar no corpo JSON)
+@app.route("/sessoes", methods=["POST"])
+def criar_sessao():
+    parametros = request.get_json(silent=True) or {}
+    try:
+        sessao_id = sessoes.criar(**parametros)
+    except (TypeError, ValueError) as erro:
+        return jsonify({"erro": str(erro)}), 400
+    except RuntimeError as erro:
+        return jsonify({"erro": str(erro)}), 503
+    return jsonify({"id": sessao_id, **sessoes.obter(sessao_id).resumo()}), 201
+
+# Rota para listar as sessões
+@app.route("/sessoes", methods=["GET"])
+def listar_sessoes():
+    return jsonify({"sessoes": sessoes.listar()})
+
+# Rota para consultar uma sessão
+@app.route("/sessoes/<sessao_id>", methods=["GET"])
+def consultar_sessao(sessao_id):
+    return jsonify(obter_sessao(sessao_id).resumo())
+
+# Rota para remover uma sessão
+@app.route("/sessoes/<sessao_id>", methods=["DELETE"])
+def remover_sessao(sessao_id):
+    if sessao_id == SESSAO_PADRAO:
+        return jsonify({"erro": "A sessão padrão não pode ser removida!"}), 400
+    obter_sessao(sessao_id)
+    try:
+        sessoes.remover(sessao_id)
+    except KeyError:
+        pass
+    return jsonify({"mensagem": f"Sessão {sessao_id} removida"})
+
+# Rota para executar turnos no pool de simulação.
+# Responde 202 logo; com "esperar": true responde quando os turnos terminarem.
+# turnos e timeout são limitados a MAX_TURNOS_PASSO e MAX_ESPERA_PASSO
+@rota("/passo", methods=["POST"])
+def passo(sessao_id):
+    sessao = obter_sessao(sessao_id)
+    data = request.get_json(silent=True) or {}
+    turnos = data.get("turnos", 1)
+    timeout = data.get("timeout", 30)
+    if not isinstance(turnos, int) or isinstance(turnos, bool) or turnos < 1:
+        return jsonify({"erro": "turnos deve ser um inteiro positivo!"}), 400
+    if not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or not 0 <= timeout:
+        return jsonify({"erro": "timeout deve ser um número não negativo!"}), 400
+
+    sessoes.agendar_turnos(sessao, min(turnos, MAX_TURNOS_PASSO))
+    if data.get("esperar"):
+        sessoes.aguardar_turnos(sessao, timeout=min(timeout, MAX_ESPERA_PASSO))
+    if sessao.erro is not None:
+        return jsonify({"erro": f"A simulação falhou: {sessao.erro}", **sessao.resumo()}), 500
+    if data.get("esperar"):
+        return jsonify(sessao.resumo())
+    return jsonify(sessao.resumo()), 202
+
+# Rota para atualizar o estado do ambiente.
+# ?versao=N devolve só o que mudou desde N; sem mudanças (ou com If-None-Match
+# igual ao ETag atual) responde 304. ?formato=bytes|rle usa a codificação compacta
+@rota("/actualizar", methods=["GET"])
+def atualizar(sessao_id):
+    sessao = obter_sessao(sessao_id)
+    versao = request.args.get("versao", 0, type=int)
+    formato = request.args.get("formato", "json")
+    if formato not in FORMATOS:
+        return jsonify({"erro": f"Formato inválido! Use um de {', '.join(FORMATOS)}"}), 400
+
+    atual = sessao.versao
+    if versao == atual or request.if_none_match.contains(str(atual)):
+        resposta = Response(status=304)
+    else:
+        estado = sessao.estado(versao, formato)
+        atual = estado["versao"]
+        resposta = jsonify(estado)
+
+    resposta.set_etag(str(atual))
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
 
 # Rota para registrar um novo agente
-@app.route("/registrar", methods=["POST"])
-def registrar():
-    global proximo_id
-    agente_id = proximo_id
-    proximo_id += 1
+@rota("/registrar", methods=["POST"])
+def registrar(sessao_id):
+    sessao = obter_sessao(sessao_id)
+    data = request.get_json(silent=True) or {}
+    x, y = data.get("x", 0), data.get("y", 0)
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (x, y)):
+        return jsonify({"erro": "x e y devem ser inteiros!"}), 400
 
-    mensagem = registrar_agente(agentes, agente_id)
+    try:
+        agente_id, mensagem = sessao.registrar_agente(x, y)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 400
     return jsonify({"mensagem": mensagem, "id": agente_id})
 
 # Rota para movimentar um agente
-@app.route("/movimento", methods=["POST"])
-def movimento():
-    data = request.get_json()
+@rota("/movimento", methods=["POST"])
+def movimento(sessao_id):
+    sessao = obter_sessao(sessao_id)
+    data = request.get_json(silent=True) or {}
     agente_id = data.get("id")
     x, y = data.get("x"), data.get("y")
 
-    if agente_id is not None:
-        resultado = mover_agente(agentes, ambiente, agente_id, x, y)
-        return jsonify(resultado)
-    return jsonify({"erro": "ID do agente não fornecido!"}), 400
+    if agente_id is None:
+        return jsonify({"erro": "ID do agente não fornecido!"}), 400
+    if not all(isinstance(v, int) and not isinstance(v, bool) for v in (agente_id, x, y)):
+        return jsonify({"erro": "id, x e y devem ser inteiros!"}), 400
+
+    resultado = sessao.mover_agente(agente_id, x, y)
+    return jsonify(resultado)
+
+# Rota para movimentar vários agentes (ou seguir um plano de um agente) num só pedido:
+# {"movimentos": [{"id": 1, "x": 2, "y": 3}, ...]} ou {"id": 1, "plano": [[2, 3], [2, 4], ...]}
+# Os movimentos são aplicados de forma atômica, na ordem dada
+@rota("/movimentos", methods=["POST"])
+def movimentos(sessao_id):
+    sessao = obter_sessao(sessao_id)
+    data = request.get_json(silent=True) or {}
+
+    try:
+        if "plano" in data:
+            lote = [(data["id"], x, y) for x, y in data["plano"]]
+        else:
+            lote = [(m["id"], m["x"], m["y"]) for m in data["movimentos"]]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"erro": "Use {\"movimentos\": [{\"id\", \"x\", \"y\"}, ...]} "
+                                "ou {\"id\", \"plano\": [[x, y], ...]}"}), 400
+    if not all(isinstance(v, int) and not isinstance(v, bool) for movimento in lote for v in movimento):
+        return jsonify({"erro": "id, x e y devem ser inteiros!"}), 400
+    if len(lote) > MAX_MOVIMENTOS_LOTE:
+        return jsonify({"erro": f"Máximo de {MAX_MOVIMENTOS_LOTE} movimentos por pedido!"}), 413
+
+    try:
+        resultados = sessao.mover_agentes(lote)
+    except ValueError as erro:
+        return jsonify({"erro": str(erro)}), 404
+    return jsonify({"versao": sessao.versao, "resultados": resultados})
 
 # Rota para verificar o status de um agente
-@app.route("/status/<int:agente_id>", methods=["GET"])
-def status(agente_id):
-    return jsonify(get_status_agente(agentes, agente_id))
+@rota("/status/<int:agente_id>", methods=["GET"])
+def status(sessao_id, agente_id):
+    return jsonify(obter_sessao(sessao_id).status_agente(agente_id))
 
 # Função para iniciar o servidor
 def iniciar_servidor():
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,459 @@
+import base64
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from entidades.Ambiente import Ambiente, criar_ambiente, codificar_rle
+from entidades.Agente import Agente, GrupoAgentes, mover_agente, get_status_agente
+from entidades.Aprendizado import MODELOS, obter_modelo_treinado
+
+# Codificações do grid: 'json' (listas de símbolos), 'bytes' (um código uint8
+# por célula, em base64) e 'rle' (carreiras [codigo, repeticoes, ...]).
+# Códigos: L=0, B=1, T=2, F=3, E=4 (ver entidades.Ambiente.CODIGOS)
+FORMATOS = ('json', 'bytes', 'rle')
+
+logger = logging.getLogger(__name__)
+
+
+class Simulacao:
+    """
+    Um mundo (ambiente + agentes) servido pela API.
+
+    Toda leitura e alteração passa por self.condicao (um lock reentrante),
+    que também acorda os streams quando o estado muda. O estado tem uma
+    versão: a do ambiente, que avança a cada célula alterada e a cada
+    mudança de um agente.
+    """
+
+    def __init__(self, ambiente=None):
+        self.ambiente = ambiente if ambiente is not None else criar_ambiente()
+        self.grupo = GrupoAgentes()
+        self.agentes = self.grupo.agentes
+        self.proximo_id = 1
+        self.versoes_agentes = {}  # Versão da última mudança de cada agente
+        self.estados_completos = {}  # (versao, formato) -> estado completo já codificado
+        self.condicao = threading.Condition(threading.RLock())
+        self.turnos = 0
+        self.turnos_pendentes = 0  # Turnos pedidos e ainda não executados pelo pool
+        self.agendada = False  # True enquanto há uma tarefa desta simulação no pool
+        self.encerrada = False
+        self.erro = None  # Erro que interrompeu os turnos no pool (a simulação deixa de avançar)
+        self.ultimo_acesso = time.monotonic()
+
+    MAX_AGENTES = 10000  # Agentes por simulação
+    MAX_CELULAS_AGENTES = 20_000_000  # Limite de agentes x células (memória do conhecimento dos agentes)
+
+    @classmethod
+    def validar_agentes(cls, num_agentes, tamanho):
+        """
+        Verifica se uma simulação com este grid pode ter num_agentes agentes.
+
+        Raises:
+            ValueError: Se ultrapassar MAX_AGENTES ou MAX_CELULAS_AGENTES
+        """
+        if num_agentes > cls.MAX_AGENTES:
+            raise ValueError(f"No máximo {cls.MAX_AGENTES} agentes por simulação")
+        if num_agentes * tamanho * tamanho > cls.MAX_CELULAS_AGENTES:
+            raise ValueError(f"Agentes demais para um grid {tamanho}x{tamanho} "
+                             f"(máximo {cls.MAX_CELULAS_AGENTES // (tamanho * tamanho)})")
+
+    @classmethod
+    def criar(cls, tamanho=10, perc_bombas=30, perc_tesouros=20, num_agentes=0, modelo='random'):
+        """
+        Cria uma simulação nova, com agentes em posições aleatórias.
+
+        Args:
+            tamanho: Tamanho do grid
+            perc_bombas: Percentual de bombas
+            perc_tesouros: Percentual de tesouros (o resto são células livres)
+            num_agentes: Agentes criados de início
+            modelo: Modelo dos agentes ('random', 'knn', 'tree' ou 'bayes')
+
+        Returns:
+            Simulacao: A nova simulação
+        """
+        tamanho, num_agentes = int(tamanho), int(num_agentes)
+        perc_bombas, perc_tesouros = float(perc_bombas), float(perc_tesouros)
+        if not 1 <= tamanho <= 1000:
+            raise ValueError("tamanho deve estar entre 1 e 1000")
+        if perc_bombas < 0 or perc_tesouros < 0 or perc_bombas + perc_tesouros > 100:
+            raise ValueError("Percentuais de bombas e tesouros inválidos")
+        if not 0 <= num_agentes <= tamanho * tamanho:
+            raise ValueError("num_agentes inválido")
+        cls.validar_agentes(num_agentes, tamanho)
+        if modelo != 'random' and modelo not in MODELOS:
+            raise ValueError(f"Modelo desconhecido: {modelo}")
+
+        simulacao = cls(Ambiente(tamanho, 100 - perc_bombas - perc_tesouros, perc_bombas, perc_tesouros))
+        posicoes = np.random.choice(tamanho * tamanho, size=num_agentes, replace=False)
+        for posicao in posicoes:
+            simulacao.registrar_agente(*divmod(int(posicao), tamanho), modelo_tipo=modelo)
+        return simulacao
+
+    @property
+    def versao(self):
+        return self.ambiente.versao
+
+    @staticmethod
+    def resumo_agente(agente):
+        return {"id": agente.id, "posicao": list(agente.posicao), "vivo": agente.vivo}
+
+    def registrar_agente(self, x=0, y=0, modelo_tipo='random'):
+        """
+        Cria um novo agente com o próximo id livre.
+
+        Returns:
+            tuple: (id, mensagem)
+
+        Raises:
+            ValueError: Se (x, y) estiver fora do grid ou o limite de agentes for atingido
+        """
+        if not (0 <= x < self.ambiente.tamanho and 0 <= y < self.ambiente.tamanho):
+            raise ValueError(f"Posição ({x},{y}) fora do grid {self.ambiente.tamanho}x{self.ambiente.tamanho}")
+        modelo_ml = obter_modelo_treinado(modelo_tipo) if modelo_tipo in MODELOS else None
+        with self.condicao:
+            self.validar_agentes(len(self.agentes) + 1, self.ambiente.tamanho)
+            agente_id = self.proximo_id
+            self.proximo_id += 1
+            self.grupo.registrar_agente(Agente(agente_id, x, y, self.ambiente, modelo_tipo, modelo_ml))
+            self.versoes_agentes[agente_id] = self.ambiente.nova_versao()
+            self.condicao.notify_all()
+        return agente_id, f"Agente {agente_id} registrado em ({x},{y})"
+
+    def mover_agente(self, agente_id, x, y):
+        """
+        Move um agente e avisa os streams se algo mudou.
+
+        Returns:
+            dict: Resultado de Agente.explorar()
+        """
+        with self.condicao:
+            versao = self.versao
+            antes = self.resumos_agentes([agente_id])
+            resultado = mover_agente(self.agentes, agente_id, x, y)
+            self.marcar_alteracoes(antes, versao)
+        return resultado
+
+    def mover_agentes(self, movimentos):
+        """
+        Aplica um lote de movimentos de forma atômica, na ordem dada.
+
+        Todos os agentes são validados antes do primeiro movimento; o lote
+        corre com o lock da simulação, sem intercalar com outros pedidos,
+        e os streams recebem o resultado do lote inteiro de uma vez.
+
+        Args:
+            movimentos: Lista de tuplas (agente_id, x, y)
+
+        Returns:
+            list: Resultado de Agente.explorar() de cada movimento, na mesma ordem
+        """
+        with self.condicao:
+            desconhecidos = sorted({agente_id for agente_id, _, _ in movimentos} - set(self.agentes))
+            if desconhecidos:
+                raise ValueError(f"Agentes não encontrados: {desconhecidos}")
+
+            versao = self.versao
+            antes = self.resumos_agentes({agente_id for agente_id, _, _ in movimentos})
+            resultados = [self.agentes[agente_id].explorar(x, y) for agente_id, x, y in movimentos]
+            self.marcar_alteracoes(antes, versao)
+        return resultados
+
+    def resumos_agentes(self, ids):
+        return {agente_id: self.resumo_agente(self.agentes[agente_id])
+                for agente_id in ids if agente_id in self.agentes}
+
+    def marcar_alteracoes(self, antes, versao):
+        """
+        Avança a versão dos agentes cujo resumo mudou e acorda os streams
+        se o estado mudou desde `versao` (chamado com o lock).
+        """
+        for agente_id, resumo in antes.items():
+            if self.resumo_agente(self.agentes[agente_id]) != resumo:
+                self.versoes_agentes[agente_id] = self.ambiente.nova_versao()
+        if self.versao != versao:
+            self.condicao.notify_all()
+
+    def executar_turno(self):
+        """
+        Executa um turno de todos os agentes vivos (GrupoAgentes.executar_turno).
+
+        Returns:
+            list: Resultados das explorações do turno
+        """
+        with self.condicao:
+            versao = self.versao
+            antes = self.resumos_agentes(self.agentes)
+            resultados = self.grupo.executar_turno()
+            self.turnos += 1
+            self.marcar_alteracoes(antes, versao)
+        return resultados
+
+    def resumo(self):
+        """
+        Retorna um resumo da simulação (sem o grid).
+        """
+        with self.condicao:
+            return {
+                "versao": self.versao,
+                "turnos": self.turnos,
+                "turnos_pendentes": self.turnos_pendentes,
+                "erro": self.erro,
+                "tamanho": self.ambiente.tamanho,
+                "estatisticas": self.grupo.get_estatisticas()
+            }
+
+    def status_agente(self, agente_id):
+        with self.condicao:
+            return get_status_agente(self.agentes, agente_id)
+
+    def codificar_grid(self, formato='json'):
+        """
+        Codifica o grid inteiro no formato pedido (ver FORMATOS).
+        """
+        if formato == 'json':
+            return self.ambiente.tolist()
+        codigos = self.ambiente.matriz_codigos().ravel()
+        if formato == 'bytes':
+            return base64.b64encode(codigos.tobytes()).decode('ascii')
+        return codificar_rle(codigos)
+
+    def estado(self, versao=0, formato='json'):
+        """
+        Retorna o estado para um cliente que já conhece `versao`.
+
+        Sem versão utilizável (0, ou mais nova que a do servidor, p.ex. após
+        reiniciar) devolve o grid completo; senão devolve só o delta.
+
+        Args:
+            versao: Última versão que o cliente conhece
+            formato: Codificação do grid (ver FORMATOS)
+
+        Returns:
+            dict: Com 'versao', 'completo', 'tamanho' e 'agentes', mais
+                  'ambiente' (completo) ou as células alteradas (delta)
+        """
+        with self.condicao:
+            if 0 < versao <= self.versao:
+                return {**self.delta(versao, formato), "completo": False}
+
+            # Vários clientes na mesma versão partilham o estado já codificado
+            chave = (self.versao, formato)
+            if chave not in self.estados_completos:
+                self.estados_completos = {k: v for k, v in self.estados_completos.items()
+                                          if k[0] == self.versao}
+                self.estados_completos[chave] = {
+                    "versao": self.versao,
+                    "completo": True,
+                    "tamanho": self.ambiente.tamanho,
+                    "ambiente": self.codificar_grid(formato),
+                    "agentes": [self.resumo_agente(a) for a in self.agentes.values()]
+                }
+            return self.estados_completos[chave]
+
+    def delta(self, versao, formato='json'):
+        """
+        Retorna apenas as células e os agentes alterados depois de `versao`.
+
+        Cada célula aparece uma vez, com o valor atual, por mais que tenha
+        mudado no intervalo; versao = 0 devolve o estado completo.
+
+        Args:
+            versao: Última versão que o cliente conhece
+            formato: 'json' dá 'celulas': [[x, y, simbolo], ...]; os formatos
+                     compactos dão 'indices' (x * tamanho + y) e 'codigos'
+
+        Returns:
+            dict: {'versao', 'tamanho', células alteradas, 'agentes': [...]}
+        """
+        with self.condicao:
+            xs, ys = self.ambiente.alteracoes_desde(versao)
+            # Só as células alteradas são convertidas, nunca o grid inteiro
+            if formato == 'json':
+                simbolos = self.ambiente.simbolos_celulas(xs, ys)
+                celulas = {"celulas": [[int(x), int(y), str(s)] for x, y, s in zip(xs, ys, simbolos)]}
+            else:
+                celulas = {
+                    "indices": (xs * self.ambiente.tamanho + ys).tolist(),
+                    "codigos": self.ambiente.codigos_celulas(xs, ys).tolist()
+                }
+            return {
+                "versao": self.versao,
+                "tamanho": self.ambiente.tamanho,
+                **celulas,
+                "agentes": [self.resumo_agente(a) for agente_id, a in self.agentes.items()
+                            if self.versoes_agentes[agente_id] > versao]
+            }
+
+    def aguardar_alteracao(self, versao, timeout=None):
+        """
+        Bloqueia até o estado passar de `versao` (ou até o timeout, ou até a
+        simulação ser encerrada).
+
+        Returns:
+            bool: True se houve alteração
+        """
+        with self.condicao:
+            self.condicao.wait_for(lambda: self.versao > versao or self.encerrada, timeout)
+            return self.versao > versao
+
+
+class GerenciadorSessoes:
+    """
+    Várias simulações independentes num só processo, identificadas por id.
+
+    Os turnos pedidos são executados num pool limitado de threads, fora
+    das threads dos pedidos HTTP. Cada simulação tem no máximo uma tarefa
+    no pool de cada vez, que executa até TURNOS_POR_TAREFA turnos e volta
+    ao fim da fila, para que uma simulação longa não bloqueie as outras.
+    Simulações sem acesso há mais de tempo_ocioso segundos são removidas;
+    a verificação corre nas consultas (obter, listar), no máximo uma vez
+    a cada INTERVALO_LIMPEZA segundos, e ao adicionar uma simulação.
+    """
+
+    TURNOS_POR_TAREFA = 20
+    MAX_TURNOS_PENDENTES = 100000  # Turnos acumulados por simulação, no máximo
+    INTERVALO_LIMPEZA = 30
+
+    def __init__(self, max_workers=4, max_sessoes=64, tempo_ocioso=600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulacao")
+        self.max_sessoes = max_sessoes
+        self.tempo_ocioso = tempo_ocioso
+        self.proxima_limpeza = 0.0
+        self.sessoes = {}
+        self.fixas = set()  # Sessões que nunca são removidas por ociosidade
+        self.lock = threading.Lock()
+
+    def adicionar(self, simulacao, sessao_id=None, fixa=False):
+        """
+        Regista uma simulação já criada e retorna o seu id.
+        """
+        self.remover_ociosas()
+        with self.lock:
+            if len(self.sessoes) >= self.max_sessoes:
+                raise RuntimeError("Limite de sessões atingido")
+            sessao_id = sessao_id or uuid.uuid4().hex[:12]
+            self.sessoes[sessao_id] = simulacao
+            if fixa:
+                self.fixas.add(sessao_id)
+        return sessao_id
+
+    def criar(self, **parametros):
+        """
+        Cria uma simulação (ver Simulacao.criar) e retorna o seu id.
+        """
+        return self.adicionar(Simulacao.criar(**parametros))
+
+    def obter(self, sessao_id):
+        """
+        Retorna a simulação e marca o acesso (KeyError se não existe).
+        """
+        self.limpar_se_preciso()
+        with self.lock:
+            simulacao = self.sessoes[sessao_id]
+        simulacao.ultimo_acesso = time.monotonic()
+        return simulacao
+
+    def listar(self):
+        self.limpar_se_preciso()
+        with self.lock:
+            return list(self.sessoes)
+
+    def remover(self, sessao_id):
+        """
+        Remove a simulação e acorda os streams que a acompanham.
+        """
+        with self.lock:
+            simulacao = self.sessoes.pop(sessao_id)
+            self.fixas.discard(sessao_id)
+        with simulacao.condicao:
+            simulacao.encerrada = True
+            simulacao.turnos_pendentes = 0
+            simulacao.condicao.notify_all()
+
+    def remover_ociosas(self):
+        """
+        Remove as simulações sem acesso há mais de tempo_ocioso segundos.
+        """
+        limite = time.monotonic() - self.tempo_ocioso
+        with self.lock:
+            ociosas = [sessao_id for sessao_id, simulacao in self.sessoes.items()
+                       if sessao_id not in self.fixas and simulacao.ultimo_acesso < limite
+                       and not simulacao.agendada]
+        for sessao_id in ociosas:
+            try:
+                self.remover(sessao_id)
+            except KeyError:
+                pass
+        return ociosas
+
+    def limpar_se_preciso(self):
+        """
+        Chama remover_ociosas() se a última verificação foi há mais de
+        INTERVALO_LIMPEZA segundos (ou tempo_ocioso, se for menor).
+        """
+        agora = time.monotonic()
+        with self.lock:
+            if agora < self.proxima_limpeza:
+                return
+            self.proxima_limpeza = agora + min(self.INTERVALO_LIMPEZA, self.tempo_ocioso)
+        self.remover_ociosas()
+
+    def agendar_turnos(self, simulacao, turnos):
+        """
+        Pede `turnos` turnos à simulação; o pool executa-os em segundo plano.
+        Uma simulação encerrada ou com erro não recebe mais turnos.
+        """
+        with simulacao.condicao:
+            if simulacao.encerrada or simulacao.erro is not None:
+                return
+            simulacao.turnos_pendentes = min(simulacao.turnos_pendentes + turnos, self.MAX_TURNOS_PENDENTES)
+            if simulacao.agendada:
+                return
+            simulacao.agendada = True
+        self.executor.submit(self._executar, simulacao)
+
+    def aguardar_turnos(self, simulacao, timeout=None):
+        """
+        Bloqueia até não haver turnos pendentes.
+
+        Returns:
+            bool: True se todos os turnos foram executados
+        """
+        with simulacao.condicao:
+            return simulacao.condicao.wait_for(lambda: simulacao.turnos_pendentes == 0, timeout)
+
+    def _executar(self, simulacao):
+        with simulacao.condicao:
+            lote = min(simulacao.turnos_pendentes, self.TURNOS_POR_TAREFA)
+
+        try:
+            for _ in range(lote):
+                # Com o lock: /registrar pode estar a inserir agentes no mesmo dict
+                with simulacao.condicao:
+                    if simulacao.encerrada or not simulacao.grupo.get_agentes_vivos():
+                        break
+                simulacao.executar_turno()
+        except Exception as erro:
+            # Ninguém lê o futuro desta tarefa: o erro fica registado na simulação
+            logger.exception("Erro no turno %d de uma simulação; os turnos pendentes foram cancelados",
+                             simulacao.turnos + 1)
+            with simulacao.condicao:
+                simulacao.erro = f"{type(erro).__name__}: {erro}"
+        finally:
+            with simulacao.condicao:
+                if (simulacao.encerrada or simulacao.erro is not None
+                        or not simulacao.grupo.get_agentes_vivos()):
+                    simulacao.turnos_pendentes = 0
+                else:
+                    simulacao.turnos_pendentes -= lote
+                continuar = simulacao.turnos_pendentes > 0
+                simulacao.agendada = continuar
+                simulacao.condicao.notify_all()
+
+        if continuar:
+            self.executor.submit(self._executar, simulacao)
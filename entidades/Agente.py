@@ -1,5 +1,182 @@
 import numpy as np
 
+
+class MapaConhecimento:
+    """
+    Conjunto de células conhecidas guardado como um grid booleano.
+    
+    Mantém a interface de set usada pelos agentes (add, in, len, update,
+    copy), mas a pertença é um acesso direto ao array, sem hashing de
+    tuplas, e a união de conhecimentos é um OR entre arrays.
+    """
+    
+    def __init__(self, shape):
+        self.grid = np.zeros(shape, dtype=bool)
+        self.conhecidas = 0  # Contador mantido para evitar contagens do grid inteiro
+    
+    def add(self, posicao):
+        if not self.grid[posicao]:
+            self.grid[posicao] = True
+            self.conhecidas += 1
+    
+    def __contains__(self, posicao):
+        x, y = posicao
+        return (0 <= x < self.grid.shape[0] and 0 <= y < self.grid.shape[1]
+                and bool(self.grid[x, y]))
+    
+    def __len__(self):
+        return self.conhecidas
+    
+    def __iter__(self):
+        for x, y in np.argwhere(self.grid):
+            yield (int(x), int(y))
+    
+    def update(self, outro):
+        """
+        Une outro conhecimento a este (OR elemento a elemento).
+        
+        Args:
+            outro: MapaConhecimento ou iterável de tuplas (x, y)
+        """
+        if isinstance(outro, MapaConhecimento):
+            np.logical_or(self.grid, outro.grid, out=self.grid)
+            self.conhecidas = int(np.count_nonzero(self.grid))
+        else:
+            for posicao in outro:
+                self.add(posicao)
+    
+    def copiar_de(self, outro):
+        """
+        Substitui o conteúdo pelo de outro mapa, sem alocar um novo array.
+        """
+        np.copyto(self.grid, outro.grid)
+        self.conhecidas = outro.conhecidas
+    
+    def copy(self):
+        novo = MapaConhecimento(self.grid.shape)
+        novo.copiar_de(self)
+        return novo
+    
+    def completo(self):
+        return self.conhecidas == self.grid.size
+    
+    def mais_proxima_desconhecida(self, x, y):
+        """
+        Retorna a célula desconhecida mais próxima de (x, y).
+        
+        A distância é o número de movimentos em 8 direções (Chebyshev).
+        O raio da janela quadrada em volta de (x, y) é encontrado por
+        busca exponencial seguida de busca binária, sem percorrer o grid
+        inteiro. Empates são resolvidos pela distância euclidiana.
+        
+        Args:
+            x: Linha de origem
+            y: Coluna de origem
+            
+        Returns:
+            tuple: (x, y) ou None se todas as células forem conhecidas
+        """
+        if self.completo():
+            return None
+        
+        linhas, colunas = self.grid.shape
+        
+        def janela(raio):
+            x0, y0 = max(x - raio, 0), max(y - raio, 0)
+            return x0, y0, self.grid[x0:x + raio + 1, y0:y + raio + 1]
+        
+        def tem_desconhecida(raio):
+            return not janela(raio)[2].all()
+        
+        raio_max = max(x, y, linhas - 1 - x, colunas - 1 - y)
+        baixo, alto = 0, 0
+        while not tem_desconhecida(alto):
+            if alto == raio_max:
+                return None  # Contador desalinhado do grid: não há desconhecidas
+            baixo = alto
+            alto = min(max(2 * alto, 1), raio_max)
+        
+        # Menor raio com alguma célula desconhecida (baixo nunca tem)
+        while baixo + 1 < alto:
+            meio = (baixo + alto) // 2
+            if tem_desconhecida(meio):
+                alto = meio
+            else:
+                baixo = meio
+        
+        x0, y0, celulas = janela(alto)
+        xs, ys = np.nonzero(~celulas)
+        xs, ys = xs + x0, ys + y0
+        i = np.argmin((xs - x)**2 + (ys - y)**2)
+        return (int(xs[i]), int(ys[i]))
+
+
+class ConhecimentoAgente:
+    """
+    Células conhecidas por um agente: o mapa partilhado pelo grupo mais as
+    que o próprio agente conhece e o grupo ainda não recebeu.
+    
+    O mapa do grupo não é copiado para cada agente, por isso a memória de
+    um agente cresce com as suas descobertas por sincronizar, e não com o
+    tamanho do grid. Fora de um grupo todas as células ficam no set.
+    """
+    
+    def __init__(self, shape):
+        self.shape = shape
+        self.partilhado = None  # MapaConhecimento do grupo
+        self.proprias = set()  # Células conhecidas que não estão no mapa do grupo
+    
+    def ligar(self, mapa):
+        """
+        Passa a ver o mapa do grupo; as células que ele já tem deixam de
+        ser guardadas à parte.
+        
+        Args:
+            mapa: MapaConhecimento partilhado
+        """
+        self.partilhado = mapa
+        if self.proprias:
+            self.proprias = {posicao for posicao in self.proprias if posicao not in mapa}
+    
+    def add(self, posicao):
+        if posicao not in self:
+            self.proprias.add(posicao)
+    
+    def __contains__(self, posicao):
+        return posicao in self.proprias or (self.partilhado is not None and posicao in self.partilhado)
+    
+    def __len__(self):
+        return len(self.proprias) + (len(self.partilhado) if self.partilhado is not None else 0)
+    
+    def __iter__(self):
+        if self.partilhado is not None:
+            yield from self.partilhado
+        yield from self.proprias
+    
+    def update(self, outro):
+        """
+        Une outro conhecimento a este.
+        
+        Args:
+            outro: ConhecimentoAgente, MapaConhecimento ou iterável de tuplas (x, y)
+        """
+        for posicao in outro:
+            self.add(posicao)
+    
+    def mais_proxima_desconhecida(self, x, y):
+        """
+        Retorna a célula desconhecida mais próxima de (x, y)
+        (ver MapaConhecimento.mais_proxima_desconhecida).
+        
+        Só copia o mapa do grupo se o agente tiver células por sincronizar.
+        """
+        if self.partilhado is not None and not self.proprias:
+            return self.partilhado.mais_proxima_desconhecida(x, y)
+        mapa = self.partilhado.copy() if self.partilhado is not None else MapaConhecimento(self.shape)
+        mapa.update(self.proprias)
+        return mapa.mais_proxima_desconhecida(x, y)
+
+
 class Agente:
     """
     Classe que representa um agente inteligente no ambiente de exploração.
@@ -26,7 +203,9 @@ class Agente:
         self.tesouros = 0
         self.bombas_desativadas = 0
         self.vivo = True
-        self.conhecimento_compartilhado = set()  # Células conhecidas por todos
+        self.conhecimento_compartilhado = ConhecimentoAgente(ambiente.shape)  # Mapa do grupo + células próprias
+        self.descobertas = []  # Células descobertas desde a última sincronização
+        self.versao_conhecimento = 0  # Última versão do conhecimento global recebida
         self.historico_movimentos = []
         self.modelo_tipo = modelo_tipo  # 'knn', 'tree', 'bayes'
         self.modelo_ml = modelo_ml  # Modelo ML real para decisões
@@ -89,7 +268,9 @@ class Agente:
             resultado["acao"] = "explorou"
         
         # Adicionar ao conhecimento compartilhado
-        self.conhecimento_compartilhado.add((x, y))
+        if (x, y) not in self.conhecimento_compartilhado:
+            self.conhecimento_compartilhado.add((x, y))
+            self.descobertas.append((x, y))
         
         return resultado
     
@@ -119,17 +300,16 @@ class Agente:
                 movimentos_validos.append((mx, my))
         
         if not movimentos_validos:
-            # Tentar qualquer célula não explorada no grid inteiro
-            for i in range(self.ambiente.shape[0]):
-                for j in range(self.ambiente.shape[1]):
-                    if (i, j) not in self.conhecimento_compartilhado:
-                        return (i, j)
-            return None
+            # Saltar para a célula não explorada mais próxima
+            return self.conhecimento_compartilhado.mais_proxima_desconhecida(x, y)
         
         # ========== USAR MODELO ML PARA DECISÃO ========== #
         if self.modelo_ml:
-            # Modelo ML escolhe a melhor célula
-            melhor_celula = self.modelo_ml.escolher_melhor_celula(movimentos_validos)
+            # Modelo ML escolhe a melhor célula (tabela de pontuações do tamanho deste grid;
+            # o modelo pode ser partilhado com ambientes de outros tamanhos)
+            melhor_celula = self.modelo_ml.escolher_melhor_celula(
+                movimentos_validos, tamanho=self.ambiente.shape[0]
+            )
             return melhor_celula
         # ================================================= #
         
@@ -179,7 +359,8 @@ class GrupoAgentes:
     
     def __init__(self):
         self.agentes = {}
-        self.conhecimento_global = set()
+        self.conhecimento_global = None  # MapaConhecimento criado com o primeiro agente, visto por todos
+        self.versao_conhecimento = 0  # Incrementada a cada sincronização com novidades
         # PADRONIZADO: mesmo nome que main.py
         self.estatisticas_modelos = {
             'knn': {'tesouros': 0, 'mortes': 0, 'movimentos': 0, 'agentes': []},
@@ -199,6 +380,10 @@ class GrupoAgentes:
         """
         if agente.id not in self.agentes:
             self.agentes[agente.id] = agente
+            if self.conhecimento_global is None:
+                self.conhecimento_global = MapaConhecimento(agente.ambiente.shape)
+            # Agentes que entram depois passam logo a ver o conhecimento acumulado
+            self.atualizar_agente(agente)
             # Registrar nas estatísticas por modelo
             if agente.modelo_tipo in self.estatisticas_modelos:
                 self.estatisticas_modelos[agente.modelo_tipo]['agentes'].append(agente.id)
@@ -209,14 +394,42 @@ class GrupoAgentes:
         """
         Sincroniza o conhecimento entre todos os agentes.
         Todos os agentes terão acesso ao conhecimento global.
+        
+        Apenas as células descobertas desde a última sincronização são
+        coletadas e marcadas no mapa global, que todos os agentes veem; cada
+        agente descarta então as suas células que o mapa já tem. Cada
+        sincronização com novidades gera uma nova versão.
         """
-        # Coletar todo conhecimento
+        if self.conhecimento_global is None:
+            return
+        
+        # Coletar apenas as descobertas novas
+        novas = []
         for agente in self.agentes.values():
-            self.conhecimento_global.update(agente.conhecimento_compartilhado)
+            for posicao in agente.descobertas:
+                if posicao not in self.conhecimento_global:
+                    self.conhecimento_global.add(posicao)
+                    novas.append(posicao)
+            agente.descobertas = []
+        
+        if novas:
+            self.versao_conhecimento += 1
         
-        # Distribuir para todos
         for agente in self.agentes.values():
-            agente.conhecimento_compartilhado = self.conhecimento_global.copy()
+            self.atualizar_agente(agente)
+    
+    def atualizar_agente(self, agente):
+        """
+        Leva o conhecimento de um agente até a versão global atual.
+        
+        O agente passa a ver o mapa global (sem cópia) e fica só com as
+        células próprias que o mapa ainda não tem.
+        
+        Args:
+            agente: Instância de Agente
+        """
+        agente.conhecimento_compartilhado.ligar(self.conhecimento_global)
+        agente.versao_conhecimento = self.versao_conhecimento
     
     def get_agentes_vivos(self):
         """
@@ -257,7 +470,7 @@ class GrupoAgentes:
         
         agentes_vivos = len(self.get_agentes_vivos())
         total_tesouros = sum(ag.tesouros for ag in self.agentes.values())
-        total_explorado = len(self.conhecimento_global)
+        total_explorado = len(self.conhecimento_global) if self.conhecimento_global is not None else 0
         
         return {
             "total_agentes": len(self.agentes),
@@ -282,6 +495,9 @@ class GrupoAgentes:
         melhor_score = -9999
         
         for modelo, stats in self.estatisticas_modelos.items():
+            # Modelos sem agentes não participaram da simulação
+            if not stats['agentes']:
+                continue
             score = (stats['tesouros'] * 10) - (stats['mortes'] * 20)
             if score > melhor_score:
                 melhor_score = score
@@ -306,4 +522,39 @@ class GrupoAgentes:
         # Sincronizar conhecimento após todos se moverem
         self.sincronizar_conhecimento()
         
-        return resultados
\ No newline at end of file
+        return resultados
+
+
+def mover_agente(agentes, agente_id, x, y):
+    """
+    Move um agente para a célula (x, y), explorando-a.
+    
+    Args:
+        agentes: Dict {id: Agente}
+        agente_id: Identificador do agente
+        x, y: Célula de destino
+    
+    Returns:
+        dict: Resultado de Agente.explorar(), ou status 'erro' se o agente não existe
+    """
+    agente = agentes.get(agente_id)
+    if agente is None:
+        return {"status": "erro", "mensagem": f"Agente {agente_id} não encontrado"}
+    return agente.explorar(x, y)
+
+
+def get_status_agente(agentes, agente_id):
+    """
+    Retorna o estado de um agente.
+    
+    Args:
+        agentes: Dict {id: Agente}
+        agente_id: Identificador do agente
+    
+    Returns:
+        dict: Resultado de Agente.get_estado(), ou status 'erro' se o agente não existe
+    """
+    agente = agentes.get(agente_id)
+    if agente is None:
+        return {"status": "erro", "mensagem": f"Agente {agente_id} não encontrado"}
+    return agente.get_estado()
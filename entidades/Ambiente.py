@@ -1,22 +1,80 @@
 import numpy as np
 import random
 
+#CÓDIGOS INTEIROS DAS CÉLULAS (REPRESENTAÇÃO COMPACTA uint8)
+LIVRE, BOMBA, TESOURO, BANDEIRA, EXPLORADA = range(5)
+SIMBOLOS = np.array(['L', 'B', 'T', 'F', 'E'])
+CODIGOS = {simbolo: np.uint8(codigo) for codigo, simbolo in enumerate(SIMBOLOS)}
+
+
+def codificar_matriz(matriz):
+    """
+    CONVERTE UMA MATRIZ DE SÍMBOLOS ('L', 'B', ...) PARA CÓDIGOS uint8
+    """
+    matriz = np.asarray(matriz)
+    codigos = np.zeros(matriz.shape, dtype=np.uint8)
+    for simbolo, codigo in CODIGOS.items():
+        codigos[matriz == simbolo] = codigo
+    return codigos
+
+
+def decodificar_matriz(codigos):
+    """
+    CONVERTE UMA MATRIZ DE CÓDIGOS uint8 DE VOLTA PARA SÍMBOLOS
+    """
+    return SIMBOLOS[np.asarray(codigos)]
+
+
+def codificar_rle(codigos):
+    """
+    CODIFICA UMA SEQUÊNCIA DE CÓDIGOS EM CARREIRAS: [codigo, repeticoes, codigo, repeticoes, ...]
+    """
+    codigos = np.asarray(codigos).ravel()
+    if codigos.size == 0:
+        return []
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(codigos)) + 1))
+    repeticoes = np.diff(np.concatenate((inicios, [codigos.size])))
+    return np.column_stack((codigos[inicios], repeticoes)).ravel().tolist()
+
+
+def decodificar_rle(carreiras):
+    """
+    DESFAZ codificar_rle, DEVOLVENDO UM ARRAY uint8 (1D)
+    """
+    carreiras = np.asarray(carreiras, dtype=np.int64).reshape(-1, 2)
+    return np.repeat(carreiras[:, 0], carreiras[:, 1]).astype(np.uint8)
+
+
+#DESLOCAMENTOS DAS CÉLULAS VIZINHAS
+ORTOGONAIS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+DIAGONAIS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
 class Ambiente:
     """
     CLASSE QUE REPRESENTA O  AMBIENTE DE EXPLORAÇÃO 10x10
     """
 
-    def __init__(self, tamanho = 10, perc_livres = 50, perc_bombas = 30, perc_tesouros = 20):
+    def __init__(self, tamanho = 10, perc_livres = 50, perc_bombas = 30, perc_tesouros = 20, compacto = False):
         """
-        INICIALIZA O AMBIENTE
+        INICIALIZA O AMBIENTE.
+        COM compacto = True A MATRIZ É GUARDADA COMO CÓDIGOS uint8 EM VEZ DE STRINGS
         """
         self.tamanho = tamanho
+        self.compacto = compacto
+        #VALOR INTERNO DE CADA SÍMBOLO NA MATRIZ
+        self.codigos = CODIGOS if compacto else {simbolo: simbolo for simbolo in SIMBOLOS}
         self.perc_livres = perc_livres
         self.perc_bombas = perc_bombas
         self.perc_tesouros = perc_tesouros
         self.matriz = None
         self.tesouros_iniciais = 0
         self.bombas_iniciais = 0
+        self.bombas_adj = None
+        self.tesouros_adj = None
+        self.contagem = {}
+        #VERSÃO DO ESTADO E VERSÃO EM QUE CADA CÉLULA MUDOU PELA ÚLTIMA VEZ (PARA ENVIAR SÓ O QUE MUDOU)
+        self.versao = 0
+        self.versoes_celulas = None
         self.criar_ambiente()
 
     #FUNÇÃO PARA CRIAR O AMBIENTE
@@ -28,7 +86,7 @@ class Ambiente:
             self.perc_tesouros / 100
         ]
         self.matriz = np.random.choice(
-            ['L', 'B', 'T'],
+            np.array([self.codigos['L'], self.codigos['B'], self.codigos['T']]),
             size = (self.tamanho, self.tamanho),
             p = probabilidades
         )
@@ -36,12 +94,19 @@ class Ambiente:
         #ADICIONAR BANDEIRA EM POSIÇÃO ALEATÓRIA
         fx = random.randint(0, self.tamanho - 1)
         fy = random.randint(0, self.tamanho - 1)
-        self.matriz[fx, fy] = 'F'
+        self.matriz[fx, fy] = self.codigos['F']
         self.bandeira_pos = (fx, fy)
 
         #CONTAR RECURSOS INICIAIS
-        self.tesouros_iniciais = np.sum(self.matriz == 'T')
-        self.bombas_iniciais = np.sum(self.matriz == 'B')
+        self.tesouros_iniciais = np.sum(self.matriz == self.codigos['T'])
+        self.bombas_iniciais = np.sum(self.matriz == self.codigos['B'])
+
+        #MAPAS DE ADJACÊNCIA E CONTADORES DO GRID INTEIRO
+        self.calcular_mapas_adjacencia()
+        self.recontar_celulas()
+
+        #O GRID INTEIRO CONTA COMO ALTERADO
+        self.versoes_celulas = np.full(self.matriz.shape, self.nova_versao(), dtype = np.int64)
 
         return self.matriz
     
@@ -60,7 +125,7 @@ class Ambiente:
         RETORNA O CONTEÚDO DE UMA CÉLULA
         """
         if 0 <= x < self.tamanho and 0 <= y < self.tamanho:
-            return self.matriz[x, y]
+            return self[x, y]
         return None
     
     
@@ -69,26 +134,100 @@ class Ambiente:
         DEFINE O VALOR DE UMA CÉLULA
         """
         if 0 <= x < self.tamanho and 0 <= y < self.tamanho:
+            valor = self.codigos.get(valor, valor)
+            antigo = self.matriz[x, y]
             self.matriz[x, y] = valor
+            if antigo != valor:
+                self.atualizar_mapas_adjacencia(x, y, antigo, valor)
+                self.contagem[self.simbolo(antigo)] -= 1
+                self.contagem[self.simbolo(valor)] += 1
+                self.versoes_celulas[x, y] = self.nova_versao()
             return True
         return False
     
 
+    def nova_versao(self):
+        """
+        AVANÇA E RETORNA A VERSÃO DO ESTADO
+        """
+        self.versao += 1
+        return self.versao
+    
+
+    def alteracoes_desde(self, versao):
+        """
+        RETORNA AS COORDENADAS (xs, ys) DAS CÉLULAS ALTERADAS DEPOIS DE versao.
+        CADA CÉLULA APARECE UMA ÚNICA VEZ, POR MAIS QUE TENHA MUDADO (versao = 0 DEVOLVE O GRID INTEIRO)
+        """
+        return np.nonzero(self.versoes_celulas > versao)
+    
+
+    def simbolo(self, valor):
+        """
+        CONVERTE UM VALOR INTERNO DA MATRIZ PARA O SÍMBOLO CORRESPONDENTE
+        """
+        return str(SIMBOLOS[valor]) if self.compacto else str(valor)
+    
+
+    def recontar_celulas(self):
+        """
+        RECALCULA OS CONTADORES DE CADA TIPO DE CÉLULA (USADO APÓS ALTERAR A MATRIZ DIRETAMENTE).
+        DEPOIS DISSO OS CONTADORES SÃO MANTIDOS POR set_celula
+        """
+        self.contagem = {
+            str(simbolo): int(np.sum(self.matriz == self.codigos[simbolo]))
+            for simbolo in SIMBOLOS
+        }
+    
+
+    def somar_vizinhos(self, mascara):
+        """
+        SOMA, PARA CADA CÉLULA, OS VALORES DA MÁSCARA NAS 8 CÉLULAS VIZINHAS.
+        USA FATIAS DE UMA CÓPIA COM BORDA DE ZEROS (SEM LAÇO POR CÉLULA)
+        """
+        n = self.tamanho
+        expandida = np.pad(mascara.astype(np.int16), 1)
+        total = np.zeros((n, n), dtype=np.int16)
+        for dx, dy in ORTOGONAIS + DIAGONAIS:
+            total += expandida[1 + dx:1 + dx + n, 1 + dy:1 + dy + n]
+        return total
+    
+
+    def calcular_mapas_adjacencia(self):
+        """
+        CALCULA DE UMA VEZ O NÚMERO DE BOMBAS E TESOUROS ADJACENTES DE TODAS AS CÉLULAS
+        """
+        self.bombas_adj = self.somar_vizinhos(self.matriz == self.codigos['B'])
+        self.tesouros_adj = self.somar_vizinhos(self.matriz == self.codigos['T'])
+    
+
+    def atualizar_mapas_adjacencia(self, x, y, antigo, novo):
+        """
+        ATUALIZA OS MAPAS DE ADJACÊNCIA APÓS A MUDANÇA DE UMA ÚNICA CÉLULA
+        """
+        x0, x1 = max(x - 1, 0), min(x + 2, self.tamanho)
+        y0, y1 = max(y - 1, 0), min(y + 2, self.tamanho)
+
+        for mapa, tipo in ((self.bombas_adj, self.codigos['B']), (self.tesouros_adj, self.codigos['T'])):
+            delta = int(novo == tipo) - int(antigo == tipo)
+            if delta:
+                mapa[x0:x1, y0:y1] += delta
+                mapa[x, y] -= delta #A CÉLULA NÃO É VIZINHA DE SI MESMA
+    
+
     def get_vizinhos(self, x, y, incluir_diagonais = True):
         """
         RETORNA AS CÉLULAS VIZINHAS DE UMA POSIÇÃO
         """
         vizinhos = []
-        movimentos = [(0, 1), (0, 1), (0, -1), (-1, 0)]
-        if incluir_diagonais:
-            movimentos.extend = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+        movimentos = ORTOGONAIS + DIAGONAIS if incluir_diagonais else ORTOGONAIS
 
         for dx, dy in movimentos:
             nx, ny = x + dx, y + dy
             if 0 <= nx < self.tamanho and 0 <= ny < self.tamanho:
                 vizinhos.append({
                     'pos': (nx, ny),
-                    'conteudo': self.matriz[nx, ny]
+                    'conteudo': self[nx, ny]
                 })
         
         return vizinhos
@@ -98,16 +237,14 @@ class Ambiente:
         """
         CONTA QUANTAS BOMBAS EXISTEM NAS CÉLULAS ADJACENTES
         """
-        vizinhos = self.get_vizinhos(x, y)
-        return sum(1 for v in vizinhos if v['conteudo'] == 'B')
+        return int(self.bombas_adj[x, y])
     
 
     def contar_tesouros_adjacentes(self, x, y):
         """
         CONTA QAUANTOS TESOUROS EXISTEM NAS CÉLULAS ADJACENTES
         """
-        vizinhos = self.get_vizinhos(x, y)
-        return sum(1 for v in vizinhos if v['conteudo'] == 'T')
+        return int(self.tesouros_adj[x, y])
     
     
     def get_estatisticas(self):
@@ -116,10 +253,10 @@ class Ambiente:
         """
         return {
             'tamanho': self.tamanho,
-            'livres': np.sum(self.matriz == 'L'),
-            'bombas': np.sum(self.matriz == 'B'),
-            'tesouros': np.sum(self.matriz == 'T'),
-            'exploradas': np.sum(self.matriz == 'E'),
+            'livres': self.contagem['L'],
+            'bombas': self.contagem['B'],
+            'tesouros': self.contagem['T'],
+            'exploradas': self.contagem['E'],
             'bandeira': self.bandeira_pos,
             'total_celulas': self.tamanho * self.tamanho,
             'tesouros_iniciais': self.tesouros_iniciais,
@@ -131,8 +268,7 @@ class Ambiente:
         """
         VEIRIFICA SE TODAS AS CÉLULAS FORAM EXPLORADAS
         """
-        elementos_nao_explorados = ['L', 'B', 'T']
-        return not np.any(np.isin(self.matriz, elementos_nao_explorados))
+        return self.contagem['L'] + self.contagem['B'] + self.contagem['T'] == 0
     
 
     def reset(self):
@@ -147,19 +283,22 @@ class Ambiente:
         EXPORTA DADOS DO AMBIENTE EM FORMATO ADEQUADO PARA TREINO DE ML.
         RETORNA UMA LISTA DE FEATURES PARA CADA CÉLULA
         """
-        dados = []
-        for i in range(self.tamanho):
-            for j in range(self.tamanho):
-                feature = {
-                    'x': i,
-                    'y': j,
-                    'dist_centro': np.sqrt((i - self.tamanho/2)**2 + (j - self.tamanho/2)**2),
-                    'bombas_adj': self.contar_bombas_adjacentes(i, j),
-                    'tesouros_adj': self.contar_tesouros_adjacentes(i, j),
-                    'tipo': self.matriz[i, j]
-                }
-                dados.append(feature)
-        return dados
+        linhas, colunas = np.indices((self.tamanho, self.tamanho))
+        dist_centro = np.sqrt((linhas - self.tamanho/2)**2 + (colunas - self.tamanho/2)**2)
+
+        #TODAS AS FEATURES VÊM DE ARRAYS DO GRID INTEIRO
+        colunas_features = zip(
+            linhas.ravel().tolist(),
+            colunas.ravel().tolist(),
+            dist_centro.ravel().tolist(),
+            self.bombas_adj.ravel().tolist(),
+            self.tesouros_adj.ravel().tolist(),
+            self.matriz_simbolos().ravel().tolist()
+        )
+        return [
+            {'x': i, 'y': j, 'dist_centro': d, 'bombas_adj': b, 'tesouros_adj': t, 'tipo': tipo}
+            for i, j, d, b, t, tipo in colunas_features
+        ]
     
     def visualizar_terminal(self):
         """
@@ -178,10 +317,11 @@ class Ambiente:
             print(f"{j:2}",end=" ")
         print()
 
+        matriz = self.matriz_simbolos()
         for i in range(self.tamanho):
             print(f"{i:2} ", end="")
             for j in range(self.tamanho):
-                simbolo = simbolos.get(self.matriz[i, j], '?')
+                simbolo = simbolos.get(matriz[i, j], '?')
                 print(simbolo, end=" ")
             print()
         print()
@@ -195,16 +335,79 @@ class Ambiente:
             tamanho = self.tamanho,
             perc_livres = self.perc_livres,
             perc_bombas = self.perc_bombas,
-            perc_tesouros = self.perc_tesouros
+            perc_tesouros = self.perc_tesouros,
+            compacto = self.compacto
         )
 
         novo_ambiente.matriz = self.matriz.copy()
         novo_ambiente.tesouros_iniciais = self.tesouros_iniciais
         novo_ambiente.bombas_iniciais = self.bombas_iniciais
         novo_ambiente.bandeira_pos = self.bandeira_pos
+        novo_ambiente.calcular_mapas_adjacencia()
+        novo_ambiente.recontar_celulas()
         return novo_ambiente
     
 
+    def matriz_simbolos(self):
+        """
+        RETORNA A MATRIZ COMO SÍMBOLOS ('L', 'B', 'T', 'F', 'E'), QUALQUER QUE SEJA O ARMAZENAMENTO
+        """
+        return decodificar_matriz(self.matriz) if self.compacto else self.matriz
+    
+
+    def matriz_codigos(self):
+        """
+        RETORNA A MATRIZ COMO CÓDIGOS uint8, QUALQUER QUE SEJA O ARMAZENAMENTO
+        """
+        return self.matriz if self.compacto else codificar_matriz(self.matriz)
+    
+
+    def simbolos_celulas(self, xs, ys):
+        """
+        RETORNA OS SÍMBOLOS SÓ DAS CÉLULAS (xs, ys), SEM CONVERTER A MATRIZ INTEIRA
+        """
+        valores = self.matriz[xs, ys]
+        return decodificar_matriz(valores) if self.compacto else valores
+    
+
+    def codigos_celulas(self, xs, ys):
+        """
+        RETORNA OS CÓDIGOS uint8 SÓ DAS CÉLULAS (xs, ys), SEM CONVERTER A MATRIZ INTEIRA
+        """
+        valores = self.matriz[xs, ys]
+        return valores if self.compacto else codificar_matriz(valores)
+    
+
+    def tolist(self, compacto = False):
+        """
+        RETORNA A MATRIZ COMO LISTAS ANINHADAS PARA SERIALIZAR EM JSON.
+        COM compacto = True USA OS CÓDIGOS INTEIROS EM VEZ DOS SÍMBOLOS
+        """
+        if compacto:
+            return self.matriz_codigos().tolist()
+        return self.matriz_simbolos().tolist()
+    
+
+    @property
+    def shape(self):
+        return self.matriz.shape
+    
+
+    def __getitem__(self, posicao):
+        """
+        ACESSO ambiente[x, y] COMO NUMA MATRIZ DE SÍMBOLOS
+        """
+        valor = self.matriz[posicao]
+        return SIMBOLOS[valor] if self.compacto else valor
+    
+
+    def __setitem__(self, posicao, valor):
+        """
+        ambiente[x, y] = 'E' PASSA POR set_celula PARA MANTER OS MAPAS ATUALIZADOS
+        """
+        self.set_celula(*posicao, valor)
+    
+
     def __repr__(self):
         stats = self.get_estatisticas()
         return (f"Ambiente ({self.tamanho}x{self.tamanho}, " 
@@ -239,4 +442,11 @@ class Ambiente:
             )
             ambientes.append(ambiente)
 
-        return ambientes
\ No newline at end of file
+        return ambientes
+
+
+def criar_ambiente(tamanho = 10, perc_livres = 50, perc_bombas = 30, perc_tesouros = 20, compacto = False):
+    """
+    CRIA UM NOVO AMBIENTE (ATALHO USADO PELO SERVIDOR FLASK)
+    """
+    return Ambiente(tamanho, perc_livres, perc_bombas, perc_tesouros, compacto)
@@ -1,10 +1,22 @@
 import numpy as np
+import sklearn
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.naive_bayes import GaussianNB
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report
+import hashlib
+import json
+import os
 import pickle
+import struct
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Utilidade de cada tipo de célula: tesouro é o melhor, livre é neutro e bomba é ruim
+UTILIDADES_PADRAO = {'T': 100, 'L': 50, 'B': -50}
+
 
 class ModeloBase:
     """
@@ -16,19 +28,73 @@ class ModeloBase:
         self.modelo = None
         self.treinado = False
         self.acuracia = 0
+        self.tamanho_grid = 10  # Tamanho usado quando nenhum é indicado
+        self.tabelas_scores = {}  # {tamanho do grid: pontuação pré-calculada de cada célula}
+        self.trava_tabelas = threading.Lock()  # O modelo pode ser partilhado por várias threads
+        self.inferencia = None  # Arrays do modelo ajustado usados por predizer()
+        self.modo_pontuacao = 'rotulo'  # 'rotulo' (classe prevista) ou 'esperado' (predict_proba)
+        self.utilidades = dict(UTILIDADES_PADRAO)
+        self.ruido = 10  # Amplitude da aleatoriedade de exploração
+    
+    def __getstate__(self):
+        # O lock não é serializável (pools de processos, cache em disco)
+        estado = self.__dict__.copy()
+        del estado['trava_tabelas']
+        return estado
     
-    def treinar(self, X, y):
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self.trava_tabelas = threading.Lock()
+    
+    def treinar(self, X, y, divisao=None):
         """
         Treina o modelo com dados de entrada.
         
+        Subclasses só precisam criar self.modelo (qualquer classificador
+        com fit/predict); detalhes_treino() acrescenta métricas próprias.
+        
         Args:
             X: Features (array 2D)
             y: Labels (array 1D)
+            divisao: Tupla (X_train, X_test, y_train, y_test) já calculada
+                     (opcional, permite partilhar o mesmo split entre modelos)
         
         Returns:
             dict: Métricas de treinamento
         """
-        raise NotImplementedError("Subclasses devem implementar treinar()")
+        if self.modelo is None:
+            raise NotImplementedError("Subclasses devem definir self.modelo")
+        
+        # Dividir dados em treino e teste
+        if divisao is None:
+            divisao = dividir_dados(X, y)
+        X_train, X_test, y_train, y_test = divisao
+        
+        # Treinar
+        self.modelo.fit(X_train, y_train)
+        self.preparar_inferencia()
+        
+        # Avaliar
+        y_pred = self.modelo.predict(X_test)
+        self.acuracia = accuracy_score(y_test, y_pred)
+        self.treinado = True
+        self.construir_tabela_scores()
+        
+        resultado = {
+            'acuracia': self.acuracia,
+            'relatorio': classification_report(y_test, y_pred, zero_division=0)
+        }
+        resultado.update(self.detalhes_treino())
+        return resultado
+    
+    def detalhes_treino(self):
+        """
+        Métricas extra incluídas no resultado de treinar().
+        
+        Returns:
+            dict: Vazio por padrão
+        """
+        return {}
     
     def prever(self, X):
         """
@@ -42,17 +108,194 @@ class ModeloBase:
         """
         if not self.treinado:
             raise Exception(f"Modelo {self.nome} não foi treinado ainda!")
+        return self.predizer(X)
+    
+    def preparar_inferencia(self):
+        """
+        Extrai do classificador ajustado os arrays usados por predizer().
+        
+        Chamado após o treino e após carregar um modelo salvo.
+        """
+        self.inferencia = None
+    
+    def predizer(self, X):
+        """
+        Predição direta com NumPy, sem a validação e o despacho do sklearn.
+        
+        Dá exatamente as mesmas predições que self.modelo.predict(X), com
+        muito menos custo por chamada para poucas linhas (o caso de cada
+        decisão de um agente). Subclasses sem versão própria usam o sklearn.
+        
+        Args:
+            X: Features (array 2D)
+            
+        Returns:
+            array: Predições
+        """
         return self.modelo.predict(X)
     
-    def escolher_melhor_celula(self, celulas_possiveis):
+    def calcular_features(self, celulas):
+        """
+        Monta a matriz de features para um conjunto de células.
+        
+        Args:
+            celulas: Lista de tuplas (x, y)
+            
+        Returns:
+            array: Matriz (n, 3) com x, y e dist_centro de cada célula
+        """
+        coords = np.asarray(celulas, dtype=float).reshape(-1, 2)
+        cx, cy = coords[:, 0], coords[:, 1]
+        dist_centro = np.sqrt((cx - 5)**2 + (cy - 5)**2)
+        return np.column_stack((cx, cy, dist_centro))
+    
+    def configurar_pontuacao(self, modo=None, utilidades=None, ruido=None):
+        """
+        Ajusta como as células são pontuadas (invalida a tabela de pontuações).
+        
+        Args:
+            modo: 'rotulo' usa a utilidade da classe prevista; 'esperado' usa o
+                  valor esperado sum(P(classe) × utilidade) de predict_proba
+            utilidades: Dict {classe: utilidade} (ex: {'T': 100, 'L': 50, 'B': -50})
+            ruido: Amplitude da aleatoriedade de exploração
+        """
+        if modo is not None:
+            if modo not in ('rotulo', 'esperado'):
+                raise ValueError(f"Modo de pontuação inválido: {modo!r}")
+            self.modo_pontuacao = modo
+        if utilidades is not None:
+            self.utilidades = dict(utilidades)
+        if ruido is not None:
+            self.ruido = ruido
+        self.invalidar_tabela()
+    
+    def pontuar_celulas(self, celulas):
+        """
+        Calcula a pontuação de todas as células numa única predição.
+        
+        Args:
+            celulas: Lista de tuplas (x, y)
+            
+        Returns:
+            array: Pontuação de cada célula (sem aleatoriedade)
+        """
+        features = self.calcular_features(celulas)
+        
+        if self.modo_pontuacao == 'esperado':
+            # Valor esperado: probabilidade de cada classe × utilidade da classe
+            pesos = np.array([self.utilidades.get(c, 0) for c in self.modelo.classes_], dtype=float)
+            return self.modelo.predict_proba(features) @ pesos
+        
+        # Sistema de pontuação baseado na predição
+        predicoes = self.predizer(features)
+        return np.select(
+            [predicoes == classe for classe in self.utilidades],
+            list(self.utilidades.values()),
+            default=0
+        )
+    
+    @property
+    def tabela_scores(self):
+        """
+        Tabela de pontuações do grid de tamanho_grid (None se ainda não calculada).
+        """
+        return self.tabelas_scores.get(self.tamanho_grid)
+    
+    def construir_tabela_scores(self, tamanho=None):
+        """
+        Pré-calcula a pontuação de todas as células de um grid.
+        
+        As features dependem apenas das coordenadas, logo a predição de
+        cada célula não muda enquanto o modelo não for re-treinado. Cada
+        tamanho de grid tem a sua tabela, para que ambientes de tamanhos
+        diferentes possam usar o mesmo modelo.
+        
+        Args:
+            tamanho: Tamanho do grid (usa tamanho_grid se None)
+            
+        Returns:
+            array: Tabela (tamanho, tamanho) de pontuações
+        """
+        tamanho = self.tamanho_grid if tamanho is None else tamanho
+        linhas, colunas = np.indices((tamanho, tamanho))
+        celulas = np.column_stack((linhas.ravel(), colunas.ravel()))
+        tabela = self.pontuar_celulas(celulas).reshape(tamanho, tamanho)
+        with self.trava_tabelas:
+            # Novo dict em vez de alterar o atual: quem já o leu não é afetado
+            self.tabelas_scores = {**self.tabelas_scores, tamanho: tabela}
+        return tabela
+    
+    def obter_tabela(self, tamanho=None):
+        """
+        Retorna a tabela de pontuações de um tamanho de grid, calculando-a na primeira vez.
+        
+        Seguro com várias threads: a tabela é lida uma única vez para uma
+        variável local, por isso uma invalidação concorrente não a apaga
+        a meio da consulta.
+        
+        Args:
+            tamanho: Tamanho do grid (usa tamanho_grid se None)
+            
+        Returns:
+            array: Tabela (tamanho, tamanho) de pontuações
+        """
+        tamanho = self.tamanho_grid if tamanho is None else tamanho
+        tabela = self.tabelas_scores.get(tamanho)
+        if tabela is None:
+            tabela = self.construir_tabela_scores(tamanho)
+        return tabela
+    
+    def invalidar_tabela(self):
+        """
+        Descarta as tabelas de pontuações de todos os tamanhos (ex: após re-treino).
+        """
+        with self.trava_tabelas:
+            self.tabelas_scores = {}
+    
+    def definir_tamanho_grid(self, tamanho):
+        """
+        Ajusta o tamanho de grid usado quando nenhum é indicado.
+        
+        As tabelas já calculadas (de qualquer tamanho) são mantidas.
+        
+        Args:
+            tamanho: Novo tamanho do grid
+        """
+        self.tamanho_grid = tamanho
+    
+    def obter_scores(self, celulas, tamanho=None):
+        """
+        Retorna a pontuação das células consultando a tabela pré-calculada.
+        
+        Células fora da tabela são avaliadas diretamente pelo modelo.
+        
+        Args:
+            celulas: Lista de tuplas (x, y)
+            tamanho: Tamanho do grid das células (usa tamanho_grid se None)
+            
+        Returns:
+            array: Pontuação de cada célula
+        """
+        tabela = self.obter_tabela(tamanho)
+        coords = np.asarray(celulas, dtype=int).reshape(-1, 2)
+        if coords.min() >= 0 and coords.max() < tabela.shape[0]:
+            return tabela[coords[:, 0], coords[:, 1]]
+        return self.pontuar_celulas(celulas)
+    
+    def escolher_melhor_celula(self, celulas_possiveis, tamanho=None):
         """
         Escolhe a melhor célula entre as possíveis usando o modelo ML.
         
         Este é o método CHAVE que faz os agentes usarem ML!
         Compatível com main.py (usa 3 features)
         
+        As pontuações vêm da tabela pré-calculada após o treino,
+        sem chamar o modelo a cada movimento (em qualquer modo de
+        pontuação, ver configurar_pontuacao).
+        
         Args:
             celulas_possiveis: Lista de tuplas (x, y)
+            tamanho: Tamanho do grid do ambiente (usa tamanho_grid se None)
             
         Returns:
             tuple: (x, y) da melhor célula escolhida
@@ -60,57 +303,131 @@ class ModeloBase:
         if not celulas_possiveis:
             return None
         
-        melhor_celula = None
-        melhor_score = -1000
+        scores = self.obter_scores(celulas_possiveis, tamanho)
         
-        for cx, cy in celulas_possiveis:
-            # Calcular features (3 features como no main.py)
-            dist_centro = np.sqrt((cx - 5)**2 + (cy - 5)**2)
-            
-            # Prever tipo de célula usando o modelo ML
-            predicao = self.modelo.predict([[cx, cy, dist_centro]])[0]
-            
-            # Sistema de pontuação baseado na predição
-            score = 0
-            if predicao == 'T':  # Tesouro é o melhor
-                score = 100
-            elif predicao == 'L':  # Livre é neutro
-                score = 50
-            elif predicao == 'B':  # Bomba é ruim
-                score = -50
-            
-            # Adicionar aleatoriedade para exploração (10% de variação)
-            score += np.random.randint(-10, 10)
-            
-            if score > melhor_score:
-                melhor_score = score
-                melhor_celula = (cx, cy)
+        # Adicionar aleatoriedade para exploração (um único sorteio para todas as células)
+        if self.ruido:
+            scores = scores + np.random.randint(-self.ruido, self.ruido, size=len(scores))
+        
+        # argmax devolve o primeiro máximo, como a comparação estrita original
+        return celulas_possiveis[int(np.argmax(scores))]
+    
+    def parametros(self):
+        """
+        Argumentos do construtor que recriam este modelo (gravados no cabeçalho).
+        
+        Returns:
+            dict: Hiperparâmetros do modelo
+        """
+        return {}
+    
+    def exportar_arrays(self):
+        """
+        Exporta os parâmetros ajustados do classificador como arrays NumPy.
         
-        return melhor_celula if melhor_celula else celulas_possiveis[0]
+        Returns:
+            dict: {nome: array}
+        """
+        raise NotImplementedError("Subclasses devem implementar exportar_arrays()")
+    
+    def restaurar_arrays(self, arrays):
+        """
+        Reconstrói o classificador a partir dos arrays de exportar_arrays().
+        
+        Arrays que o classificador usa tal como estão devem ser guardados
+        sem cópia (np.asarray), mantendo as vistas somente-leitura do
+        arquivo mapeado em memória.
+        
+        Args:
+            arrays: Dict {nome: array} (possivelmente mapeados em memória)
+        """
+        raise NotImplementedError("Subclasses devem implementar restaurar_arrays()")
     
     def salvar_modelo(self, caminho):
         """
         Salva o modelo treinado em arquivo.
         
+        O arquivo tem um cabeçalho JSON (tipo, versão do formato, versão do
+        scikit-learn, hiperparâmetros, métricas) seguido dos arrays
+        ajustados, sem pickle.
+        
         Args:
             caminho: Path do arquivo
+            
+        Raises:
+            ValueError: Se a classe do modelo não estiver registada em MODELOS
+            NotImplementedError: Se a classe não implementar exportar_arrays()
         """
-        with open(caminho, 'wb') as f:
-            pickle.dump(self, f)
+        if not self.treinado:
+            raise Exception(f"Modelo {self.nome} não foi treinado ainda!")
+        
+        tipo = next((tipo for tipo, classe in MODELOS.items() if classe is type(self)), None)
+        if tipo is None:
+            raise ValueError(f"{type(self).__name__} não está registado em MODELOS (ver registrar_modelo)")
+        
+        arrays = dict(self.exportar_arrays())
+        if self.tabela_scores is not None:
+            arrays['tabela_scores'] = self.tabela_scores
+        
+        cabecalho = {
+            'tipo': tipo,
+            'sklearn': VERSAO_SKLEARN,
+            'parametros': self.parametros(),
+            'acuracia': float(self.acuracia),
+            'tamanho_grid': int(self.tamanho_grid),
+            'modo_pontuacao': self.modo_pontuacao,
+            'utilidades': self.utilidades,
+            'ruido': self.ruido
+        }
+        gravar_arrays(caminho, cabecalho, arrays)
     
     @staticmethod
-    def carregar_modelo(caminho):
+    def carregar_modelo(caminho, mmap=True):
         """
         Carrega um modelo salvo.
         
+        Arquivos antigos gravados com pickle continuam a ser aceitos.
+        Os arrays internos do classificador dependem da versão do
+        scikit-learn, por isso um arquivo gravado com outra versão é
+        rejeitado (a cache treina o modelo de novo).
+        
+        Com mmap=True, o que o classificador usa tal como está (parâmetros
+        do Naive Bayes, tabela de pontuações) fica como vista somente-leitura
+        do arquivo, sem cópia. O KNN e a árvore reconstroem as próprias
+        estruturas (KD-tree, Tree do sklearn), que copiam os dados.
+        
         Args:
             caminho: Path do arquivo
+            mmap: Se True, os arrays são mapeados em memória em vez de lidos
             
         Returns:
             ModeloBase: Modelo carregado
         """
         with open(caminho, 'rb') as f:
-            return pickle.load(f)
+            if f.read(len(MAGICO)) != MAGICO:
+                f.seek(0)
+                return pickle.load(f)
+        
+        cabecalho, arrays = ler_arrays(caminho, mmap=mmap)
+        if cabecalho.get('sklearn') != VERSAO_SKLEARN:
+            raise ValueError(
+                f"{caminho}: gravado com scikit-learn {cabecalho.get('sklearn')} "
+                f"(instalado {VERSAO_SKLEARN})"
+            )
+        modelo = MODELOS[cabecalho['tipo']](**cabecalho['parametros'])
+        modelo.restaurar_arrays(arrays)
+        modelo.preparar_inferencia()
+        modelo.acuracia = cabecalho['acuracia']
+        modelo.tamanho_grid = cabecalho['tamanho_grid']
+        modelo.modo_pontuacao = cabecalho['modo_pontuacao']
+        modelo.utilidades = cabecalho['utilidades']
+        modelo.ruido = cabecalho['ruido']
+        modelo.treinado = True
+        if 'tabela_scores' in arrays:
+            modelo.tabelas_scores[modelo.tamanho_grid] = np.asarray(arrays['tabela_scores'])
+        else:
+            modelo.construir_tabela_scores()
+        return modelo
 
 
 class ModeloKNN(ModeloBase):
@@ -125,31 +442,52 @@ class ModeloKNN(ModeloBase):
         self.n_neighbors = n_neighbors
         self.modelo = KNeighborsClassifier(n_neighbors=n_neighbors)
     
-    def treinar(self, X, y):
+    def parametros(self):
+        return {'n_neighbors': self.n_neighbors}
+    
+    def exportar_arrays(self):
         """
-        Treina o modelo KNN.
-        
-        Args:
-            X: Features (posição x, y, distância centro, distância borda)
-            y: Labels ('L', 'B', 'T')
+        O KNN guarda os próprios dados de treino (features e índice da classe).
         """
-        # Dividir dados em treino e teste
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
-        
-        # Treinar
-        self.modelo.fit(X_train, y_train)
-        
-        # Avaliar
-        y_pred = self.modelo.predict(X_test)
-        self.acuracia = accuracy_score(y_test, y_pred)
-        self.treinado = True
-        
         return {
-            'acuracia': self.acuracia,
-            'relatorio': classification_report(y_test, y_pred, zero_division=0)
+            'X': self.modelo._fit_X,
+            'y': self.modelo._y,
+            'classes': self.modelo.classes_
+        }
+    
+    def restaurar_arrays(self, arrays):
+        """
+        O KNN é ajustado de novo: o KD-tree é reconstruído (e os dados copiados).
+        """
+        self.modelo.fit(arrays['X'], arrays['classes'][arrays['y']])
+    
+    def preparar_inferencia(self):
+        """
+        Reaproveita o KD-tree do sklearn (a ordem dos vizinhos empatados
+        depende dele) e os índices de classe dos exemplos de treino.
+        """
+        self.inferencia = {
+            'arvore': self.modelo._tree,
+            'y': self.modelo._y,
+            'classes': self.modelo.classes_
         }
+    
+    def predizer(self, X):
+        """
+        Consulta o KD-tree e faz a votação dos k vizinhos com NumPy.
+        """
+        if self.inferencia is None or self.inferencia['arvore'] is None:
+            return self.modelo.predict(X)
+        
+        vizinhos = self.inferencia['arvore'].query(
+            np.asarray(X, dtype=np.float64), k=self.n_neighbors, return_distance=False
+        )
+        votos = self.inferencia['y'][vizinhos]
+        classes = self.inferencia['classes']
+        
+        # Empate na votação: vence a classe de menor índice (como no sklearn)
+        contagem = (votos[:, :, None] == np.arange(len(classes))).sum(axis=1)
+        return classes[np.argmax(contagem, axis=1)]
 
 
 class ModeloArvoreDecisao(ModeloBase):
@@ -159,34 +497,102 @@ class ModeloArvoreDecisao(ModeloBase):
     Funciona bem para regras claras (ex: se dist_centro < X então bomba).
     """
     
-    def __init__(self, max_depth=8):
+    def __init__(self, max_depth=8, min_samples_split=5):
         super().__init__("Árvore de Decisão")
         self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
         self.modelo = DecisionTreeClassifier(
             max_depth=max_depth,
             random_state=42,
-            min_samples_split=5
+            min_samples_split=min_samples_split
         )
     
-    def treinar(self, X, y):
+    def detalhes_treino(self):
         """
-        Treina o modelo de Árvore de Decisão.
+        Inclui a importância de cada feature no resultado do treino.
         """
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
-        )
+        return {'importancia_features': self.modelo.feature_importances_}
+    
+    def parametros(self):
+        return {'max_depth': self.max_depth, 'min_samples_split': self.min_samples_split}
+    
+    def exportar_arrays(self):
+        """
+        A árvore é exportada como um array por campo dos nós, mais os valores
+        (distribuição das classes) de cada nó.
+        """
+        arvore = self.modelo.tree_
+        nos = arvore.__getstate__()['nodes']
+        arrays = {f'no_{campo}': np.ascontiguousarray(nos[campo]) for campo in nos.dtype.names}
+        arrays['valores'] = arvore.value[:, 0, :]
+        arrays['classes'] = self.modelo.classes_
+        arrays['profundidade'] = np.array(arvore.max_depth)
+        return arrays
+    
+    def restaurar_arrays(self, arrays):
+        """
+        A Tree do sklearn copia os nós e os valores para a sua própria memória.
+        """
+        # Tipos internos do sklearn: importados só aqui, para que uma mudança
+        # neles não impeça a importação deste módulo
+        from sklearn.tree._tree import NODE_DTYPE, Tree
         
-        self.modelo.fit(X_train, y_train)
+        classes = np.asarray(arrays['classes'])
+        valores = np.asarray(arrays['valores'])
         
-        y_pred = self.modelo.predict(X_test)
-        self.acuracia = accuracy_score(y_test, y_pred)
-        self.treinado = True
+        nos = np.zeros(len(valores), dtype=np.dtype(NODE_DTYPE))
+        for campo in nos.dtype.names:
+            if f'no_{campo}' in arrays:
+                nos[campo] = arrays[f'no_{campo}']
         
-        return {
-            'acuracia': self.acuracia,
-            'relatorio': classification_report(y_test, y_pred, zero_division=0),
-            'importancia_features': self.modelo.feature_importances_
+        n_features = int(nos['feature'].max()) + 1 if len(nos) else 1
+        arvore = Tree(n_features, np.array([len(classes)], dtype=np.intp), 1)
+        arvore.__setstate__({
+            'max_depth': int(arrays['profundidade']),
+            'node_count': len(nos),
+            'nodes': nos,
+            'values': np.ascontiguousarray(valores[:, None, :])
+        })
+        
+        self.modelo.tree_ = arvore
+        self.modelo.classes_ = classes
+        self.modelo.n_classes_ = len(classes)
+        self.modelo.n_outputs_ = 1
+        self.modelo.n_features_in_ = n_features
+        self.modelo.max_features_ = n_features
+    
+    def preparar_inferencia(self):
+        arvore = self.modelo.tree_
+        self.inferencia = {
+            'esquerda': arvore.children_left,
+            'direita': arvore.children_right,
+            'feature': arvore.feature,
+            'limiar': arvore.threshold,
+            'classe_folha': self.modelo.classes_[np.argmax(arvore.value[:, 0, :], axis=1)]
         }
+    
+    def predizer(self, X):
+        """
+        Percorre a árvore para todas as linhas ao mesmo tempo, um nível por iteração.
+        """
+        if self.inferencia is None:
+            self.preparar_inferencia()
+        arvore = self.inferencia
+        
+        # O sklearn compara as features em float32 com limiares em float64
+        X = np.asarray(X, dtype=np.float32)
+        linhas = np.arange(len(X))
+        nos = np.zeros(len(X), dtype=np.intp)
+        
+        while True:
+            esquerda = arvore['esquerda'][nos]
+            internos = esquerda != -1
+            if not internos.any():
+                break
+            vai_esquerda = X[linhas, arvore['feature'][nos]] <= arvore['limiar'][nos]
+            nos = np.where(internos, np.where(vai_esquerda, esquerda, arvore['direita'][nos]), nos)
+        
+        return arvore['classe_folha'][nos]
 
 
 class ModeloNaiveBayes(ModeloBase):
@@ -200,27 +606,313 @@ class ModeloNaiveBayes(ModeloBase):
         super().__init__("Naive Bayes")
         self.modelo = GaussianNB()
     
-    def treinar(self, X, y):
+    def exportar_arrays(self):
+        """
+        O Naive Bayes gaussiano resume-se a médias, variâncias e priors por classe.
+        """
+        return {
+            'theta': self.modelo.theta_,
+            'var': self.modelo.var_,
+            'priors': self.modelo.class_prior_,
+            'contagem': self.modelo.class_count_,
+            'classes': self.modelo.classes_,
+            'epsilon': np.array(self.modelo.epsilon_)
+        }
+    
+    def restaurar_arrays(self, arrays):
+        """
+        Os parâmetros ficam como vistas do arquivo (predict não os altera;
+        partial_fit exigiria cópias graváveis).
+        """
+        self.modelo.theta_ = np.asarray(arrays['theta'])
+        self.modelo.var_ = np.asarray(arrays['var'])
+        self.modelo.class_prior_ = np.asarray(arrays['priors'])
+        self.modelo.class_count_ = np.asarray(arrays['contagem'])
+        self.modelo.classes_ = np.asarray(arrays['classes'])
+        self.modelo.epsilon_ = float(arrays['epsilon'])
+        self.modelo.n_features_in_ = self.modelo.theta_.shape[1]
+    
+    def preparar_inferencia(self):
+        modelo = self.modelo
+        self.inferencia = {
+            'log_prior': np.log(modelo.class_prior_),
+            'constante': -0.5 * np.sum(np.log(2. * np.pi * modelo.var_), axis=1),
+            'theta': modelo.theta_,
+            'var': modelo.var_,
+            'classes': modelo.classes_
+        }
+    
+    def predizer(self, X):
         """
-        Treina o modelo Naive Bayes.
+        Log-verossimilhança conjunta em forma fechada, para todas as classes de uma vez.
         """
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42
+        if self.inferencia is None:
+            self.preparar_inferencia()
+        nb = self.inferencia
+        
+        X = np.asarray(X, dtype=np.float64)
+        # Mesma ordem de operações do GaussianNB (predições idênticas, inclusive em empates)
+        n_ij = nb['constante'] - 0.5 * np.sum((X[:, None, :] - nb['theta']) ** 2 / nb['var'], axis=2)
+        return nb['classes'][np.argmax(nb['log_prior'] + n_ij, axis=1)]
+
+
+# Tipos de modelo disponíveis (nome curto -> classe)
+MODELOS = {
+    'knn': ModeloKNN,
+    'tree': ModeloArvoreDecisao,
+    'bayes': ModeloNaiveBayes
+}
+
+
+
+def registrar_modelo(nome, classe):
+    """
+    Regista um novo tipo de modelo (passa a ser treinado por treinar_todos_modelos).
+    
+    Args:
+        nome: Nome curto do modelo (ex: 'svm')
+        classe: Subclasse de ModeloBase construível sem argumentos
+    """
+    MODELOS[nome] = classe
+
+
+def dividir_dados(X, y):
+    """
+    Divide os dados em treino e teste (80/20, sempre o mesmo split).
+    
+    Os arrays resultantes ficam somente-leitura para poderem ser
+    partilhados por vários modelos treinados em paralelo.
+    
+    Args:
+        X: Features (array 2D)
+        y: Labels (array 1D)
+    
+    Returns:
+        tuple: (X_train, X_test, y_train, y_test)
+    """
+    divisao = train_test_split(np.asarray(X), np.asarray(y), test_size=0.2, random_state=42)
+    for array in divisao:
+        array.flags.writeable = False
+    return tuple(divisao)
+
+
+# Formato dos arquivos de modelo: MAGICO + tamanho do cabeçalho (uint32) +
+# cabeçalho JSON + arrays, cada um alinhado a ALINHAMENTO bytes
+MAGICO = b'AGML'
+VERSAO_FORMATO = 1
+VERSAO_SKLEARN = sklearn.__version__  # Gravada no cabeçalho; outra versão é rejeitada
+ALINHAMENTO = 64
+
+
+def _alinhar(posicao):
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def gravar_arrays(caminho, cabecalho, arrays):
+    """
+    Grava um cabeçalho JSON e arrays NumPy num único arquivo binário.
+    
+    Args:
+        caminho: Path do arquivo
+        cabecalho: Dict serializável em JSON
+        arrays: Dict {nome: array} (dtypes numéricos, bool ou unicode)
+    """
+    arrays = {nome: np.asarray(array, order='C') for nome, array in arrays.items()}
+    
+    descricao, posicao = {}, 0
+    for nome, array in arrays.items():
+        descricao[nome] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': posicao}
+        posicao = _alinhar(posicao + array.nbytes)
+    
+    texto = json.dumps({**cabecalho, 'versao': VERSAO_FORMATO, 'arrays': descricao}).encode()
+    inicio = _alinhar(len(MAGICO) + 4 + len(texto))
+    
+    with open(caminho, 'wb') as f:
+        f.write(MAGICO + struct.pack('<I', len(texto)) + texto)
+        for nome, array in arrays.items():
+            f.write(b'\0' * (inicio + descricao[nome]['offset'] - f.tell()))
+            f.write(array.tobytes())
+
+
+def ler_arrays(caminho, mmap=True):
+    """
+    Lê um arquivo gravado por gravar_arrays(), verificando a versão do formato.
+    
+    Args:
+        caminho: Path do arquivo
+        mmap: Se True, os arrays são vistas (somente-leitura) de um mapeamento
+              do arquivo em memória; senão o arquivo é lido de uma vez
+    
+    Returns:
+        tuple: (cabecalho, {nome: array})
+    """
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGICO)) != MAGICO:
+            raise ValueError(f"{caminho} não é um arquivo de modelo")
+        tamanho, = struct.unpack('<I', f.read(4))
+        cabecalho = json.loads(f.read(tamanho))
+    
+    if cabecalho.get('versao') != VERSAO_FORMATO:
+        raise ValueError(
+            f"{caminho}: formato de modelo versão {cabecalho.get('versao')} "
+            f"não suportado (esperada {VERSAO_FORMATO})"
         )
+    
+    if mmap:
+        dados = np.memmap(caminho, dtype=np.uint8, mode='r')
+    else:
+        with open(caminho, 'rb') as f:
+            dados = np.frombuffer(f.read(), dtype=np.uint8)
+    
+    inicio = _alinhar(len(MAGICO) + 4 + tamanho)
+    arrays = {}
+    for nome, info in cabecalho.pop('arrays').items():
+        dtype = np.dtype(info['dtype'])
+        n_bytes = dtype.itemsize * int(np.prod(info['shape']))
+        posicao = inicio + info['offset']
+        arrays[nome] = dados[posicao:posicao + n_bytes].view(dtype).reshape(tuple(info['shape']))
+    return cabecalho, arrays
+
+
+# Muda quando o gerador de dados de treino muda (invalida a cache em disco)
+VERSAO_DADOS_TREINO = 2
+
+# Diretório padrão da cache de modelos em disco: AGENTES_CACHE_MODELOS ou a
+# cache do utilizador (independente da pasta de onde o programa é executado)
+DIRETORIO_CACHE = os.environ.get('AGENTES_CACHE_MODELOS') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'agentes', 'modelos'
+)
+
+
+# Falhas ao ler um arquivo da cache, tratadas como ausência do modelo
+ERROS_LEITURA_CACHE = (ValueError, KeyError, TypeError, AttributeError, ImportError,
+                       EOFError, OSError, struct.error, pickle.UnpicklingError)
+
+
+class CacheModelos:
+    """
+    Cache de modelos treinados, em memória e (opcionalmente) em disco.
+    
+    Cada modelo é identificado por uma chave que deve incluir tudo o que
+    influencia o treino (tipo, hiperparâmetros, dados e seed). Em disco os
+    modelos são gravados com salvar_modelo() (ou pickle, para outros objetos)
+    e carregados com os arrays mapeados em memória, podendo ser partilhados
+    entre processos.
+    """
+    
+    def __init__(self, diretorio=DIRETORIO_CACHE):
+        """
+        Args:
+            diretorio: Pasta dos arquivos da cache (None = apenas memória)
+        """
+        self.diretorio = diretorio
+        self.memoria = {}
+    
+    def caminho(self, chave):
+        """
+        Retorna o arquivo em disco correspondente a uma chave.
+        """
+        resumo = hashlib.sha1(repr(chave).encode()).hexdigest()[:16]
+        return os.path.join(self.diretorio, f"{chave[0]}_{resumo}.modelo")
+    
+    def obter(self, chave, criar):
+        """
+        Retorna o modelo da chave, criando-o apenas se não estiver em cache.
         
-        self.modelo.fit(X_train, y_train)
+        Args:
+            chave: Tupla que identifica o modelo (o primeiro item é o tipo)
+            criar: Função sem argumentos que retorna o modelo treinado
+            
+        Returns:
+            Modelo treinado
+        """
+        if chave in self.memoria:
+            return self.memoria[chave]
         
-        y_pred = self.modelo.predict(X_test)
-        self.acuracia = accuracy_score(y_test, y_pred)
-        self.treinado = True
+        caminho = self.caminho(chave) if self.diretorio else None
+        modelo = None
+        if caminho and os.path.exists(caminho):
+            try:
+                modelo = ModeloBase.carregar_modelo(caminho)
+            except ERROS_LEITURA_CACHE:
+                # Arquivo de outra versão, truncado ou com uma classe que já
+                # não existe (ex: pickle de __main__): treinar de novo
+                modelo = None
+        if modelo is None:
+            modelo = criar()
+            if caminho:
+                self.gravar(modelo, caminho)
         
-        return {
-            'acuracia': self.acuracia,
-            'relatorio': classification_report(y_test, y_pred, zero_division=0)
-        }
+        self.memoria[chave] = modelo
+        return modelo
+    
+    def gravar(self, modelo, caminho):
+        """
+        Grava o modelo de forma atômica (outros processos nunca leem um arquivo incompleto).
+        
+        Modelos que salvar_modelo() não consegue gravar (classe fora de
+        MODELOS ou sem exportar_arrays) são gravados com pickle, como
+        qualquer outro objeto.
+        """
+        os.makedirs(self.diretorio, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        os.close(descritor)
+        salvo = False
+        if hasattr(modelo, 'salvar_modelo'):
+            try:
+                modelo.salvar_modelo(temporario)
+                salvo = True
+            except (NotImplementedError, ValueError):
+                pass  # Sem formato de arrays para este modelo
+        if not salvo:
+            with open(temporario, 'wb') as f:
+                pickle.dump(modelo, f)
+        os.replace(temporario, caminho)
+    
+    def limpar(self):
+        """
+        Esvazia a cache em memória (os arquivos em disco são mantidos).
+        """
+        self.memoria.clear()
+
 
+cache_padrao = CacheModelos()
 
-def gerar_dados_treino(num_amostras=2000, tamanho_ambiente=10):
+
+def obter_modelo_treinado(tipo, hiperparametros=None, num_amostras=2000,
+                          tamanho_ambiente=10, seed=42, modo_pontuacao='rotulo', cache=None):
+    """
+    Retorna um modelo treinado, reaproveitando a cache quando possível.
+    
+    Args:
+        tipo: 'knn', 'tree' ou 'bayes'
+        hiperparametros: Argumentos do construtor do modelo (ex: {'n_neighbors': 5})
+        num_amostras: Quantidade de exemplos de treino
+        tamanho_ambiente: Tamanho do grid dos dados de treino
+        seed: Seed dos dados de treino
+        modo_pontuacao: 'rotulo' ou 'esperado' (ver ModeloBase.configurar_pontuacao)
+        cache: CacheModelos a usar (padrão: cache_padrao)
+    
+    Returns:
+        ModeloBase: Modelo treinado
+    """
+    hiperparametros = hiperparametros or {}
+    cache = cache if cache is not None else cache_padrao
+    chave = (tipo, tuple(sorted(hiperparametros.items())), num_amostras, tamanho_ambiente,
+             seed, modo_pontuacao, VERSAO_DADOS_TREINO)
+    
+    def criar():
+        X, y = gerar_dados_treino(num_amostras, tamanho_ambiente, rng=np.random.default_rng(seed))
+        modelo = MODELOS[tipo](**hiperparametros)
+        modelo.configurar_pontuacao(modo=modo_pontuacao)
+        modelo.treinar(X, y)
+        return modelo
+    
+    return cache.obter(chave, criar)
+
+
+def gerar_dados_treino(num_amostras=2000, tamanho_ambiente=10, rng=None):
     """
     Gera dados sintéticos para treino dos modelos.
     
@@ -231,69 +923,76 @@ def gerar_dados_treino(num_amostras=2000, tamanho_ambiente=10):
     
     COMPATÍVEL COM MAIN.PY: Usa 3 features (x, y, dist_centro)
     
+    Todas as amostras são sorteadas de uma vez como arrays e os labels
+    são atribuídos com máscaras (np.select), sem laço por amostra.
+    
     Args:
         num_amostras: Quantidade de exemplos
         tamanho_ambiente: Tamanho do grid (padrão 10x10)
+        rng: numpy.random.Generator ou seed (None = deriva do estado
+             global do np.random, respeitando np.random.seed)
     
     Returns:
         tuple: (X, y) onde X são features e y são labels
     """
-    X = []
-    y = []
-    
-    for _ in range(num_amostras):
-        x = np.random.randint(0, tamanho_ambiente)
-        y_coord = np.random.randint(0, tamanho_ambiente)
-        
-        # Feature principal
-        dist_centro = np.sqrt((x - tamanho_ambiente/2)**2 + (y_coord - tamanho_ambiente/2)**2)
-        
-        # Lógica para gerar labels (simulando padrões)
-        rand = np.random.random()
-        
-        # Bombas mais prováveis no centro
-        if dist_centro < 3:
-            if rand < 0.5:
-                label = 'B'
-            elif rand < 0.8:
-                label = 'L'
-            else:
-                label = 'T'
-        # Tesouros mais prováveis longe do centro
-        elif dist_centro > 6:
-            if rand < 0.4:
-                label = 'T'
-            elif rand < 0.7:
-                label = 'L'
-            else:
-                label = 'B'
-        # Área intermediária: mais células livres
-        else:
-            if rand < 0.6:
-                label = 'L'
-            elif rand < 0.8:
-                label = 'B'
-            else:
-                label = 'T'
-        
-        # USAR 3 FEATURES (compatível com main.py)
-        X.append([x, y_coord, dist_centro])
-        y.append(label)
+    if rng is None:
+        rng = np.random.default_rng(np.random.randint(2**32, dtype=np.uint64))
+    rng = np.random.default_rng(rng)
+    
+    x = rng.integers(0, tamanho_ambiente, size=num_amostras)
+    y_coord = rng.integers(0, tamanho_ambiente, size=num_amostras)
+    rand = rng.random(num_amostras)
+    
+    # Feature principal
+    dist_centro = np.sqrt((x - tamanho_ambiente/2)**2 + (y_coord - tamanho_ambiente/2)**2)
     
-    return np.array(X), np.array(y)
+    centro = dist_centro < 3  # Bombas mais prováveis no centro
+    longe = dist_centro > 6  # Tesouros mais prováveis longe do centro
+    
+    # A primeira condição verdadeira define o label;
+    # a área intermediária tem mais células livres
+    labels = np.select(
+        [
+            centro & (rand < 0.5), centro & (rand < 0.8), centro,
+            longe & (rand < 0.4), longe & (rand < 0.7), longe,
+            rand < 0.6, rand < 0.8
+        ],
+        ['B', 'L', 'T', 'T', 'L', 'B', 'L', 'B'],
+        default='T'
+    )
+    
+    # USAR 3 FEATURES (compatível com main.py)
+    X = np.column_stack((x, y_coord, dist_centro))
+    return X, labels
+
+
+def _treinar_modelo(modelo, divisao):
+    """
+    Treina um modelo sobre um split já calculado (executado no pool).
+    """
+    resultado = modelo.treinar(None, None, divisao=divisao)
+    return modelo, resultado
 
 
-def treinar_todos_modelos(X=None, y=None, verbose=True):
+def treinar_todos_modelos(X=None, y=None, verbose=True, paralelo=None, max_workers=None,
+                          modelos=None):
     """
-    Treina todos os três modelos e retorna resultados comparativos.
+    Treina todos os modelos e retorna resultados comparativos.
+    
+    O split treino/teste é feito uma única vez e partilhado por todos os
+    modelos. Com paralelo='thread' ou 'process' os modelos são treinados
+    ao mesmo tempo e o tempo total fica próximo do modelo mais lento.
     
     Args:
         X: Features (opcional, gera automaticamente se None)
         y: Labels (opcional, gera automaticamente se None)
         verbose: Se True, imprime informações de treino
+        paralelo: None (sequencial), 'thread' ou 'process'
+        max_workers: Tamanho do pool (None = um por modelo)
+        modelos: Dict {nome: ModeloBase} a treinar (padrão: um de cada tipo em MODELOS)
     
     Returns:
-        dict: Dicionário com os 3 modelos treinados
+        dict: Dicionário com os modelos treinados
     """
     if X is None or y is None:
         if verbose:
@@ -302,25 +1001,45 @@ def treinar_todos_modelos(X=None, y=None, verbose=True):
         if verbose:
             print(f"✓ Gerados {len(X)} exemplos")
     
-    modelos = {
-        'knn': ModeloKNN(n_neighbors=5),
-        'tree': ModeloArvoreDecisao(max_depth=8),
-        'bayes': ModeloNaiveBayes()
-    }
+    if modelos is None:
+        modelos = {nome: classe() for nome, classe in MODELOS.items()}
     
-    resultados = {}
+    divisao = dividir_dados(X, y)
     
-    for nome, modelo in modelos.items():
+    if paralelo is None:
+        treinados = {}
+        for nome, modelo in modelos.items():
+            if verbose:
+                print(f"\nTreinando {modelo.nome}...")
+            treinados[nome] = _treinar_modelo(modelo, divisao)
+            if verbose:
+                print(f"✓ Acurácia: {treinados[nome][1]['acuracia']:.4f}")
+    else:
+        if paralelo == 'thread':
+            pool = ThreadPoolExecutor
+        elif paralelo == 'process':
+            pool = ProcessPoolExecutor
+        else:
+            raise ValueError(f"paralelo deve ser None, 'thread' ou 'process' (recebido {paralelo!r})")
+        
         if verbose:
-            print(f"\nTreinando {modelo.nome}...")
-        resultado = modelo.treinar(X, y)
+            print(f"\nTreinando {len(modelos)} modelos em paralelo ({paralelo})...")
+        with pool(max_workers=max_workers or len(modelos)) as executor:
+            futuros = {nome: executor.submit(_treinar_modelo, modelo, divisao)
+                       for nome, modelo in modelos.items()}
+            # Com processos o modelo treinado volta como uma cópia
+            treinados = {nome: futuro.result() for nome, futuro in futuros.items()}
+        if verbose:
+            for modelo, resultado in treinados.values():
+                print(f"✓ {modelo.nome}: acurácia {resultado['acuracia']:.4f}")
+    
+    resultados = {}
+    for nome, (modelo, resultado) in treinados.items():
         resultados[nome] = {
             'modelo': modelo,
             'acuracia': resultado['acuracia'],
             'detalhes': resultado
         }
-        if verbose:
-            print(f"✓ Acurácia: {resultado['acuracia']:.4f}")
     
     return resultados
 
@@ -355,3 +1074,97 @@ def comparar_modelos(resultados):
     return melhor[1]['modelo']
 
 
+class ModeloML(ModeloBase):
+    """
+    Modelo usado pela interface gráfica (main.py): um dos modelos de
+    MODELOS com 4 features (x, y, dist_centro, dist_borda) e os dados de
+    treino próprios da interface.
+    
+    A pontuação, as tabelas por tamanho de grid e configurar_pontuacao são
+    as de ModeloBase; a predição é o predizer() do modelo de MODELOS.
+    Não está registado em MODELOS, por isso a cache grava-o com pickle;
+    fica neste módulo para que esses arquivos possam ser lidos qualquer
+    que seja o script de entrada.
+    """
+    
+    VERSAO_DADOS = 3  # Muda quando a geração dos dados de treino muda (invalida a cache)
+    
+    # Hiperparâmetros do modelo de MODELOS usado por cada tipo
+    HIPERPARAMETROS = {
+        'knn': {'n_neighbors': 3},
+        'tree': {'max_depth': 5, 'min_samples_split': 2},
+        'bayes': {}
+    }
+    
+    def __init__(self, tipo='knn', seed=None, num_amostras=2000):
+        """
+        Args:
+            tipo: Tipo do modelo em MODELOS ('knn', 'tree' ou 'bayes')
+            seed: Seed dos dados de treino (None = deriva do estado global do np.random)
+            num_amostras: Quantidade de exemplos de treino
+        """
+        super().__init__(f"{tipo.upper()} (interface)")
+        self.tipo = tipo
+        self.seed = seed
+        self.num_amostras = num_amostras
+        self.base = MODELOS[tipo](**self.HIPERPARAMETROS.get(tipo, {}))
+        self.modelo = self.base.modelo
+        self.treinar_modelo_base()
+    
+    def preparar_inferencia(self):
+        self.base.preparar_inferencia()
+    
+    def predizer(self, X):
+        return self.base.predizer(X)
+    
+    def gerar_dados(self):
+        """
+        Gera os dados de treino da interface: bombas no centro, tesouros nas bordas.
+        
+        Returns:
+            tuple: (X, y) com as 4 features e os labels
+        """
+        # Sem seed, deriva do estado global (reprodutível com np.random.seed)
+        seed = np.random.randint(2**32, dtype=np.uint64) if self.seed is None else self.seed
+        rng = np.random.default_rng(seed)
+        n = self.num_amostras
+        x = rng.integers(0, 10, size=n)
+        y_coord = rng.integers(0, 10, size=n)
+        rand = rng.random(n)
+        
+        X = self.calcular_features(np.column_stack((x, y_coord)))
+        centro = X[:, 2] < 3
+        borda = X[:, 3] <= 1
+        y = np.select(
+            [centro & (rand < 0.5), centro & (rand < 0.8), centro,
+             borda & (rand < 0.4), borda & (rand < 0.7), borda,
+             rand < 0.6, rand < 0.8],
+            ['B', 'L', 'T', 'T', 'L', 'B', 'L', 'B'],
+            default='T'
+        )
+        return X, y
+    
+    def treinar_modelo_base(self):
+        """
+        Treina o modelo com gerar_dados() (ver ModeloBase.treinar).
+        
+        Returns:
+            dict: Métricas de treinamento
+        """
+        return self.treinar(*self.gerar_dados())
+    
+    def calcular_features(self, celulas):
+        """
+        Monta a matriz de features para um conjunto de células.
+        
+        Args:
+            celulas: Lista de tuplas (x, y)
+            
+        Returns:
+            array: Matriz (n, 4) com x, y, dist_centro e dist_borda de cada célula
+        """
+        coords = np.asarray(celulas, dtype=float).reshape(-1, 2)
+        cx, cy = coords[:, 0], coords[:, 1]
+        dist_centro = np.sqrt((cx - 5)**2 + (cy - 5)**2)
+        dist_borda = np.minimum.reduce([cx, cy, 9 - cx, 9 - cy])
+        return np.column_stack((cx, cy, dist_centro, dist_borda))
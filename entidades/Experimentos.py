@@ -0,0 +1,482 @@
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import StratifiedKFold
+
+from entidades.Ambiente import Ambiente
+from entidades.Agente import Agente, GrupoAgentes
+from entidades.Aprendizado import MODELOS, gerar_dados_treino, obter_modelo_treinado
+from entidades.Tabelas import formatar_tabela
+
+# Mesmos hiperparâmetros usados em treinar_todos_modelos()
+HIPERPARAMETROS = {
+    'knn': {'n_neighbors': 5},
+    'tree': {'max_depth': 8},
+    'bayes': {}
+}
+
+# Valores testados por buscar_hiperparametros()
+GRADE_HIPERPARAMETROS = {
+    'knn': {'n_neighbors': (1, 3, 5, 7, 11, 15)},
+    'tree': {'max_depth': (3, 5, 8, 12), 'min_samples_split': (2, 5, 10, 20)},
+    'bayes': {}
+}
+
+
+def gerar_configuracoes(perc_bombas=(30,), num_agentes=(3,), abordagens=('A',),
+                        mix_modelos=(('knn', 'tree', 'bayes'),), seeds=range(10),
+                        tamanho=10, perc_tesouros=10, max_turnos=500, seed_treino=42,
+                        modo_pontuacao='rotulo'):
+    """
+    Gera a grade de parâmetros das simulações (produto cartesiano).
+    
+    Args:
+        perc_bombas: Percentuais de bombas a testar
+        num_agentes: Quantidades de agentes a testar
+        abordagens: Abordagens ('A', 'B', 'C')
+        mix_modelos: Tuplas de modelos distribuídos entre os agentes
+        seeds: Seeds de cada repetição
+        tamanho: Tamanho do grid
+        perc_tesouros: Percentual fixo de tesouros
+        max_turnos: Limite de turnos por simulação
+        seed_treino: Seed usada no treino dos modelos
+        modo_pontuacao: 'rotulo' ou 'esperado' (ver ModeloBase.configurar_pontuacao)
+        
+    Returns:
+        list: Lista de dicionários de configuração
+    """
+    configuracoes = []
+    for bombas, agentes, abordagem, mix, seed in itertools.product(
+            perc_bombas, num_agentes, abordagens, mix_modelos, seeds):
+        configuracoes.append({
+            'perc_bombas': bombas,
+            'num_agentes': agentes,
+            'abordagem': abordagem,
+            'mix_modelos': tuple(mix),
+            'seed': seed,
+            'tamanho': tamanho,
+            'perc_tesouros': perc_tesouros,
+            'max_turnos': max_turnos,
+            'seed_treino': seed_treino,
+            'modo_pontuacao': modo_pontuacao
+        })
+    return configuracoes
+
+
+def obter_modelos(seed_treino=42, hiperparametros=None, modo_pontuacao='rotulo'):
+    """
+    Retorna os modelos treinados, vindos da cache em memória ou em disco.
+    
+    A cache em disco é partilhada pelos processos do lote, por isso cada
+    modelo é treinado uma única vez por experimento.
+    
+    Args:
+        seed_treino: Seed dos dados de treino
+        hiperparametros: Dict {tipo: hiperparâmetros} que substitui HIPERPARAMETROS
+        modo_pontuacao: Modo de pontuação das células dos modelos
+        
+    Returns:
+        dict: {'knn': ModeloKNN, 'tree': ModeloArvoreDecisao, 'bayes': ModeloNaiveBayes}
+    """
+    hiperparametros = {**HIPERPARAMETROS, **(hiperparametros or {})}
+    return {
+        tipo: obter_modelo_treinado(tipo, hiper, seed=seed_treino, modo_pontuacao=modo_pontuacao)
+        for tipo, hiper in hiperparametros.items()
+    }
+
+
+def verificar_sucesso(abordagem, ambiente, grupo):
+    """
+    Verifica a condição de sucesso de cada abordagem.
+    
+    Args:
+        abordagem: 'A' (>50% tesouros), 'B' (explorar tudo) ou 'C' (bandeira)
+        ambiente: Instância de Ambiente
+        grupo: Instância de GrupoAgentes
+        
+    Returns:
+        bool: True se a abordagem foi cumprida
+    """
+    agentes_vivos = grupo.get_agentes_vivos()
+    
+    if abordagem == 'A':
+        encontrados = sum(ag.tesouros for ag in grupo.agentes.values())
+        total = encontrados + ambiente.contagem['T']
+        return total > 0 and encontrados / total > 0.5
+    
+    if abordagem == 'B':
+        return bool(agentes_vivos) and ambiente.ambiente_completamente_explorado()
+    
+    if abordagem == 'C':
+        return any(ambiente[ag.x, ag.y] == 'F' for ag in agentes_vivos)
+    
+    return False
+
+
+def executar_simulacao(config):
+    """
+    Executa uma simulação completa sem interface gráfica.
+    
+    Args:
+        config: Dicionário gerado por gerar_configuracoes()
+        
+    Returns:
+        dict: Configuração, desfecho e estatísticas por modelo
+    """
+    modelos = obter_modelos(config['seed_treino'], config.get('hiperparametros'),
+                            config.get('modo_pontuacao', 'rotulo'))
+    
+    np.random.seed(config['seed'])
+    random.seed(config['seed'])
+    
+    ambiente = Ambiente(
+        tamanho=config['tamanho'],
+        perc_livres=100 - config['perc_bombas'] - config['perc_tesouros'],
+        perc_bombas=config['perc_bombas'],
+        perc_tesouros=config['perc_tesouros']
+    )
+    
+    # Criar agentes fora das bombas, distribuindo os modelos do mix.
+    # Os agentes recebem o próprio Ambiente para que as explorações
+    # passem por set_celula e mantenham os contadores atualizados.
+    grupo = GrupoAgentes()
+    mix = config['mix_modelos']
+    for i in range(config['num_agentes']):
+        x, y = np.random.randint(0, ambiente.tamanho, 2)
+        while ambiente[x, y] == 'B':
+            x, y = np.random.randint(0, ambiente.tamanho, 2)
+        tipo = mix[i % len(mix)]
+        grupo.registrar_agente(Agente(i, int(x), int(y), ambiente, tipo, modelos[tipo]))
+    
+    turnos = 0
+    sucesso = False
+    while turnos < config['max_turnos']:
+        resultados = grupo.executar_turno()
+        turnos += 1
+        if verificar_sucesso(config['abordagem'], ambiente, grupo):
+            sucesso = True
+            break
+        if not resultados or not grupo.get_agentes_vivos():
+            break
+    
+    melhor_modelo, melhor_score = grupo.get_melhor_modelo()
+    estatisticas = grupo.get_estatisticas()
+    
+    por_modelo = {}
+    for modelo, stats in estatisticas['por_modelo'].items():
+        if stats['agentes']:
+            por_modelo[modelo] = {
+                'agentes': len(stats['agentes']),
+                'tesouros': stats['tesouros'],
+                'mortes': stats['mortes'],
+                'movimentos': stats['movimentos'],
+                'score': (stats['tesouros'] * 10) - (stats['mortes'] * 20)
+            }
+    
+    return {
+        'config': config,
+        'sucesso': sucesso,
+        'turnos': turnos,
+        'melhor_modelo': melhor_modelo,
+        'melhor_score': melhor_score,
+        'por_modelo': por_modelo
+    }
+
+
+def executar_lote(configuracoes, max_workers=None, chunksize=1):
+    """
+    Distribui as simulações por vários processos.
+    
+    Args:
+        configuracoes: Lista gerada por gerar_configuracoes()
+        max_workers: Número de processos (None = todos os núcleos, 1 = sem pool)
+        chunksize: Simulações enviadas de cada vez a um processo
+        
+    Returns:
+        list: Resultados de executar_simulacao(), na ordem das configurações
+    """
+    if max_workers == 1:
+        return [executar_simulacao(config) for config in configuracoes]
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(executar_simulacao, configuracoes, chunksize=chunksize))
+
+
+def agregar_resultados(resultados, agrupar_por=()):
+    """
+    Agrega os resultados por modelo (e opcionalmente por parâmetros).
+    
+    Args:
+        resultados: Lista retornada por executar_lote()
+        agrupar_por: Chaves de configuração usadas para separar grupos
+                     (ex: ('abordagem', 'perc_bombas'))
+        
+    Returns:
+        list: Linhas da tabela, uma por grupo e modelo
+    """
+    grupos = {}
+    for resultado in resultados:
+        chave_config = tuple(resultado['config'][k] for k in agrupar_por)
+        for modelo, stats in resultado['por_modelo'].items():
+            grupo = grupos.setdefault(chave_config + (modelo,), {
+                'scores': [], 'tesouros': [], 'mortes': [], 'vitorias': 0, 'sucessos': 0
+            })
+            grupo['scores'].append(stats['score'])
+            grupo['tesouros'].append(stats['tesouros'])
+            grupo['mortes'].append(stats['mortes'])
+            grupo['vitorias'] += resultado['melhor_modelo'] == modelo
+            grupo['sucessos'] += resultado['sucesso']
+    
+    tabela = []
+    for chave, grupo in sorted(grupos.items()):
+        scores = np.array(grupo['scores'])
+        linha = dict(zip(agrupar_por, chave[:-1]))
+        linha.update({
+            'modelo': chave[-1],
+            'execucoes': len(scores),
+            'score_medio': scores.mean(),
+            'score_desvio': scores.std(ddof=1) if len(scores) > 1 else 0.0,
+            'tesouros_medio': np.mean(grupo['tesouros']),
+            'mortes_medio': np.mean(grupo['mortes']),
+            'vitorias': grupo['vitorias'],
+            'taxa_sucesso': grupo['sucessos'] / len(scores)
+        })
+        tabela.append(linha)
+    return tabela
+
+
+def gerar_candidatos(grade=None):
+    """
+    Expande a grade de hiperparâmetros em candidatos individuais.
+    
+    Args:
+        grade: Dict {tipo: {parametro: valores}} (padrão: GRADE_HIPERPARAMETROS)
+        
+    Returns:
+        list: Tuplas (tipo, hiperparâmetros)
+    """
+    grade = GRADE_HIPERPARAMETROS if grade is None else grade
+    candidatos = []
+    for tipo, parametros in grade.items():
+        nomes = sorted(parametros)
+        for valores in itertools.product(*(parametros[nome] for nome in nomes)):
+            candidatos.append((tipo, dict(zip(nomes, valores))))
+    return candidatos
+
+
+def preparar_folds(X, y, num_folds=5, seed=42):
+    """
+    Calcula uma única vez os folds estratificados da validação cruzada.
+    
+    Os arrays ficam somente-leitura: são enviados uma vez a cada processo
+    e partilhados por todos os candidatos.
+    
+    Args:
+        X: Features
+        y: Labels
+        num_folds: Quantidade de folds
+        seed: Seed do embaralhamento
+        
+    Returns:
+        tuple: (X, y, folds) com folds = [(indices_treino, indices_teste), ...]
+    """
+    X, y = np.array(X), np.array(y)
+    folds = list(StratifiedKFold(num_folds, shuffle=True, random_state=seed).split(X, y))
+    for array in (X, y, *itertools.chain.from_iterable(folds)):
+        array.flags.writeable = False
+    return X, y, folds
+
+
+def _podar(candidatos, vivos, medidas, tolerancia):
+    """
+    Mantém os candidatos a no máximo `tolerancia` da melhor média do seu tipo.
+    """
+    medias = {c: np.mean(medidas[c]) for c in vivos}
+    melhores = {}
+    for c in vivos:
+        tipo = candidatos[c][0]
+        melhores[tipo] = max(melhores.get(tipo, medias[c]), medias[c])
+    return [c for c in vivos if medias[c] >= melhores[candidatos[c][0]] - tolerancia]
+
+
+# Dados da validação cruzada no processo atual (definidos por _iniciar_validacao)
+_dados_validacao = None
+
+
+def _iniciar_validacao(X, y, folds):
+    global _dados_validacao
+    _dados_validacao = (X, y, folds)
+
+
+def _avaliar_fold(tipo, hiperparametros, indice_fold):
+    """
+    Treina um candidato num fold e retorna a acurácia no fold de teste.
+    """
+    X, y, folds = _dados_validacao
+    treino, teste = folds[indice_fold]
+    modelo = MODELOS[tipo](**hiperparametros)
+    modelo.modelo.fit(X[treino], y[treino])
+    return accuracy_score(y[teste], modelo.modelo.predict(X[teste]))
+
+
+def validacao_cruzada(candidatos, X, y, folds, max_workers=None, tolerancia=0.05):
+    """
+    Avalia os candidatos fold a fold, podando os que ficam claramente atrás.
+    
+    Depois de cada fold (exceto o último), candidatos cuja acurácia média
+    fica abaixo da melhor média do mesmo tipo menos a tolerância não são
+    mais avaliados.
+    
+    Args:
+        candidatos: Lista de gerar_candidatos()
+        X, y, folds: Retorno de preparar_folds()
+        max_workers: Número de processos (None = todos os núcleos, 1 = sem pool)
+        tolerancia: Distância máxima da melhor acurácia para continuar
+        
+    Returns:
+        list: Um dict por candidato com tipo, hiperparametros, acuracia, folds e podado
+    """
+    acuracias = [[] for _ in candidatos]
+    vivos = list(range(len(candidatos)))
+    
+    pool = ThreadPoolExecutor if max_workers == 1 else ProcessPoolExecutor
+    with pool(max_workers=max_workers, initializer=_iniciar_validacao,
+              initargs=(X, y, folds)) as executor:
+        for indice_fold in range(len(folds)):
+            futuros = {c: executor.submit(_avaliar_fold, *candidatos[c], indice_fold) for c in vivos}
+            for c, futuro in futuros.items():
+                acuracias[c].append(futuro.result())
+            
+            if indice_fold < len(folds) - 1:
+                vivos = _podar(candidatos, vivos, acuracias, tolerancia)
+    
+    return [{
+        'tipo': tipo,
+        'hiperparametros': hiperparametros,
+        'acuracia': float(np.mean(acuracias[c])),
+        'folds': len(acuracias[c]),
+        'podado': c not in vivos
+    } for c, (tipo, hiperparametros) in enumerate(candidatos)]
+
+
+def avaliar_em_simulacao(candidatos, seeds=range(10), num_blocos=2, tolerancia=20,
+                         max_workers=None, **parametros):
+    """
+    Mede o score de simulação de cada candidato, podando os piores entre blocos.
+    
+    Cada simulação usa apenas agentes do tipo do candidato; o score é o de
+    GrupoAgentes.get_melhor_modelo(): (tesouros × 10) - (mortes × 20).
+    As seeds são divididas em blocos e, após cada bloco (exceto o último),
+    candidatos com média abaixo da melhor do mesmo tipo menos a tolerância
+    param.
+    
+    Args:
+        candidatos: Lista de tuplas (tipo, hiperparâmetros)
+        seeds: Seeds das simulações
+        num_blocos: Em quantos blocos as seeds são divididas
+        tolerancia: Distância máxima do melhor score médio para continuar
+        max_workers: Número de processos (como em executar_lote)
+        **parametros: Repassados a gerar_configuracoes (ex: perc_bombas=(30,))
+        
+    Returns:
+        list: Um dict por candidato com score_medio, simulacoes e podado
+    """
+    scores = [[] for _ in candidatos]
+    vivos = list(range(len(candidatos)))
+    blocos = [bloco for bloco in np.array_split(list(seeds), num_blocos) if len(bloco)]
+    
+    for indice_bloco, bloco in enumerate(blocos):
+        configuracoes, donos = [], []
+        for c in vivos:
+            tipo, hiperparametros = candidatos[c]
+            for config in gerar_configuracoes(mix_modelos=((tipo,),),
+                                              seeds=[int(s) for s in bloco], **parametros):
+                config['hiperparametros'] = {tipo: hiperparametros}
+                configuracoes.append(config)
+                donos.append(c)
+        
+        for c, resultado in zip(donos, executar_lote(configuracoes, max_workers=max_workers)):
+            stats = resultado['por_modelo'].get(candidatos[c][0])
+            scores[c].append(stats['score'] if stats else 0)
+        
+        if indice_bloco < len(blocos) - 1:
+            vivos = _podar(candidatos, vivos, scores, tolerancia)
+    
+    return [{
+        'score_medio': float(np.mean(scores[c])),
+        'simulacoes': len(scores[c]),
+        'podado': c not in vivos
+    } for c in range(len(candidatos))]
+
+
+def buscar_hiperparametros(grade=None, num_amostras=2000, seed_treino=42, num_folds=5,
+                           max_finalistas=3, seeds=range(10), peso_acuracia=100,
+                           max_workers=None, **parametros):
+    """
+    Busca os melhores hiperparâmetros de cada tipo de modelo.
+    
+    1. Validação cruzada sobre os dados de treino, com folds calculados
+       uma vez e poda dos candidatos claramente piores;
+    2. Os max_finalistas mais precisos de cada tipo são avaliados em
+       simulação (também com poda);
+    3. Os finalistas são ordenados pelo critério
+       score_medio + peso_acuracia × acuracia.
+       
+    Args:
+        grade: Grade de hiperparâmetros (padrão: GRADE_HIPERPARAMETROS)
+        num_amostras: Quantidade de exemplos de treino
+        seed_treino: Seed dos dados de treino (a mesma usada nas simulações)
+        num_folds: Quantidade de folds da validação cruzada
+        max_finalistas: Candidatos de cada tipo levados à simulação
+        seeds: Seeds das simulações
+        peso_acuracia: Peso da acurácia no critério final
+        max_workers: Número de processos (None = todos os núcleos, 1 = sem pool)
+        **parametros: Repassados a gerar_configuracoes (ex: perc_bombas=(30,))
+        
+    Returns:
+        dict: {'validacao': linhas da validação cruzada,
+               'finalistas': finalistas ordenados pelo critério,
+               'melhores': {tipo: melhor finalista}}
+    """
+    candidatos = gerar_candidatos(grade)
+    
+    # Mesmos dados que obter_modelo_treinado() usa para treinar os modelos da simulação
+    X, y = gerar_dados_treino(num_amostras, rng=np.random.default_rng(seed_treino))
+    X, y, folds = preparar_folds(X, y, num_folds)
+    validacao = validacao_cruzada(candidatos, X, y, folds, max_workers=max_workers)
+    
+    finalistas = []
+    for tipo in dict.fromkeys(tipo for tipo, _ in candidatos):
+        linhas = [l for l in validacao if l['tipo'] == tipo and not l['podado']]
+        linhas.sort(key=lambda l: l['acuracia'], reverse=True)
+        finalistas.extend(dict(l) for l in linhas[:max_finalistas])
+    
+    simulacao = avaliar_em_simulacao(
+        [(l['tipo'], l['hiperparametros']) for l in finalistas],
+        seeds=seeds, max_workers=max_workers, seed_treino=seed_treino, **parametros
+    )
+    for linha, resultado in zip(finalistas, simulacao):
+        linha['podado'] = resultado['podado']
+        linha['score_medio'] = resultado['score_medio']
+        linha['simulacoes'] = resultado['simulacoes']
+        linha['criterio'] = resultado['score_medio'] + peso_acuracia * linha['acuracia']
+    
+    finalistas.sort(key=lambda l: (not l['podado'], l['criterio']), reverse=True)
+    melhores = {}
+    for linha in finalistas:
+        melhores.setdefault(linha['tipo'], linha)
+    
+    return {'validacao': validacao, 'finalistas': finalistas, 'melhores': melhores}
+
+
+if __name__ == "__main__":
+    configuracoes = gerar_configuracoes(
+        perc_bombas=(20, 50, 80),
+        abordagens=('A', 'B', 'C'),
+        seeds=range(20)
+    )
+    resultados = executar_lote(configuracoes, chunksize=8)
+    print(formatar_tabela(agregar_resultados(resultados, agrupar_por=('abordagem',))))
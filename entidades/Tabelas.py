@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def formatar_tabela(tabela):
+    """
+    Formata uma lista de linhas (dicts com as mesmas chaves) como texto.
+    
+    Args:
+        tabela: Lista de dicts, ex: a retornada por agregar_resultados()
+        
+    Returns:
+        str: Tabela pronta para imprimir
+    """
+    if not tabela:
+        return ""
+    
+    colunas = list(tabela[0].keys())
+    linhas = [[f"{v:.2f}" if isinstance(v, (float, np.floating)) else str(v)
+               for v in (linha[c] for c in colunas)] for linha in tabela]
+    larguras = [max(len(c), *(len(l[i]) for l in linhas)) for i, c in enumerate(colunas)]
+    
+    texto = [" | ".join(c.ljust(w) for c, w in zip(colunas, larguras))]
+    texto.append("-+-".join("-" * w for w in larguras))
+    for linha in linhas:
+        texto.append(" | ".join(v.ljust(w) for v, w in zip(linha, larguras)))
+    return "\n".join(texto)
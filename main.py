@@ -2,11 +2,14 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext
 import numpy as np
 import time
+import logging
 import threading
+import traceback
+from collections import deque
 from datetime import datetime
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.naive_bayes import GaussianNB
+from logging.handlers import RotatingFileHandler
+from entidades.Agente import MapaConhecimento
+from entidades.Aprendizado import CacheModelos, ModeloML
 
 class Agente:
     def __init__(self, id, x, y, modelo_tipo, modelo_ml=None):
@@ -16,7 +19,7 @@ class Agente:
         self.tesouros = 0
         self.bombas_desativadas = 0
         self.vivo = True
-        self.conhecimento = set()
+        self.conhecimento = None  # MapaConhecimento partilhado pelo motor
         self.modelo_tipo = modelo_tipo
         self.modelo_ml = modelo_ml  # Modelo ML real treinado
         self.cor = self._gerar_cor(id)
@@ -47,76 +50,395 @@ class Ambiente:
         fx, fy = np.random.randint(0, self.tamanho, 2)
         self.matriz[fx, fy] = 'F'
         self.tesouros_iniciais = np.sum(self.matriz == 'T')
+        
+        # Contadores por tipo de célula, mantidos por set_celula
+        simbolos, quantidades = np.unique(self.matriz, return_counts=True)
+        self.contagem = dict.fromkeys(['L', 'B', 'T', 'F', 'E'], 0)
+        self.contagem.update(zip(simbolos.tolist(), quantidades.tolist()))
+    
+    def set_celula(self, x, y, valor):
+        antigo = self.matriz[x, y]
+        if antigo != valor:
+            self.matriz[x, y] = valor
+            self.contagem[antigo] -= 1
+            self.contagem[valor] += 1
+
+# Modelos treinados reaproveitados entre simulações (memória + disco)
+cache_modelos = CacheModelos()
+
+def obter_modelo_ml(tipo, seed=42, num_amostras=2000):
+    """Devolve um ModeloML treinado, treinando apenas se não estiver em cache"""
+    parametros = ModeloML.HIPERPARAMETROS.get(tipo, {})
+    chave = (tipo, tuple(sorted(parametros.items())), num_amostras, seed, ModeloML.VERSAO_DADOS)
+    return cache_modelos.obter(chave, lambda: ModeloML(tipo, seed, num_amostras))
 
-class ModeloML:
-    def __init__(self, tipo='knn'):
-        self.tipo = tipo
-        if tipo == 'knn':
-            self.modelo = KNeighborsClassifier(n_neighbors=3)
-        elif tipo == 'tree':
-            self.modelo = DecisionTreeClassifier(max_depth=5, random_state=42)
-        elif tipo == 'bayes':
-            self.modelo = GaussianNB()
-        self.treinar_modelo_base()
-    
-    def treinar_modelo_base(self):
-        X = []
-        y = []
-        # Gerar dados de treino mais realistas
-        for _ in range(2000):
-            x, y_coord = np.random.randint(0, 10, 2)
-            distancia_centro = np.sqrt((x-5)**2 + (y_coord-5)**2)
-            distancia_borda = min(x, y_coord, 9-x, 9-y_coord)
+class MotorSimulacao:
+    """
+    Motor da simulação sem dependência do Tkinter.
+    
+    Executa as abordagens A/B/C à velocidade máxima e emite eventos
+    (evento, dados) para observadores registrados, como a interface gráfica.
+    """
+    
+    MODELOS_TIPOS = ['knn', 'tree', 'bayes']
+    
+    def __init__(self, abordagem='A', num_agentes=2, perc_bombas=50, tamanho=10, modelos_ml=None):
+        self.abordagem = abordagem
+        self.num_agentes = num_agentes
+        self.perc_bombas = perc_bombas
+        self.tamanho = tamanho
+        self.modelos_ml = modelos_ml
+        self.ambiente = None
+        self.agentes = []
+        self.estatisticas_modelos = {}
+        self.observadores = []
+        self.turno = 0
+        self.finalizada = False
+        self.sucesso = False
+    
+    def adicionar_observador(self, callback):
+        """Registra um callback(evento, dados) chamado a cada evento"""
+        self.observadores.append(callback)
+    
+    def emitir(self, evento, **dados):
+        for callback in self.observadores:
+            callback(evento, dados)
+    
+    def log(self, mensagem, nivel=logging.INFO):
+        self.emitir('log', mensagem=mensagem, nivel=nivel)
+    
+    def iniciar(self):
+        """Cria ambiente, modelos e agentes de uma nova simulação"""
+        self.turno = 0
+        self.finalizada = False
+        self.sucesso = False
+        
+        self.ambiente = Ambiente(tamanho=self.tamanho, perc_bombas=self.perc_bombas)
+        self.log(f"🚀 Simulação iniciada - Abordagem {self.abordagem}")
+        
+        # Obter modelos ML (treinados só na primeira vez, depois vêm da cache)
+        if self.modelos_ml is None:
+            self.log("🧠 Carregando modelos de Machine Learning...")
+            inicio = time.time()
+            self.modelos_ml = {tipo: obter_modelo_ml(tipo) for tipo in self.MODELOS_TIPOS}
+            self.log(f"✅ Modelos KNN, Tree e Bayes prontos ({time.time() - inicio:.2f}s)")
+        
+        self.estatisticas_modelos = {
+            modelo: {'tesouros': 0, 'mortes': 0, 'movimentos': 0, 'agentes': []}
+            for modelo in self.MODELOS_TIPOS
+        }
+        self.emitir('ambiente_criado', ambiente=self.ambiente)
+        
+        # Conhecimento partilhado: todos os agentes apontam para o mesmo mapa
+        self.conhecimento = MapaConhecimento((self.tamanho, self.tamanho))
+        
+        # Criar agentes com modelos ML
+        self.agentes = []
+        for i in range(self.num_agentes):
+            x, y = np.random.randint(0, self.tamanho, 2)
+            while self.ambiente.matriz[x, y] == 'B':
+                x, y = np.random.randint(0, self.tamanho, 2)
             
-            # Lógica: bombas no centro, tesouros nas bordas
-            rand = np.random.random()
-            if distancia_centro < 3:
-                label = 'B' if rand < 0.5 else ('L' if rand < 0.8 else 'T')
-            elif distancia_borda <= 1:
-                label = 'T' if rand < 0.4 else ('L' if rand < 0.7 else 'B')
-            else:
-                label = 'L' if rand < 0.6 else ('B' if rand < 0.8 else 'T')
+            modelo_tipo = self.MODELOS_TIPOS[i % len(self.MODELOS_TIPOS)]
+            agente = Agente(i, x, y, modelo_tipo, self.modelos_ml[modelo_tipo])
+            agente.conhecimento = self.conhecimento
+            self.agentes.append(agente)
+            self.estatisticas_modelos[modelo_tipo]['agentes'].append(i)
             
-            X.append([x, y_coord, distancia_centro, distancia_borda])
-            y.append(label)
+            self.emitir('agente_criado', agente=agente,
+                        mensagem=f"👤 Agente {i} criado ({modelo_tipo.upper()}) em ({x},{y})")
         
-        self.modelo.fit(X, y)
+        self.log(f"💣 {self.perc_bombas}% de bombas")
+        self.log(f"💎 {self.ambiente.tesouros_iniciais} tesouros disponíveis")
     
-    def escolher_melhor_celula(self, celulas_possiveis):
-        """Escolhe a melhor célula usando o modelo ML"""
-        if not celulas_possiveis:
-            return None
+    def passo(self):
+        """
+        Executa um turno para todos os agentes vivos.
+        
+        Returns:
+            bool: True se a simulação deve continuar
+        """
+        if self.finalizada:
+            return False
+        
+        agentes_vivos = [ag for ag in self.agentes if ag.vivo]
+        if not agentes_vivos:
+            self.log("❌ Todos os agentes foram destruídos!", logging.WARNING)
+            self.finalizada = True
+            return False
+        
+        moveu = False
+        for agente in agentes_vivos:
+            moveu = self.executar_movimento_agente(agente) or moveu
+        
+        self.turno += 1
+        self.emitir('turno', turno=self.turno)
+        
+        if self.verificar_sucesso():
+            self.finalizada = True
+            return False
+        
+        if not moveu:
+            self.log("⚠️ Nenhum agente tem movimentos disponíveis", logging.WARNING)
+            self.finalizada = True
+            return False
+        
+        return True
+    
+    def executar(self, max_turnos=None):
+        """Executa a simulação até terminar (ou até max_turnos) e devolve o resumo"""
+        if self.ambiente is None:
+            self.iniciar()
+        while self.passo():
+            if max_turnos is not None and self.turno >= max_turnos:
+                break
+        return self.resumo()
+    
+    def executar_movimento_agente(self, agente):
+        """
+        Executa um movimento de um agente USANDO O MODELO ML.
         
-        melhor_celula = None
-        melhor_score = -1000
+        Returns:
+            bool: True se o agente se moveu
+        """
+        movimentos = [(0,1), (1,0), (0,-1), (-1,0), (1,1), (1,-1), (-1,1), (-1,-1)]
+        tamanho = self.ambiente.tamanho
         
-        for cx, cy in celulas_possiveis:
-            dist_centro = np.sqrt((cx-5)**2 + (cy-5)**2)
-            dist_borda = min(cx, cy, 9-cx, 9-cy)
-            
-            # Prever tipo de célula
-            predicao = self.modelo.predict([[cx, cy, dist_centro, dist_borda]])[0]
-            
-            # Sistema de pontuação
-            score = 0
-            if predicao == 'T':  # Tesouro é o melhor
-                score = 100
-            elif predicao == 'L':  # Livre é neutro
-                score = 50
-            elif predicao == 'B':  # Bomba é ruim
-                score = -50
-            
-            # Adicionar aleatoriedade para exploração
-            score += np.random.randint(-10, 10)
-            
+        # Filtrar movimentos possíveis
+        possiveis = []
+        for dx, dy in movimentos:
+            nx, ny = agente.x + dx, agente.y + dy
+            if (0 <= nx < tamanho and 0 <= ny < tamanho and 
+                (nx, ny) not in agente.conhecimento):
+                possiveis.append((nx, ny))
+        
+        if not possiveis:
+            # Sem vizinhos novos: dar um passo em direção à fronteira mais próxima
+            alvo = self.conhecimento.mais_proxima_desconhecida(agente.x, agente.y)
+            if alvo is None:
+                return False
+            nx = agente.x + int(np.sign(alvo[0] - agente.x))
+            ny = agente.y + int(np.sign(alvo[1] - agente.y))
+        
+        # ========== USAR MODELO ML PARA ESCOLHER ========== #
+        elif agente.modelo_ml:
+            nx, ny = agente.modelo_ml.escolher_melhor_celula(possiveis, tamanho=tamanho)
+        else:
+            # Fallback aleatório (não deveria acontecer)
+            nx, ny = possiveis[np.random.randint(len(possiveis))]
+        # ================================================== #
+        
+        celula = self.ambiente.matriz[nx, ny]
+        nome = f"Agente {agente.id} ({agente.modelo_tipo.upper()})"
+        
+        # Incrementar contador de movimentos do modelo
+        self.estatisticas_modelos[agente.modelo_tipo]['movimentos'] += 1
+        agente.movimentos += 1
+        
+        # Mover agente
+        origem = (agente.x, agente.y)
+        agente.x, agente.y = nx, ny
+        self.emitir('movimento', agente=agente, origem=origem, destino=(nx, ny))
+        
+        # Compartilhar conhecimento (mapa comum a todos os agentes)
+        self.conhecimento.add((nx, ny))
+        
+        # Processar célula
+        if celula == 'B':
+            self.ambiente.set_celula(nx, ny, 'E')
+            if agente.bombas_desativadas > 0:
+                agente.bombas_desativadas -= 1
+                self.emitir('desativou_bomba', agente=agente, x=nx, y=ny,
+                            mensagem=f"🛡️ {nome} desativou bomba ({nx},{ny})")
+            else:
+                agente.vivo = False
+                self.estatisticas_modelos[agente.modelo_tipo]['mortes'] += 1
+                self.emitir('destruido', agente=agente, x=nx, y=ny,
+                            mensagem=f"💥 {nome} DESTRUÍDO em ({nx},{ny})")
+        
+        elif celula == 'T':
+            agente.tesouros += 1
+            agente.bombas_desativadas += 1
+            self.estatisticas_modelos[agente.modelo_tipo]['tesouros'] += 1
+            self.ambiente.set_celula(nx, ny, 'E')
+            self.emitir('tesouro', agente=agente, x=nx, y=ny,
+                        mensagem=f"💎 {nome} achou TESOURO ({nx},{ny}) [Total: {agente.tesouros}]")
+        
+        elif celula == 'F':
+            self.emitir('bandeira', agente=agente, x=nx, y=ny,
+                        mensagem=f"🏁 {nome} achou BANDEIRA ({nx},{ny})!")
+        
+        elif celula == 'L':
+            self.ambiente.set_celula(nx, ny, 'E')
+        
+        return True
+    
+    def verificar_sucesso(self):
+        tesouros_encontrados = sum(ag.tesouros for ag in self.agentes)
+        tesouros_restantes = self.ambiente.contagem['T']
+        total_tesouros = tesouros_encontrados + tesouros_restantes
+        agentes_vivos = sum(1 for ag in self.agentes if ag.vivo)
+        
+        sucesso = False
+        
+        if self.abordagem == 'A':
+            if total_tesouros > 0:
+                perc = (tesouros_encontrados / total_tesouros) * 100
+                if perc > 50:
+                    sucesso = True
+                    self.log(f"✅ SUCESSO! {perc:.1f}% dos tesouros encontrados!")
+        
+        elif self.abordagem == 'B':
+            contagem = self.ambiente.contagem
+            todas_exploradas = contagem['L'] + contagem['B'] + contagem['T'] == 0
+            if todas_exploradas and agentes_vivos > 0:
+                sucesso = True
+                self.log(f"✅ SUCESSO! Ambiente explorado com {agentes_vivos} agente(s)!")
+        
+        elif self.abordagem == 'C':
+            for ag in self.agentes:
+                if ag.vivo and self.ambiente.matriz[ag.x, ag.y] == 'F':
+                    sucesso = True
+                    self.log(f"✅ SUCESSO! Agente {ag.id} encontrou a bandeira!")
+                    break
+        
+        self.sucesso = sucesso
+        return sucesso or agentes_vivos == 0
+    
+    def scores_modelos(self):
+        """Score por modelo: tesouros valem +10, mortes valem -20"""
+        return {
+            modelo: (stats['tesouros'] * 10) - (stats['mortes'] * 20)
+            for modelo, stats in self.estatisticas_modelos.items()
+        }
+    
+    def get_melhor_modelo(self):
+        melhor_modelo = None
+        melhor_score = -1000
+        for modelo, score in self.scores_modelos().items():
             if score > melhor_score:
                 melhor_score = score
-                melhor_celula = (cx, cy)
+                melhor_modelo = modelo
+        return (melhor_modelo, melhor_score)
+    
+    def resumo(self):
+        """Resumo final da simulação (útil para execuções em lote)"""
+        return {
+            'abordagem': self.abordagem,
+            'sucesso': self.sucesso,
+            'turnos': self.turno,
+            'agentes_vivos': sum(1 for ag in self.agentes if ag.vivo),
+            'tesouros': sum(ag.tesouros for ag in self.agentes),
+            'tesouros_iniciais': int(self.ambiente.tesouros_iniciais),
+            'exploradas': self.ambiente.contagem['E'],
+            'estatisticas_modelos': self.estatisticas_modelos,
+            'scores': self.scores_modelos(),
+            'melhor_modelo': self.get_melhor_modelo()
+        }
+
+class PainelLogs:
+    """
+    Logs da interface: buffer circular de capacidade fixa, escrita no widget
+    em lote (uma vez por ciclo do Tk), filtro por nível e cópia opcional
+    para arquivo com rotação.
+    """
+    
+    NIVEIS = {
+        'DEBUG': logging.DEBUG,
+        'INFO': logging.INFO,
+        'WARNING': logging.WARNING,
+        'ERROR': logging.ERROR
+    }
+    
+    def __init__(self, widget, capacidade=1000, nivel=logging.INFO, arquivo=None,
+                 max_bytes=1_000_000, num_backups=3):
+        self.widget = widget
+        self.capacidade = capacidade
+        self.nivel = nivel
+        self.entradas = deque(maxlen=capacidade)  # (nivel, texto) de todos os níveis
+        self.pendentes = deque(maxlen=capacidade)  # Textos ainda não escritos no widget
+        self.flush_agendado = False
+        
+        self.linhas_visiveis = deque()  # Número de linhas de cada entrada no widget
+        
+        self.logger = None
+        self.handler = None
+        if arquivo:
+            self.logger = logging.getLogger(f"{__name__}.logs.{id(self)}")
+            self.logger.setLevel(logging.DEBUG)
+            self.logger.propagate = False
+            self.handler = RotatingFileHandler(arquivo, maxBytes=max_bytes,
+                                               backupCount=num_backups, encoding='utf-8')
+            self.handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+            self.logger.addHandler(self.handler)
+            # O arquivo é fechado junto com o widget
+            widget.bind('<Destroy>', self.ao_destruir_widget, add='+')
+    
+    def adicionar(self, mensagem, nivel=logging.INFO):
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        texto = f"[{timestamp}] {mensagem}\n"
+        self.entradas.append((nivel, texto))
+        
+        if self.logger:
+            self.logger.log(nivel, mensagem)
+        
+        if nivel >= self.nivel:
+            self.pendentes.append(texto)
+            # Todas as mensagens do mesmo ciclo do Tk são escritas juntas
+            if not self.flush_agendado:
+                self.flush_agendado = True
+                self.widget.after_idle(self.descarregar)
+    
+    def descarregar(self):
+        """Escreve no widget, numa única inserção, as mensagens pendentes"""
+        self.flush_agendado = False
+        if not self.pendentes:
+            return
         
-        return melhor_celula if melhor_celula else celulas_possiveis[0]
+        texto = ''.join(self.pendentes)
+        self.linhas_visiveis.extend(pendente.count('\n') for pendente in self.pendentes)
+        self.pendentes.clear()
+        self.widget.insert(tk.END, texto)
+        
+        # Manter no widget apenas as últimas entradas (uma entrada pode ter várias linhas)
+        excesso = 0
+        while len(self.linhas_visiveis) > self.capacidade:
+            excesso += self.linhas_visiveis.popleft()
+        if excesso > 0:
+            self.widget.delete('1.0', f'{excesso + 1}.0')
+        self.widget.see(tk.END)
+    
+    def definir_nivel(self, nivel):
+        """Troca o filtro e reescreve o widget a partir do buffer"""
+        self.nivel = nivel
+        self.widget.delete('1.0', tk.END)
+        self.linhas_visiveis.clear()
+        self.pendentes.clear()
+        self.pendentes.extend(texto for n, texto in self.entradas if n >= nivel)
+        self.descarregar()
+    
+    def limpar(self):
+        self.entradas.clear()
+        self.pendentes.clear()
+        self.linhas_visiveis.clear()
+        self.widget.delete('1.0', tk.END)
+    
+    def ao_destruir_widget(self, event):
+        # <Destroy> também chega dos filhos do widget
+        if event.widget is self.widget:
+            self.destroy()
+    
+    def destroy(self):
+        """Fecha o arquivo de log e retira o handler do logger"""
+        if self.handler is None:
+            return
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+        self.handler = None
+        self.logger = None
 
 class SistemaAgentesColaborativos:
-    def __init__(self, root):
+    def __init__(self, root, arquivo_log=None):
         self.root = root
         self.root.title("Sistema de Agentes Colaborativos - IA 2024/2025")
         self.root.geometry("1400x900")
@@ -129,12 +451,27 @@ class SistemaAgentesColaborativos:
         self.abordagem = 'A'
         self.num_agentes = 2
         self.perc_bombas = 50
-        self.logs = []
+        self.arquivo_log = arquivo_log  # Cópia opcional dos logs em disco (com rotação)
         self.tempo_inicio = 0
         self.velocidade = 500  # Milissegundos entre movimentos
         self.mostrar_rastros = True  # Mostrar trilhas dos agentes
+        self.motor = None  # Motor headless da simulação
+        
+        # Simulação numa thread própria; a interface desenha a taxa fixa.
+        # Os movimentos são fundidos por frame (células alteradas e agentes movidos);
+        # os restantes eventos ficam numa fila limitada
+        self.eventos_pendentes = deque(maxlen=self.MAX_EVENTOS_PENDENTES)
+        self.destinos_pendentes = set()  # Células de destino dos movimentos desde o último frame
+        self.agentes_pendentes = {}  # id -> agente movido desde o último frame
+        self.trava_eventos = threading.Lock()  # Partilhados com a thread de simulação
+        self.thread_simulacao = None
+        self.parar_thread = None
+        self.simulacao_terminada = False
+        self.frame_agendado = None
         
         self.tamanho_celula = 45  # Reduzido de 50 para 45
+        self.celulas_canvas = {}  # (i, j) -> (retângulo, texto) no canvas
+        self.celulas_alteradas = set()  # Células a redesenhar no próximo turno
         self.criar_interface()
     
     def criar_interface(self):
@@ -199,7 +536,7 @@ class SistemaAgentesColaborativos:
         # Velocidade
         tk.Label(control_frame, text="Velocidade:", font=('Arial', 10, 'bold'),
                 bg='white').grid(row=3, column=0, sticky='w', pady=5)
-        self.velocidade_scale = tk.Scale(control_frame, from_=100, to=1000, orient=tk.HORIZONTAL,
+        self.velocidade_scale = tk.Scale(control_frame, from_=0, to=1000, orient=tk.HORIZONTAL,
                                          bg='white', length=200, command=self.atualizar_velocidade,
                                          resolution=100)
         self.velocidade_scale.set(500)
@@ -300,10 +637,21 @@ class SistemaAgentesColaborativos:
                                   font=('Arial', 12, 'bold'), bg='white', padx=10, pady=10)
         logs_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5)
         
+        nivel_frame = tk.Frame(logs_frame, bg='white')
+        nivel_frame.pack(fill=tk.X, pady=(0, 5))
+        tk.Label(nivel_frame, text="Nível:", font=('Arial', 9, 'bold'),
+                bg='white').pack(side=tk.LEFT)
+        self.nivel_log_var = tk.StringVar(value='INFO')
+        nivel_combo = ttk.Combobox(nivel_frame, textvariable=self.nivel_log_var,
+                                   values=list(PainelLogs.NIVEIS), state='readonly', width=10)
+        nivel_combo.pack(side=tk.LEFT, padx=5)
+        nivel_combo.bind('<<ComboboxSelected>>', self.atualizar_nivel_log)
+        
         self.log_text = scrolledtext.ScrolledText(logs_frame, width=50, height=30,
                                                   font=('Courier', 9), bg='#2c3e50', 
                                                   fg='#ecf0f1', wrap=tk.WORD)
         self.log_text.pack(fill=tk.BOTH, expand=True)
+        self.painel_logs = PainelLogs(self.log_text, arquivo=self.arquivo_log)
         
         # Legenda
         legenda_frame = tk.Frame(main_frame, bg='white', padx=10, pady=10)
@@ -342,46 +690,50 @@ class SistemaAgentesColaborativos:
         if not self.mostrar_rastros:
             self.canvas.delete('rastro')  # Limpa rastros existentes
     
-    def adicionar_log(self, mensagem):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {mensagem}\n"
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
-        self.logs.append(log_entry)
+    def adicionar_log(self, mensagem, nivel=logging.INFO):
+        self.painel_logs.adicionar(mensagem, nivel)
+    
+    def atualizar_nivel_log(self, event=None):
+        self.painel_logs.definir_nivel(PainelLogs.NIVEIS[self.nivel_log_var.get()])
+    
+    CORES_CELULAS = {
+        'L': '#c8e6c9',
+        'B': '#ffcdd2',
+        'T': '#fff9c4',
+        'F': '#e1bee7',
+        'E': '#e0e0e0'
+    }
+    SIMBOLOS_CELULAS = {'B': "💣", 'T': "💎", 'F': "🏁"}
     
     def desenhar_grid_ambiente(self):
-        """Desenha o grid do ambiente (células de fundo)"""
-        cores_celulas = {
-            'L': '#c8e6c9',
-            'B': '#ffcdd2',
-            'T': '#fff9c4',
-            'F': '#e1bee7',
-            'E': '#e0e0e0'
-        }
+        """Cria uma única vez os itens do canvas de cada célula (fundo + símbolo)"""
+        self.celulas_canvas = {}
+        tamanho = self.ambiente.tamanho
         
-        for i in range(10):
-            for j in range(10):
+        for i in range(tamanho):
+            for j in range(tamanho):
                 x1 = j * self.tamanho_celula
                 y1 = i * self.tamanho_celula
                 x2 = x1 + self.tamanho_celula
                 y2 = y1 + self.tamanho_celula
                 
-                celula = self.ambiente.matriz[i, j]
-                cor = cores_celulas.get(celula, 'white')
-                
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=cor, outline='#95a5a6', 
-                                            width=1, tags='grid')
+                retangulo = self.canvas.create_rectangle(x1, y1, x2, y2, outline='#95a5a6',
+                                                         width=1, tags='grid')
                 
                 # Símbolos (tamanho ajustado para 45px)
                 cx = x1 + self.tamanho_celula/2
                 cy = y1 + self.tamanho_celula/2
+                texto = self.canvas.create_text(cx, cy, font=('Arial', 14), tags='grid')
                 
-                if celula == 'B':
-                    self.canvas.create_text(cx, cy, text="💣", font=('Arial', 14), tags='grid')
-                elif celula == 'T':
-                    self.canvas.create_text(cx, cy, text="💎", font=('Arial', 14), tags='grid')
-                elif celula == 'F':
-                    self.canvas.create_text(cx, cy, text="🏁", font=('Arial', 14), tags='grid')
+                self.celulas_canvas[(i, j)] = (retangulo, texto)
+                self.atualizar_celula_visual(i, j)
+    
+    def atualizar_celula_visual(self, i, j):
+        """Atualiza cor e símbolo dos itens já existentes de uma célula"""
+        celula = self.ambiente.matriz[i, j]
+        retangulo, texto = self.celulas_canvas[(i, j)]
+        self.canvas.itemconfig(retangulo, fill=self.CORES_CELULAS.get(celula, 'white'))
+        self.canvas.itemconfig(texto, text=self.SIMBOLOS_CELULAS.get(celula, ''))
     
     def criar_agente_visual(self, agente):
         """Cria a representação visual de um agente no canvas"""
@@ -420,32 +772,23 @@ class SistemaAgentesColaborativos:
         )
         
         agente.canvas_id = f'agente_{agente.id}'
+        agente.pos_canvas = (agente.x, agente.y)  # Posição desenhada atualmente
         
         return circulo
     
-    def mover_agente_visual(self, agente, nova_x, nova_y):
-        """Move visualmente o agente no canvas com animação"""
+    def mover_agente_visual(self, agente):
+        """Move visualmente o agente da posição desenhada até a posição atual"""
         if not agente.vivo:
             return
         
-        # Posição atual no canvas
-        x_atual = agente.y * self.tamanho_celula + self.tamanho_celula/2
-        y_atual = agente.x * self.tamanho_celula + self.tamanho_celula/2
-        
-        # Nova posição no canvas
-        x_novo = nova_y * self.tamanho_celula + self.tamanho_celula/2
-        y_novo = nova_x * self.tamanho_celula + self.tamanho_celula/2
-        
-        # Calcular deslocamento
-        dx = x_novo - x_atual
-        dy = y_novo - y_atual
+        # Deslocamento no canvas (colunas -> eixo x, linhas -> eixo y)
+        x_ant, y_ant = agente.pos_canvas
+        dx = (agente.y - y_ant) * self.tamanho_celula
+        dy = (agente.x - x_ant) * self.tamanho_celula
         
         # Mover todos os elementos do agente
         self.canvas.move(agente.canvas_id, dx, dy)
-        
-        # Atualizar posição lógica
-        agente.x = nova_x
-        agente.y = nova_y
+        agente.pos_canvas = (agente.x, agente.y)
     
     def remover_agente_visual(self, agente):
         """Remove o agente do canvas quando morre"""
@@ -516,15 +859,6 @@ class SistemaAgentesColaborativos:
     
     def iniciar_simulacao(self):
         try:
-            # DEBUG: Verificar se atributo existe
-            if not hasattr(self, 'estatisticas_modelos'):
-                self.adicionar_log("⚠️ CRIANDO estatisticas_modelos (não existia!)")
-                self.estatisticas_modelos = {
-                    'knn': {'tesouros': 0, 'mortes': 0, 'movimentos': 0, 'agentes': []},
-                    'tree': {'tesouros': 0, 'mortes': 0, 'movimentos': 0, 'agentes': []},
-                    'bayes': {'tesouros': 0, 'mortes': 0, 'movimentos': 0, 'agentes': []}
-                }
-            
             if self.pausado:
                 # Retomar simulação pausada
                 self.pausado = False
@@ -532,7 +866,7 @@ class SistemaAgentesColaborativos:
                 self.btn_iniciar.config(state=tk.DISABLED)
                 self.btn_pausar.config(state=tk.NORMAL, text="⏸ Pausar")
                 self.adicionar_log("▶️ Simulação retomada")
-                self.loop_simulacao()
+                self.iniciar_execucao()
                 return
             
             # Nova simulação
@@ -543,170 +877,161 @@ class SistemaAgentesColaborativos:
             self.agentes_scale.config(state=tk.DISABLED)
             self.bombas_scale.config(state=tk.DISABLED)
             
-            # Criar ambiente
-            self.ambiente = Ambiente(tamanho=10, perc_bombas=self.perc_bombas)
-            self.adicionar_log(f"🚀 Simulação iniciada - Abordagem {self.abordagem}")
-            
-            # Treinar modelos ML
-            self.adicionar_log("🧠 Treinando modelos de Machine Learning...")
-            self.modelos_ml = {
-                'knn': ModeloML('knn'),
-                'tree': ModeloML('tree'),
-                'bayes': ModeloML('bayes')
-            }
-            self.adicionar_log("✅ Modelos KNN, Tree e Bayes treinados!")
-            
-            # Resetar estatísticas
-            for modelo in self.estatisticas_modelos:
-                self.estatisticas_modelos[modelo] = {'tesouros': 0, 'mortes': 0, 'movimentos': 0, 'agentes': []}
-            
-            # Desenhar grid
-            self.desenhar_grid_ambiente()
-            
-            # Criar agentes com modelos ML
-            modelos_tipos = ['knn', 'tree', 'bayes']
-            self.agentes = []
-            for i in range(self.num_agentes):
-                x, y = np.random.randint(0, 10, 2)
-                while self.ambiente.matriz[x, y] == 'B':
-                    x, y = np.random.randint(0, 10, 2)
-                
-                modelo_tipo = modelos_tipos[i % len(modelos_tipos)]
-                modelo_ml = self.modelos_ml[modelo_tipo]  # Passa o modelo treinado
-                
-                # CORRIGIDO: Criar agente com x, y separados (sem ambiente como parâmetro na classe interna)
-                agente = Agente(i, x, y, modelo_tipo, modelo_ml)
-                self.agentes.append(agente)
-                
-                # Registrar agente nas estatísticas
-                self.estatisticas_modelos[modelo_tipo]['agentes'].append(i)
-                
-                # Criar representação visual
-                self.criar_agente_visual(agente)
-                
-                self.adicionar_log(f"👤 Agente {i} criado ({modelo_tipo.upper()}) em ({x},{y})")
-            
-            self.adicionar_log(f"💣 {self.perc_bombas}% de bombas")
-            self.adicionar_log(f"💎 {self.ambiente.tesouros_iniciais} tesouros disponíveis")
+            # A interface apenas observa o motor e desenha os eventos
+            self.motor = MotorSimulacao(abordagem=self.abordagem,
+                                        num_agentes=self.num_agentes,
+                                        perc_bombas=self.perc_bombas)
+            self.motor.adicionar_observador(self.processar_evento)
+            self.motor.iniciar()
+            self.agentes = self.motor.agentes
+            self.estatisticas_modelos = self.motor.estatisticas_modelos
             
             self.tempo_inicio = time.time()
             
-            # Iniciar loop de simulação
-            self.loop_simulacao()
+            # Iniciar thread de simulação e loop de desenho
+            self.iniciar_execucao()
             
         except Exception as e:
-            self.adicionar_log(f"❌ ERRO ao iniciar simulação: {str(e)}")
-            import traceback
-            self.adicionar_log(f"Detalhes: {traceback.format_exc()}")
+            self.adicionar_log(f"❌ ERRO ao iniciar simulação: {str(e)}", logging.ERROR)
+            self.adicionar_log(f"Detalhes: {traceback.format_exc()}", logging.ERROR)
             self.executando = False
             self.btn_iniciar.config(state=tk.NORMAL)
             self.btn_pausar.config(state=tk.DISABLED)
     
-    def loop_simulacao(self):
-        """Loop principal da simulação"""
+    INTERVALO_FRAME = 33  # Milissegundos entre frames (~30 FPS)
+    MAX_EFEITOS_FRAME = 10  # Efeitos visuais desenhados por frame, no máximo
+    MAX_EVENTOS_PENDENTES = 5000  # Com a janela ocupada, os eventos mais antigos são descartados
+    
+    def processar_evento(self, evento, dados):
+        """Recebe os eventos do motor (na thread de simulação) para o próximo frame"""
+        if evento == 'turno':
+            return  # Não é desenhado
+        with self.trava_eventos:
+            if evento == 'movimento':
+                # Vários movimentos entre dois frames resultam num único redesenho
+                self.destinos_pendentes.add(dados['destino'])
+                self.agentes_pendentes[dados['agente'].id] = dados['agente']
+            else:
+                self.eventos_pendentes.append((evento, dados))
+    
+    def ha_eventos_pendentes(self):
+        with self.trava_eventos:
+            return bool(self.eventos_pendentes or self.agentes_pendentes)
+    
+    def iniciar_execucao(self):
+        """Inicia a thread de simulação e o loop de desenho"""
+        self.parar_execucao()
+        self.simulacao_terminada = False
+        self.parar_thread = threading.Event()
+        self.thread_simulacao = threading.Thread(target=self.executar_passos,
+                                                 args=(self.parar_thread,), daemon=True)
+        self.thread_simulacao.start()
+        
+        if self.frame_agendado is not None:
+            self.root.after_cancel(self.frame_agendado)
+        self.loop_simulacao()
+    
+    def parar_execucao(self):
+        """Interrompe a thread de simulação (o turno em curso é concluído)"""
+        if self.thread_simulacao is not None:
+            self.parar_thread.set()
+            self.thread_simulacao.join()
+            self.thread_simulacao = None
+    
+    def executar_passos(self, parar):
+        """Thread de simulação: executa turnos sem depender do desenho"""
         try:
-            if not self.executando or self.pausado:
-                return
-            
-            agentes_vivos = [ag for ag in self.agentes if ag.vivo]
-            
-            if not agentes_vivos:
-                self.executando = False
-                self.adicionar_log("❌ Todos os agentes foram destruídos!")
-                self.finalizar_simulacao()
-                return
-            
-            # Mover cada agente vivo
-            for agente in agentes_vivos:
-                self.executar_movimento_agente(agente)
+            while not parar.is_set():
+                if not self.motor.passo():
+                    self.simulacao_terminada = True
+                    return
+                # velocidade = 0 executa à velocidade máxima
+                parar.wait(self.velocidade / 1000)
+        except Exception as e:
+            # O estado da interface só é alterado na thread do Tk
+            self.root.after(0, self.simulacao_interrompida, str(e), traceback.format_exc())
+    
+    def simulacao_interrompida(self, erro, detalhes):
+        """Estado final após um erro: regista-o e devolve os controlos ao estado inicial"""
+        self.parar_execucao()
+        if self.frame_agendado is not None:
+            self.root.after_cancel(self.frame_agendado)
+            self.frame_agendado = None
+        try:
+            self.desenhar_eventos_pendentes()
+        except Exception:
+            pass  # O erro original é o que interessa registar
+        
+        self.adicionar_log(f"❌ ERRO no loop: {erro}", logging.ERROR)
+        self.adicionar_log(f"Detalhes: {detalhes}", logging.ERROR)
+        self.executando = False
+        self.pausado = False
+        self.simulacao_terminada = False
+        self.btn_iniciar.config(state=tk.NORMAL)
+        self.btn_pausar.config(state=tk.DISABLED, text="⏸ Pausar")
+        self.agentes_scale.config(state=tk.NORMAL)
+        self.bombas_scale.config(state=tk.NORMAL)
+    
+    def desenhar_eventos_pendentes(self):
+        """Desenha de uma vez todos os eventos acumulados desde o último frame"""
+        # Retira um retrato do que está pendente: o que a thread de simulação
+        # produzir durante o desenho fica para o próximo frame
+        with self.trava_eventos:
+            eventos, self.eventos_pendentes = self.eventos_pendentes, deque(maxlen=self.MAX_EVENTOS_PENDENTES)
+            agentes_movidos, self.agentes_pendentes = self.agentes_pendentes, {}
+            self.celulas_alteradas.update(self.destinos_pendentes)
+            self.destinos_pendentes.clear()
+        efeitos = 0
+        
+        for evento, dados in eventos:
+            if 'mensagem' in dados:
+                self.adicionar_log(dados['mensagem'], dados.get('nivel', logging.INFO))
             
-            # Atualizar ambiente visual
+            if evento == 'ambiente_criado':
+                self.ambiente = dados['ambiente']
+                self.desenhar_grid_ambiente()
+            elif evento == 'agente_criado':
+                self.criar_agente_visual(dados['agente'])
+            elif evento == 'destruido':
+                self.remover_agente_visual(dados['agente'])
+            elif evento in ('desativou_bomba', 'tesouro', 'bandeira'):
+                efeitos += 1
+                if efeitos > self.MAX_EFEITOS_FRAME:
+                    continue
+                if evento == 'desativou_bomba':
+                    self.efeito_desativacao(dados['x'], dados['y'])
+                elif evento == 'tesouro':
+                    self.efeito_tesouro(dados['x'], dados['y'])
+                else:
+                    self.efeito_bandeira(dados['x'], dados['y'])
+        
+        # Vários movimentos do mesmo agente resultam num único deslocamento
+        for agente in agentes_movidos.values():
+            self.mover_agente_visual(agente)
+        
+        if self.ambiente is not None:
             self.atualizar_ambiente_visual()
-            
-            # Atualizar métricas
             self.atualizar_metricas()
+            self.atualizar_estatisticas_ml()
+    
+    def loop_simulacao(self):
+        """Loop de desenho a taxa fixa, independente da velocidade da simulação"""
+        self.frame_agendado = None
+        try:
+            self.desenhar_eventos_pendentes()
             
-            # Verificar condição de sucesso
-            if self.verificar_sucesso():
+            if self.simulacao_terminada and not self.ha_eventos_pendentes():
+                self.simulacao_terminada = False
+                self.executando = False
                 self.finalizar_simulacao()
                 return
             
-            # Agendar próxima iteração
-            self.root.after(self.velocidade, self.loop_simulacao)
+            # Agendar próximo frame
+            if self.executando:
+                self.frame_agendado = self.root.after(self.INTERVALO_FRAME, self.loop_simulacao)
             
         except Exception as e:
-            self.adicionar_log(f"❌ ERRO no loop: {str(e)}")
-            import traceback
-            self.adicionar_log(f"Detalhes: {traceback.format_exc()}")
-            self.executando = False
-    
-    def executar_movimento_agente(self, agente):
-        """Executa um movimento de um agente USANDO O MODELO ML"""
-        movimentos = [(0,1), (1,0), (0,-1), (-1,0), (1,1), (1,-1), (-1,1), (-1,-1)]
-        
-        # Filtrar movimentos possíveis
-        possiveis = []
-        for dx, dy in movimentos:
-            nx, ny = agente.x + dx, agente.y + dy
-            if (0 <= nx < 10 and 0 <= ny < 10 and 
-                f"{nx},{ny}" not in agente.conhecimento):
-                possiveis.append((nx, ny))
-        
-        if not possiveis:
-            return
-        
-        # ========== USAR MODELO ML PARA ESCOLHER ========== #
-        if agente.modelo_ml:
-            nx, ny = agente.modelo_ml.escolher_melhor_celula(possiveis)
-        else:
-            # Fallback aleatório (não deveria acontecer)
-            nx, ny = possiveis[np.random.randint(len(possiveis))]
-        # ================================================== #
-        
-        celula = self.ambiente.matriz[nx, ny]
-        
-        # Incrementar contador de movimentos do modelo
-        self.estatisticas_modelos[agente.modelo_tipo]['movimentos'] += 1
-        agente.movimentos += 1
-        
-        # Mover visualmente
-        self.mover_agente_visual(agente, nx, ny)
-        
-        # Compartilhar conhecimento
-        for ag in self.agentes:
-            ag.conhecimento.add(f"{nx},{ny}")
-        
-        # Processar célula
-        if celula == 'B':
-            if agente.bombas_desativadas > 0:
-                agente.bombas_desativadas -= 1
-                self.adicionar_log(f"🛡️ Agente {agente.id} ({agente.modelo_tipo.upper()}) desativou bomba ({nx},{ny})")
-                self.ambiente.matriz[nx, ny] = 'E'
-                self.efeito_desativacao(nx, ny)
-            else:
-                agente.vivo = False
-                self.estatisticas_modelos[agente.modelo_tipo]['mortes'] += 1
-                self.adicionar_log(f"💥 Agente {agente.id} ({agente.modelo_tipo.upper()}) DESTRUÍDO em ({nx},{ny})")
-                self.ambiente.matriz[nx, ny] = 'E'
-                self.remover_agente_visual(agente)
-        
-        elif celula == 'T':
-            agente.tesouros += 1
-            agente.bombas_desativadas += 1
-            self.estatisticas_modelos[agente.modelo_tipo]['tesouros'] += 1
-            self.adicionar_log(f"💎 Agente {agente.id} ({agente.modelo_tipo.upper()}) achou TESOURO ({nx},{ny}) [Total: {agente.tesouros}]")
-            self.ambiente.matriz[nx, ny] = 'E'
-            self.efeito_tesouro(nx, ny)
-        
-        elif celula == 'F':
-            self.adicionar_log(f"🏁 Agente {agente.id} ({agente.modelo_tipo.upper()}) achou BANDEIRA ({nx},{ny})!")
-            self.efeito_bandeira(nx, ny)
-        
-        elif celula == 'L':
-            self.ambiente.matriz[nx, ny] = 'E'
-        
-        # Atualizar estatísticas ML
-        self.atualizar_estatisticas_ml()
+            self.simulacao_interrompida(str(e), traceback.format_exc())
     
     def efeito_tesouro(self, x, y):
         """Efeito visual ao coletar tesouro"""
@@ -751,52 +1076,16 @@ class SistemaAgentesColaborativos:
     
     def atualizar_ambiente_visual(self):
         """Atualiza apenas as células que mudaram"""
-        self.canvas.delete('grid')
-        self.desenhar_grid_ambiente()
-        
-        # Redesenhar agentes por cima
-        for agente in self.agentes:
-            if agente.vivo:
-                self.canvas.tag_raise(agente.canvas_id)
-    
-    def verificar_sucesso(self):
-        tesouros_encontrados = sum(ag.tesouros for ag in self.agentes)
-        tesouros_restantes = np.sum(self.ambiente.matriz == 'T')
-        total_tesouros = tesouros_encontrados + tesouros_restantes
-        agentes_vivos = sum(1 for ag in self.agentes if ag.vivo)
-        
-        sucesso = False
-        
-        if self.abordagem == 'A':
-            if total_tesouros > 0:
-                perc = (tesouros_encontrados / total_tesouros) * 100
-                if perc > 50:
-                    sucesso = True
-                    self.adicionar_log(f"✅ SUCESSO! {perc:.1f}% dos tesouros encontrados!")
-        
-        elif self.abordagem == 'B':
-            todas_exploradas = not np.any(np.isin(self.ambiente.matriz, ['L', 'B', 'T']))
-            if todas_exploradas and agentes_vivos > 0:
-                sucesso = True
-                self.adicionar_log(f"✅ SUCESSO! Ambiente explorado com {agentes_vivos} agente(s)!")
-        
-        elif self.abordagem == 'C':
-            for ag in self.agentes:
-                if ag.vivo and self.ambiente.matriz[ag.x, ag.y] == 'F':
-                    sucesso = True
-                    self.adicionar_log(f"✅ SUCESSO! Agente {ag.id} encontrou a bandeira!")
-                    break
-        
-        if sucesso or agentes_vivos == 0:
-            self.executando = False
-            return True
-        
-        return False
+        # Os itens do grid são criados antes dos agentes e nunca recriados,
+        # por isso os agentes continuam por cima sem precisar de tag_raise
+        for i, j in self.celulas_alteradas:
+            self.atualizar_celula_visual(i, j)
+        self.celulas_alteradas.clear()
     
     def atualizar_metricas(self):
         agentes_vivos = sum(1 for ag in self.agentes if ag.vivo)
         tesouros = sum(ag.tesouros for ag in self.agentes)
-        exploradas = np.sum(self.ambiente.matriz == 'E')
+        exploradas = self.ambiente.contagem['E']
         tempo = time.time() - self.tempo_inicio
         
         self.metric_labels['agentes_vivos'].config(text=str(agentes_vivos))
@@ -820,6 +1109,7 @@ class SistemaAgentesColaborativos:
         if self.executando:
             self.pausado = True
             self.executando = False
+            self.parar_execucao()
             self.btn_pausar.config(text="▶️ Continuar")
             self.btn_iniciar.config(state=tk.NORMAL)
             self.adicionar_log("⏸ Simulação PAUSADA")
@@ -829,16 +1119,26 @@ class SistemaAgentesColaborativos:
             self.btn_pausar.config(text="⏸ Pausar")
             self.btn_iniciar.config(state=tk.DISABLED)
             self.adicionar_log("▶️ Simulação RETOMADA")
-            self.loop_simulacao()
+            self.iniciar_execucao()
     
     def resetar_simulacao(self):
         self.executando = False
         self.pausado = False
+        self.parar_execucao()
+        with self.trava_eventos:
+            self.eventos_pendentes.clear()
+            self.destinos_pendentes.clear()
+            self.agentes_pendentes.clear()
+        self.simulacao_terminada = False
+        if self.frame_agendado is not None:
+            self.root.after_cancel(self.frame_agendado)
+            self.frame_agendado = None
         self.agentes = []
-        self.logs = []
         self.tempo_inicio = 0
         self.canvas.delete("all")  # Apaga tudo incluindo rastros
-        self.log_text.delete(1.0, tk.END)
+        self.celulas_canvas = {}
+        self.celulas_alteradas.clear()
+        self.painel_logs.limpar()
         
         for label in self.metric_labels.values():
             label.config(text="0")
@@ -854,21 +1154,13 @@ class SistemaAgentesColaborativos:
         
         # Mostrar comparação final dos modelos
         self.adicionar_log("\n📊 === COMPARAÇÃO DOS MODELOS ML ===")
-        melhor_modelo = None
-        melhor_score = -1000
+        scores = self.motor.scores_modelos()
         
         for modelo in ['knn', 'tree', 'bayes']:
             stats = self.estatisticas_modelos[modelo]
-            # Score: tesouros valem +10, mortes valem -20
-            score = (stats['tesouros'] * 10) - (stats['mortes'] * 20)
-            taxa_sucesso = (stats['tesouros'] / max(stats['movimentos'], 1)) * 100
-            
-            self.adicionar_log(f"{modelo.upper()}: {stats['tesouros']} tesouros, {stats['mortes']} mortes, Score: {score}")
-            
-            if score > melhor_score:
-                melhor_score = score
-                melhor_modelo = modelo
+            self.adicionar_log(f"{modelo.upper()}: {stats['tesouros']} tesouros, {stats['mortes']} mortes, Score: {scores[modelo]}")
         
+        melhor_modelo, melhor_score = self.motor.get_melhor_modelo()
         self.adicionar_log(f"🏆 MELHOR MODELO: {melhor_modelo.upper()} (Score: {melhor_score})")
         
         self.btn_iniciar.config(state=tk.NORMAL)
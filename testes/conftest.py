@@ -0,0 +1,15 @@
+import pytest
+from entidades import Aprendizado
+
+@pytest.fixture(autouse=True, scope='session')
+def cache_modelos_temporaria(tmp_path_factory):
+    """
+    Os modelos treinados pelos testes vão para uma pasta temporária (também
+    nos processos dos pools), nunca para a cache do utilizador.
+    """
+    diretorio = str(tmp_path_factory.mktemp('modelos'))
+    patch = pytest.MonkeyPatch()
+    patch.setenv('AGENTES_CACHE_MODELOS', diretorio)
+    patch.setattr(Aprendizado.cache_padrao, 'diretorio', diretorio)
+    yield diretorio
+    patch.undo()
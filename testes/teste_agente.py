@@ -0,0 +1,88 @@
+import tracemalloc
+from entidades.Ambiente import Ambiente
+from entidades.Agente import Agente, GrupoAgentes, MapaConhecimento
+from entidades.Aprendizado import ModeloArvoreDecisao, gerar_dados_treino
+
+
+def test_sincronizar_conhecimento():
+    ambiente = Ambiente(tamanho=8, perc_livres=100, perc_bombas=0, perc_tesouros=0)
+    grupo = GrupoAgentes()
+    a, b = Agente(0, 0, 0, ambiente), Agente(1, 7, 7, ambiente)
+    grupo.registrar_agente(a)
+    grupo.registrar_agente(b)
+
+    a.explorar(0, 1)
+    b.explorar(7, 6)
+    assert (7, 6) not in a.conhecimento_compartilhado
+
+    grupo.sincronizar_conhecimento()
+    for agente in (a, b):
+        assert set(agente.conhecimento_compartilhado) == {(0, 1), (7, 6)}
+    assert grupo.get_estatisticas()['celulas_exploradas'] == 2
+
+
+def test_agente_atrasado_recebe_conhecimento():
+    ambiente = Ambiente(tamanho=8, perc_livres=100, perc_bombas=0, perc_tesouros=0)
+    grupo = GrupoAgentes()
+    a = Agente(0, 0, 0, ambiente)
+    grupo.registrar_agente(a)
+    for y in range(4):
+        a.explorar(0, y)
+        grupo.sincronizar_conhecimento()
+    assert grupo.versao_conhecimento == 4
+
+    b = Agente(1, 7, 7, ambiente)
+    grupo.registrar_agente(b)
+    assert set(b.conhecimento_compartilhado) == {(0, 0), (0, 1), (0, 2), (0, 3)}
+    assert b.versao_conhecimento == 4
+
+
+def test_conhecimento_do_agente_nao_cresce_com_o_grid():
+    memoria = {}
+    for tamanho in (10, 400):
+        ambiente = Ambiente(tamanho=tamanho, perc_livres=100, perc_bombas=0, perc_tesouros=0)
+        grupo = GrupoAgentes()
+        grupo.registrar_agente(Agente(0, 0, 0, ambiente))
+
+        tracemalloc.start()
+        # Longe do primeiro agente, para não explorarem a mesma célula
+        agente = Agente(1, tamanho - 1, tamanho - 1, ambiente)
+        grupo.registrar_agente(agente)
+        grupo.executar_turno()
+        memoria[tamanho] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        assert agente.conhecimento_compartilhado.partilhado is grupo.conhecimento_global
+        assert len(agente.conhecimento_compartilhado) == len(grupo.conhecimento_global) == 2
+    # Um grid 400x400 por agente seriam 160 kB
+    assert memoria[400] < memoria[10] + 16 * 1024
+    mapa = MapaConhecimento((6, 6))
+    mapa.grid[:] = True
+    mapa.grid[5, 0] = mapa.grid[0, 3] = False
+    mapa.conhecidas = 34
+    assert mapa.mais_proxima_desconhecida(1, 1) == (0, 3)
+    mapa.add((0, 3))
+    assert mapa.mais_proxima_desconhecida(1, 1) == (5, 0)
+    mapa.add((5, 0))
+    assert mapa.mais_proxima_desconhecida(1, 1) is None
+
+
+def test_mais_proxima_desconhecida_com_contador_desalinhado():
+    # Grid preenchido diretamente: o contador não acompanha e a busca tem de terminar
+    mapa = MapaConhecimento((5, 7))
+    mapa.grid[:] = True
+    assert not mapa.completo()
+    assert mapa.mais_proxima_desconhecida(4, 0) is None
+
+
+def test_modelo_partilhado_entre_tamanhos():
+    X, y = gerar_dados_treino(num_amostras=300, rng=0)
+    modelo = ModeloArvoreDecisao()
+    modelo.treinar(X, y)
+
+    grande = Agente(0, 39, 39, Ambiente(tamanho=40), 'tree', modelo)
+    Agente(1, 0, 0, Ambiente(tamanho=8), 'tree', modelo)
+    assert modelo.tamanho_grid == 10
+
+    grande.escolher_proxima_celula()
+    assert modelo.tabelas_scores[40].shape == (40, 40)
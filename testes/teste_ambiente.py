@@ -1,5 +1,66 @@
-from entidades.Ambiente import criar_ambiente
+import random
+import numpy as np
+from entidades.Ambiente import Ambiente, criar_ambiente, codificar_matriz, decodificar_matriz
 
 def test_criar():
     ambiente = criar_ambiente()
-    assert ambiente.shape == (10, 10)
\ No newline at end of file
+    assert ambiente.shape == (10, 10)
+
+def test_ambiente_compacto_equivale_ao_de_strings():
+    np.random.seed(7)
+    random.seed(7)
+    texto = Ambiente(tamanho=20)
+    np.random.seed(7)
+    random.seed(7)
+    compacto = Ambiente(tamanho=20, compacto=True)
+
+    assert compacto.matriz.dtype == np.uint8
+    assert compacto.tolist() == texto.tolist()
+    assert (codificar_matriz(texto.matriz) == compacto.matriz).all()
+    assert (decodificar_matriz(compacto.matriz) == texto.matriz).all()
+
+    compacto[3, 4] = 'E'
+    texto[3, 4] = 'E'
+    assert compacto[3, 4] == 'E'
+    assert compacto.get_estatisticas() == texto.get_estatisticas()
+
+
+def test_contadores_incrementais():
+    ambiente = Ambiente(tamanho=15, compacto=True)
+    for x in range(15):
+        ambiente[x, x] = 'E'
+    esperado = {s: int(np.sum(ambiente.matriz_simbolos() == s)) for s in 'LBTFE'}
+    assert ambiente.contagem == esperado
+
+
+def test_celulas_indicadas_sem_converter_o_grid():
+    xs, ys = np.array([0, 3, 7]), np.array([1, 4, 2])
+    for compacto in (False, True):
+        ambiente = Ambiente(tamanho=8, compacto=compacto)
+        assert (ambiente.simbolos_celulas(xs, ys) == ambiente.matriz_simbolos()[xs, ys]).all()
+        assert (ambiente.codigos_celulas(xs, ys) == ambiente.matriz_codigos()[xs, ys]).all()
+        assert ambiente.codigos_celulas(xs, ys).dtype == np.uint8
+
+def contar_vizinhos(simbolos, simbolo):
+    tamanho = len(simbolos)
+    return np.array([[sum(simbolos[i][j] == simbolo
+                          for i in range(max(x - 1, 0), min(x + 2, tamanho))
+                          for j in range(max(y - 1, 0), min(y + 2, tamanho)) if (i, j) != (x, y))
+                      for y in range(tamanho)] for x in range(tamanho)])
+
+
+def test_mapas_adjacencia_iguais_a_contagem_direta():
+    np.random.seed(3)
+    for compacto in (False, True):
+        ambiente = Ambiente(tamanho=9, perc_livres=40, perc_bombas=30, perc_tesouros=30, compacto=compacto)
+        assert (ambiente.bombas_adj == contar_vizinhos(ambiente.tolist(), 'B')).all()
+        assert (ambiente.tesouros_adj == contar_vizinhos(ambiente.tolist(), 'T')).all()
+
+        # Atualização incremental, incluindo cantos e bordas
+        for (x, y), valor in [((0, 0), 'B'), ((0, 0), 'T'), ((8, 8), 'B'), ((0, 4), 'T'),
+                              ((4, 8), 'B'), ((4, 4), 'E'), ((8, 0), 'T'), ((8, 0), 'L'),
+                              ((0, 4), 'B'), ((4, 4), 'B'), ((4, 4), 'B')]:
+            ambiente.set_celula(x, y, valor)
+            assert (ambiente.bombas_adj == contar_vizinhos(ambiente.tolist(), 'B')).all()
+            assert (ambiente.tesouros_adj == contar_vizinhos(ambiente.tolist(), 'T')).all()
+        assert ambiente.contar_bombas_adjacentes(3, 3) == contar_vizinhos(ambiente.tolist(), 'B')[3, 3]
@@ -0,0 +1,192 @@
+import numpy as np
+import pytest
+from entidades import Aprendizado
+from entidades.Aprendizado import (MODELOS, ModeloArvoreDecisao, ModeloBase, ModeloNaiveBayes,
+                                   gerar_dados_treino, treinar_todos_modelos)
+
+def test_escolher_melhor_celula_lote():
+    X, y = gerar_dados_treino(num_amostras=500)
+    modelo = ModeloArvoreDecisao()
+    modelo.treinar(X, y)
+    celulas = [(0, 0), (5, 5), (9, 9), (4, 6)]
+    scores = modelo.pontuar_celulas(celulas)
+    esperado = [{'T': 100, 'L': 50, 'B': -50}[modelo.modelo.predict([f])[0]]
+                for f in modelo.calcular_features(celulas)]
+    assert list(scores) == esperado
+    assert modelo.escolher_melhor_celula(celulas) in celulas
+
+def test_tabelas_scores_por_tamanho():
+    X, y = gerar_dados_treino(num_amostras=500)
+    modelo = ModeloArvoreDecisao()
+    modelo.treinar(X, y)
+    assert modelo.tabela_scores.shape == (10, 10)
+    assert modelo.tabela_scores[9, 9] == modelo.pontuar_celulas([(9, 9)])[0]
+
+    modelo.definir_tamanho_grid(20)
+    assert modelo.tabela_scores is None
+    assert modelo.obter_scores([(15, 15)])[0] == modelo.pontuar_celulas([(15, 15)])[0]
+    assert modelo.tabela_scores.shape == (20, 20)
+
+    # Tamanhos diferentes convivem no mesmo modelo
+    assert modelo.obter_scores([(30, 30)], tamanho=40)[0] == modelo.pontuar_celulas([(30, 30)])[0]
+    assert sorted(modelo.tabelas_scores) == [10, 20, 40]
+    modelo.invalidar_tabela()
+    assert modelo.tabelas_scores == {}
+
+def test_treinar_todos_modelos_paralelo():
+    X, y = gerar_dados_treino(num_amostras=500, rng=0)
+    sequencial = treinar_todos_modelos(X, y, verbose=False)
+    paralelo = treinar_todos_modelos(X, y, verbose=False, paralelo='thread')
+    assert set(paralelo) == set(MODELOS)
+    for nome in sequencial:
+        assert paralelo[nome]['acuracia'] == sequencial[nome]['acuracia']
+        assert paralelo[nome]['modelo'].treinado
+
+def test_salvar_carregar_modelo(tmp_path):
+    X, y = gerar_dados_treino(num_amostras=500, rng=0)
+    X_teste, _ = gerar_dados_treino(num_amostras=200, rng=1)
+    for nome, info in treinar_todos_modelos(X, y, verbose=False).items():
+        caminho = str(tmp_path / nome)
+        info['modelo'].salvar_modelo(caminho)
+        carregado = ModeloBase.carregar_modelo(caminho)
+        assert type(carregado) is type(info['modelo'])
+        assert carregado.acuracia == info['acuracia']
+        assert (carregado.modelo.predict(X_teste) == info['modelo'].modelo.predict(X_teste)).all()
+        assert (carregado.tabela_scores == info['modelo'].tabela_scores).all()
+
+def test_versao_do_formato_verificada(tmp_path, monkeypatch):
+    X, y = gerar_dados_treino(num_amostras=200, rng=0)
+    modelo = ModeloArvoreDecisao()
+    modelo.treinar(X, y)
+    caminho = str(tmp_path / 'arvore')
+    modelo.salvar_modelo(caminho)
+    monkeypatch.setattr(Aprendizado, 'VERSAO_FORMATO', Aprendizado.VERSAO_FORMATO + 1)
+    with pytest.raises(ValueError):
+        ModeloBase.carregar_modelo(caminho)
+
+def test_versao_do_sklearn_verificada(tmp_path, monkeypatch):
+    X, y = gerar_dados_treino(num_amostras=200, rng=0)
+    modelo = ModeloNaiveBayes()
+    modelo.treinar(X, y)
+    caminho = str(tmp_path / 'bayes')
+    modelo.salvar_modelo(caminho)
+
+    # Com mmap os parâmetros usados tal como estão são vistas somente-leitura do arquivo
+    carregado = ModeloBase.carregar_modelo(caminho)
+    for array in (carregado.modelo.theta_, carregado.modelo.var_, carregado.tabela_scores):
+        assert not array.flags.owndata and not array.flags.writeable
+
+    monkeypatch.setattr(Aprendizado, 'VERSAO_SKLEARN', '0.0')
+    with pytest.raises(ValueError):
+        ModeloBase.carregar_modelo(caminho)
+
+def _entradas_paridade():
+    rng = np.random.default_rng(7)
+    grid, _ = gerar_dados_treino(num_amostras=300, rng=3)
+    aleatorias = rng.uniform(-5, 15, size=(300, 3))
+    return np.vstack([grid, aleatorias, grid[:1]])
+
+@pytest.mark.parametrize('tipo, hiperparametros', [
+    ('knn', {'n_neighbors': 1}), ('knn', {'n_neighbors': 5}), ('knn', {'n_neighbors': 15}),
+    ('tree', {'max_depth': 3}), ('tree', {'max_depth': 12, 'min_samples_split': 2}),
+    ('bayes', {})
+])
+def test_predizer_igual_ao_sklearn(tmp_path, tipo, hiperparametros):
+    X, y = gerar_dados_treino(num_amostras=1000, rng=0)
+    modelo = MODELOS[tipo](**hiperparametros)
+    modelo.treinar(X, y)
+    entradas = _entradas_paridade()
+    esperado = modelo.modelo.predict(entradas)
+    assert (modelo.predizer(entradas) == esperado).all()
+    assert (modelo.predizer(entradas[:1]) == esperado[:1]).all()
+
+    caminho = str(tmp_path / tipo)
+    modelo.salvar_modelo(caminho)
+    assert (ModeloBase.carregar_modelo(caminho).predizer(entradas) == esperado).all()
+
+def test_pontuacao_valor_esperado(tmp_path):
+    X, y = gerar_dados_treino(num_amostras=500, rng=0)
+    modelo = ModeloArvoreDecisao()
+    modelo.treinar(X, y)
+    utilidades = {'T': 10, 'L': 0, 'B': -100}
+    modelo.configurar_pontuacao(modo='esperado', utilidades=utilidades)
+    assert modelo.tabela_scores is None
+
+    celulas = [(0, 0), (5, 5), (9, 9)]
+    probabilidades = modelo.modelo.predict_proba(modelo.calcular_features(celulas))
+    pesos = np.array([utilidades[c] for c in modelo.modelo.classes_])
+    assert np.allclose(modelo.obter_scores(celulas), probabilidades @ pesos)
+
+    caminho = str(tmp_path / 'arvore')
+    modelo.salvar_modelo(caminho)
+    carregado = ModeloBase.carregar_modelo(caminho)
+    assert carregado.modo_pontuacao == 'esperado' and carregado.utilidades == utilidades
+    carregado.invalidar_tabela()
+    assert np.allclose(carregado.obter_scores(celulas), probabilidades @ pesos)
+
+def test_cache_ilegivel_e_treinada_de_novo(tmp_path):
+    cache = Aprendizado.CacheModelos(diretorio=str(tmp_path))
+    criar = lambda: Aprendizado.ModeloML('tree', seed=0, num_amostras=200)
+    # Pickle de uma classe que só existia em __main__, e um arquivo truncado
+    for conteudo in (b'\x80\x04c__main__\nModeloML\n)\x81.', b''):
+        chave = ('tree', conteudo)
+        with open(cache.caminho(chave), 'wb') as f:
+            f.write(conteudo)
+        assert isinstance(cache.obter(chave, criar), Aprendizado.ModeloML)
+        cache.limpar()
+        assert isinstance(cache.obter(chave, criar), Aprendizado.ModeloML)
+
+def test_modelo_ml_sem_seed_segue_estado_global():
+    np.random.seed(7)
+    primeiro = Aprendizado.ModeloML('tree', num_amostras=300)
+    np.random.seed(7)
+    segundo = Aprendizado.ModeloML('tree', num_amostras=300)
+    assert np.array_equal(primeiro.tabela_scores, segundo.tabela_scores)
+
+class ModeloSemRegisto(ModeloArvoreDecisao):
+    pass
+
+def test_modelo_nao_registado_gravado_com_pickle(tmp_path):
+    X, y = gerar_dados_treino(num_amostras=300, rng=0)
+    modelo = ModeloSemRegisto()
+    modelo.treinar(X, y)
+    with pytest.raises(ValueError, match="ModeloSemRegisto"):
+        modelo.salvar_modelo(str(tmp_path / 'modelo'))
+
+    # Sem formato de arrays (não registado, ou sem exportar_arrays): a cache usa pickle
+    cache = Aprendizado.CacheModelos(diretorio=str(tmp_path))
+    assert cache.obter(('sem_registo',), lambda: modelo) is modelo
+    cache.limpar()
+    carregado = cache.obter(('sem_registo',), lambda: None)
+    assert isinstance(carregado, ModeloSemRegisto)
+    assert np.array_equal(carregado.obter_tabela(), modelo.obter_tabela())
+
+class ModeloPlugin(ModeloBase):
+    def __init__(self):
+        super().__init__("Plugin")
+        self.modelo = ModeloNaiveBayes().modelo
+
+def test_plugin_sem_exportar_arrays_na_cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(MODELOS, 'plugin', ModeloPlugin)
+    cache = Aprendizado.CacheModelos(diretorio=str(tmp_path))
+    modelo = Aprendizado.obter_modelo_treinado('plugin', num_amostras=300, cache=cache)
+    cache.limpar()
+    assert isinstance(Aprendizado.obter_modelo_treinado('plugin', num_amostras=300, cache=cache), ModeloPlugin)
+    assert modelo.treinado
+
+def test_modelo_ml_usa_modelo_base(tmp_path):
+    modelo = Aprendizado.ModeloML('knn', seed=0, num_amostras=300)
+    assert isinstance(modelo.base, MODELOS['knn']) and modelo.treinado
+    features = modelo.calcular_features([(0, 0), (5, 5), (19, 19)])
+    assert features.shape == (3, 4)
+    assert list(modelo.predizer(features)) == list(modelo.modelo.predict(features))
+    assert modelo.obter_tabela(20).shape == (20, 20) and modelo.tabela_scores.shape == (10, 10)
+
+    cache = Aprendizado.CacheModelos(diretorio=str(tmp_path))
+    cache.obter(('ml',), lambda: modelo)
+    cache.limpar()
+    carregado = cache.obter(('ml',), lambda: None)
+    assert np.array_equal(carregado.obter_tabela(20), modelo.obter_tabela(20))
+
+    modelo.configurar_pontuacao(modo='esperado')
+    assert modelo.tabelas_scores == {} and modelo.escolher_melhor_celula([(0, 0), (5, 5)]) in ((0, 0), (5, 5))
@@ -0,0 +1,52 @@
+from entidades.Experimentos import (agregar_resultados, buscar_hiperparametros, executar_lote,
+                                    gerar_candidatos, gerar_configuracoes, preparar_folds,
+                                    validacao_cruzada)
+from entidades.Aprendizado import gerar_dados_treino
+from entidades.Tabelas import formatar_tabela
+
+def test_validacao_cruzada_poda_candidatos_piores():
+    X, y, folds = preparar_folds(*gerar_dados_treino(num_amostras=400, rng=0), num_folds=3)
+    candidatos = gerar_candidatos({'knn': {'n_neighbors': (1, 15)}})
+    linhas = validacao_cruzada(candidatos, X, y, folds, max_workers=1, tolerancia=0)
+    assert [l['podado'] for l in linhas].count(False) >= 1
+    assert all(l['folds'] == 3 for l in linhas if not l['podado'])
+    assert all(l['folds'] < 3 for l in linhas if l['podado'])
+
+def test_buscar_hiperparametros():
+    resultado = buscar_hiperparametros(
+        grade={'tree': {'max_depth': (3, 5)}, 'bayes': {}},
+        num_amostras=400, num_folds=3, seeds=range(2), max_workers=1, max_turnos=50
+    )
+    assert set(resultado['melhores']) == {'tree', 'bayes'}
+    assert all('score_medio' in l for l in resultado['finalistas'])
+
+def test_executar_lote_em_processos():
+    configuracoes = gerar_configuracoes(seeds=range(2), tamanho=6, max_turnos=20)
+    resultados = executar_lote(configuracoes, max_workers=2)
+    assert [r['config'] for r in resultados] == configuracoes
+    assert resultados == executar_lote(configuracoes, max_workers=1)
+
+def test_agregar_resultados_e_formatar_tabela():
+    resultados = [
+        {'config': {'abordagem': 'A'}, 'sucesso': True, 'melhor_modelo': 'knn', 'por_modelo': {
+            'knn': {'score': 10, 'tesouros': 1, 'mortes': 0},
+            'tree': {'score': -20, 'tesouros': 0, 'mortes': 1}}},
+        {'config': {'abordagem': 'A'}, 'sucesso': False, 'melhor_modelo': 'tree', 'por_modelo': {
+            'knn': {'score': 30, 'tesouros': 3, 'mortes': 0},
+            'tree': {'score': 20, 'tesouros': 2, 'mortes': 0}}},
+        {'config': {'abordagem': 'B'}, 'sucesso': True, 'melhor_modelo': 'knn', 'por_modelo': {
+            'knn': {'score': 0, 'tesouros': 0, 'mortes': 0}}},
+    ]
+    tabela = agregar_resultados(resultados, agrupar_por=('abordagem',))
+    linhas = {(l['abordagem'], l['modelo']): l for l in tabela}
+    assert list(linhas) == [('A', 'knn'), ('A', 'tree'), ('B', 'knn')]
+    knn = linhas['A', 'knn']
+    assert knn['execucoes'] == 2 and knn['score_medio'] == 20 and knn['tesouros_medio'] == 2
+    assert knn['vitorias'] == 1 and knn['taxa_sucesso'] == 0.5
+    assert linhas['A', 'tree']['mortes_medio'] == 0.5 and linhas['B', 'knn']['score_desvio'] == 0.0
+
+    texto = formatar_tabela(tabela).splitlines()
+    assert [c.strip() for c in texto[0].split('|')] == list(tabela[0])
+    assert len(texto) == 2 + len(tabela) and len({len(l) for l in texto}) == 1
+    assert [c.strip() for c in texto[2].split('|')][:4] == ['A', 'knn', '2', '20.00']
+    assert formatar_tabela([]) == ""
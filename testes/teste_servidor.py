@@ -0,0 +1,273 @@
+import asyncio
+import base64
+import contextlib
+import json
+import threading
+import numpy as np
+import pytest
+from werkzeug.serving import make_server
+from app import app
+from app.carga import PoolConexoes, executar_carga, servidor_local
+from app import server
+from app.server import sessoes, simulacao
+from app.simulacao import GerenciadorSessoes, Simulacao
+from entidades.Ambiente import decodificar_rle
+
+def test_registrar_mover_status():
+    cliente = app.test_client()
+    agente_id = cliente.post('/registrar', json={}).get_json()['id']
+    resultado = cliente.post('/movimento', json={'id': agente_id, 'x': 1, 'y': 1}).get_json()
+    assert resultado['posicao'] == [1, 1]
+    assert cliente.get(f'/status/{agente_id}').get_json()['posicao'] == [1, 1]
+    assert cliente.post('/movimento', json={'x': 1, 'y': 1}).status_code == 400
+    for corpo in ({'x': '1', 'y': 1}, {'x': 1, 'y': True}, {'x': 1}, {'x': 1.5, 'y': 1}):
+        assert cliente.post('/movimento', json={'id': agente_id, **corpo}).status_code == 400
+    assert cliente.post('/movimento', data='x').status_code == 400
+    assert cliente.get(f'/status/{agente_id}').get_json()['posicao'] == [1, 1]
+
+def test_registrar_valida_posicao():
+    cliente = app.test_client()
+    sessao_id = cliente.post('/sessoes', json={'tamanho': 5, 'num_agentes': 0}).get_json()['id']
+    for corpo in ({'x': 'a', 'y': None}, {'x': 1, 'y': False}, {'x': 50, 'y': -3}, {'x': 5, 'y': 0}):
+        resposta = cliente.post(f'/sessoes/{sessao_id}/registrar', json=corpo)
+        assert resposta.status_code == 400 and 'erro' in resposta.get_json()
+    assert len(sessoes.obter(sessao_id).agentes) == 0
+    assert cliente.post(f'/sessoes/{sessao_id}/registrar', json={'x': 4, 'y': 4}).status_code == 200
+    assert cliente.post(f'/sessoes/{sessao_id}/passo', json={'turnos': 2, 'esperar': True}).status_code == 200
+    cliente.delete(f'/sessoes/{sessao_id}')
+
+def test_delta_so_com_alteracoes():
+    completo = simulacao.delta(0)
+    assert len(completo['celulas']) == simulacao.ambiente.tamanho ** 2
+
+    versao = simulacao.versao
+    agente_id, _ = simulacao.registrar_agente()
+    simulacao.mover_agente(agente_id, 2, 3)
+    simulacao.mover_agente(agente_id, 2, 3)
+    delta = simulacao.delta(versao)
+    assert [c[:2] for c in delta['celulas']] in ([], [[2, 3]])
+    assert [a['id'] for a in delta['agentes']] == [agente_id]
+    assert simulacao.delta(delta['versao']) == {**delta, 'celulas': [], 'agentes': []}
+
+def test_stream_envia_estado_e_deltas():
+    resposta = app.test_client().get('/stream?versao=0')
+    eventos = iter(resposta.response)
+    dados = json.loads(next(eventos).decode().split('data: ', 1)[1])
+    assert len(dados['celulas']) == simulacao.ambiente.tamanho ** 2
+
+    simulacao.registrar_agente()
+    delta = json.loads(next(eventos).decode().split('data: ', 1)[1])
+    assert delta['versao'] > dados['versao'] and len(delta['agentes']) == 1
+    resposta.close()
+
+def test_stream_reconexao_com_versao_futura():
+    # Last-Event-ID de antes de reiniciar o servidor: recebe logo o estado completo
+    resposta = app.test_client().get('/stream', headers={'Last-Event-ID': str(simulacao.versao + 10**6)})
+    dados = json.loads(next(iter(resposta.response)).decode().split('data: ', 1)[1])
+    assert len(dados['celulas']) == simulacao.ambiente.tamanho ** 2
+    assert dados['versao'] == simulacao.versao
+    resposta.close()
+
+def test_stream_limita_intervalo(monkeypatch):
+    from app import routes
+    pausas = []
+    monkeypatch.setattr(routes.time, 'sleep', pausas.append)
+    for pedido, esperado in (('1e9', routes.INTERVALO_MAXIMO), ('inf', routes.INTERVALO_MAXIMO),
+                             ('nan', routes.INTERVALO_MINIMO), ('0', routes.INTERVALO_MINIMO), ('1', 1)):
+        resposta = app.test_client().get(f'/stream?versao=0&intervalo={pedido}')
+        eventos = iter(resposta.response)
+        next(eventos)
+        simulacao.registrar_agente()
+        next(eventos)
+        resposta.close()
+        assert pausas.pop() == esperado
+
+def test_actualizar_versionado_com_etag():
+    cliente = app.test_client()
+    completo = cliente.get('/actualizar')
+    versao = completo.get_json()['versao']
+    assert completo.get_json()['completo'] and completo.headers['ETag'] == f'"{versao}"'
+
+    assert cliente.get(f'/actualizar?versao={versao}').status_code == 304
+    assert cliente.get('/actualizar', headers={'If-None-Match': f'"{versao}"'}).status_code == 304
+
+    agente_id, _ = simulacao.registrar_agente()
+    delta = cliente.get(f'/actualizar?versao={versao}').get_json()
+    assert not delta['completo'] and [a['id'] for a in delta['agentes']] == [agente_id]
+
+def test_actualizar_formatos_compactos():
+    cliente = app.test_client()
+    esperado = simulacao.ambiente.matriz_codigos().ravel()
+    dados = cliente.get('/actualizar?formato=bytes').get_json()
+    assert (np.frombuffer(base64.b64decode(dados['ambiente']), dtype=np.uint8) == esperado).all()
+    dados = cliente.get('/actualizar?formato=rle').get_json()
+    assert (decodificar_rle(dados['ambiente']) == esperado).all()
+    assert cliente.get('/actualizar?formato=xml').status_code == 400
+
+def test_sessoes_independentes():
+    cliente = app.test_client()
+    resposta = cliente.post('/sessoes', json={'tamanho': 8, 'perc_bombas': 0, 'num_agentes': 2})
+    assert resposta.status_code == 201
+    sessao_id = resposta.get_json()['id']
+    assert sessao_id in cliente.get('/sessoes').get_json()['sessoes']
+
+    resumo = cliente.post(f'/sessoes/{sessao_id}/passo', json={'turnos': 5, 'esperar': True}).get_json()
+    assert resumo['turnos'] == 5 and resumo['turnos_pendentes'] == 0
+    estado = cliente.get(f'/sessoes/{sessao_id}/actualizar').get_json()
+    assert estado['tamanho'] == 8 and len(estado['agentes']) == 2
+    assert simulacao.ambiente.tamanho == 10
+
+    assert cliente.delete(f'/sessoes/{sessao_id}').status_code == 200
+    assert cliente.get(f'/sessoes/{sessao_id}').status_code == 404
+    assert cliente.post('/sessoes', json={'tamanho': 0}).status_code == 400
+
+def test_limite_de_agentes(monkeypatch):
+    cliente = app.test_client()
+    for corpo in ({'tamanho': 1000, 'num_agentes': 1000000}, {'tamanho': 1000, 'num_agentes': 50}):
+        resposta = cliente.post('/sessoes', json=corpo)
+        assert resposta.status_code == 400 and 'erro' in resposta.get_json()
+
+    sessao_id = cliente.post('/sessoes', json={'tamanho': 5, 'num_agentes': 2}).get_json()['id']
+    monkeypatch.setattr(Simulacao, 'MAX_AGENTES', 3)
+    assert cliente.post(f'/sessoes/{sessao_id}/registrar', json={}).status_code == 200
+    resposta = cliente.post(f'/sessoes/{sessao_id}/registrar', json={})
+    assert resposta.status_code == 400 and len(sessoes.obter(sessao_id).agentes) == 3
+    cliente.delete(f'/sessoes/{sessao_id}')
+
+def test_remover_sessoes_ociosas():
+    gerenciador = GerenciadorSessoes(max_workers=1, tempo_ocioso=0)
+    sessao_id = gerenciador.criar(tamanho=5)
+    assert gerenciador.remover_ociosas() == [sessao_id]
+    assert gerenciador.listar() == []
+
+    # Sem novas sessões, as consultas também removem as ociosas
+    gerenciador = GerenciadorSessoes(max_workers=1, tempo_ocioso=60)
+    ociosa, ativa = gerenciador.criar(tamanho=5), gerenciador.criar(tamanho=5)
+    gerenciador.sessoes[ociosa].ultimo_acesso -= 120
+    assert gerenciador.listar() == [ativa]
+
+def test_passo_valida_e_limita_parametros():
+    cliente = app.test_client()
+    for corpo in ({'turnos': -1}, {'turnos': 'muitos'}, {'turnos': True},
+                  {'timeout': -5}, {'timeout': 'já'}):
+        assert cliente.post('/passo', json=corpo).status_code == 400
+
+    sessao_id = cliente.post('/sessoes', json={'tamanho': 5}).get_json()['id']
+    resumo = cliente.post(f'/sessoes/{sessao_id}/passo', json={'turnos': 10**9}).get_json()
+    assert resumo['turnos_pendentes'] <= server.MAX_TURNOS_PASSO
+    cliente.delete(f'/sessoes/{sessao_id}')
+
+def test_sessoes_de_tamanhos_diferentes_partilham_modelo():
+    gerenciador = GerenciadorSessoes(max_workers=4)
+    grande = gerenciador.obter(gerenciador.criar(tamanho=40, perc_bombas=0, num_agentes=6, modelo='tree'))
+    pequena = gerenciador.obter(gerenciador.criar(tamanho=8, perc_bombas=0, num_agentes=6, modelo='tree'))
+    modelo = grande.agentes[1].modelo_ml
+    assert pequena.agentes[1].modelo_ml is modelo
+
+    for sessao in (grande, pequena):
+        gerenciador.agendar_turnos(sessao, 30)
+    for _ in range(20):
+        modelo.invalidar_tabela()
+    assert gerenciador.aguardar_turnos(grande, 30) and gerenciador.aguardar_turnos(pequena, 30)
+    assert grande.turnos > 0 and pequena.turnos > 0
+    assert grande.erro is None and pequena.erro is None
+    assert all(a.x < 40 and a.y < 40 for a in grande.agentes.values())
+
+def test_erro_no_pool_fica_registado(monkeypatch):
+    cliente = app.test_client()
+    sessao_id = cliente.post('/sessoes', json={'tamanho': 5, 'num_agentes': 1}).get_json()['id']
+    sessao = sessoes.obter(sessao_id)
+
+    def falhar():
+        raise RuntimeError("turno inválido")
+    monkeypatch.setattr(sessao.grupo, 'executar_turno', falhar)
+
+    resposta = cliente.post(f'/sessoes/{sessao_id}/passo', json={'turnos': 3, 'esperar': True})
+    assert resposta.status_code == 500
+    assert "turno inválido" in resposta.get_json()['erro']
+    resumo = cliente.get(f'/sessoes/{sessao_id}').get_json()
+    assert resumo['erro'] == "RuntimeError: turno inválido" and resumo['turnos_pendentes'] == 0
+    assert cliente.post(f'/sessoes/{sessao_id}/passo', json={}).status_code == 500
+
+def test_movimentos_em_lote():
+    cliente = app.test_client()
+    sessao_id = cliente.post('/sessoes', json={'tamanho': 6, 'perc_bombas': 0}).get_json()['id']
+    a = cliente.post(f'/sessoes/{sessao_id}/registrar', json={}).get_json()['id']
+    b = cliente.post(f'/sessoes/{sessao_id}/registrar', json={'x': 5, 'y': 5}).get_json()['id']
+
+    resposta = cliente.post(f'/sessoes/{sessao_id}/movimentos', json={'movimentos': [
+        {'id': a, 'x': 0, 'y': 1}, {'id': b, 'x': 5, 'y': 4}, {'id': a, 'x': 0, 'y': 1}
+    ]}).get_json()
+    assert [r['posicao'] for r in resposta['resultados']] == [[0, 1], [5, 4], [0, 1]]
+    assert resposta['resultados'][2]['celula'] in ('E', 'F')
+
+    plano = cliente.post(f'/sessoes/{sessao_id}/movimentos',
+                         json={'id': b, 'plano': [[4, 4], [3, 3]]}).get_json()
+    assert [r['posicao'] for r in plano['resultados']] == [[4, 4], [3, 3]]
+
+    # Lote com um agente inexistente não aplica nenhum movimento
+    versao = plano['versao']
+    resposta = cliente.post(f'/sessoes/{sessao_id}/movimentos', json={'movimentos': [
+        {'id': a, 'x': 2, 'y': 2}, {'id': 99, 'x': 0, 'y': 0}
+    ]})
+    assert resposta.status_code == 404
+    assert cliente.get(f'/sessoes/{sessao_id}').get_json()['versao'] == versao
+    assert cliente.post(f'/sessoes/{sessao_id}/movimentos', json={'id': a}).status_code == 400
+
+def test_carga_mede_todos_endpoints():
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        resultado = asyncio.run(executar_carga(f"http://127.0.0.1:{servidor.server_port}",
+                                               clientes=4, conexoes=2, duracao=0.5, tamanho=8))
+    finally:
+        servidor.shutdown()
+    linhas = {linha['endpoint']: linha for linha in resultado['linhas']}
+    assert set(linhas) == {'POST /registrar', 'POST /movimento', 'GET /status/<id>',
+                           'GET /actualizar', 'TOTAL'}
+    assert linhas['TOTAL']['erros'] == 0
+    assert linhas['TOTAL']['p50_ms'] <= linhas['TOTAL']['p99_ms']
+    assert resultado['pedidos'] >= linhas['TOTAL']['pedidos'] and 0 <= resultado['reaproveitamento'] < 1
+
+def test_carga_reaproveita_conexoes_no_servidor_local():
+    with servidor_local() as url:
+        resultado = asyncio.run(executar_carga(url, clientes=4, conexoes=2, duracao=0.5, tamanho=8))
+    total = next(linha for linha in resultado['linhas'] if linha['endpoint'] == 'TOTAL')
+    assert total['erros'] == 0
+    assert resultado['reaproveitamento'] > 0.5
+
+def test_carga_falha_se_sessao_nao_for_criada(monkeypatch):
+    def cheio(**parametros):
+        raise RuntimeError("limite de sessões atingido")
+    monkeypatch.setattr(sessoes, 'criar', cheio)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(RuntimeError, match="HTTP 503.*limite de sessões"):
+            asyncio.run(executar_carga(f"http://127.0.0.1:{servidor.server_port}",
+                                       clientes=1, conexoes=1, duracao=0.1))
+    finally:
+        servidor.shutdown()
+
+def test_pool_le_respostas_chunked_e_reaproveita_conexao():
+    async def responder(leitor, escritor):
+        with contextlib.suppress(asyncio.IncompleteReadError, ConnectionError):
+            while True:
+                await leitor.readuntil(b'\r\n\r\n')
+                escritor.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                               b'4\r\n{"a"\r\n3;ext=1\r\n: 1\r\n1\r\n}\r\n0\r\nX-Fim: 1\r\n\r\n')
+                await escritor.drain()
+
+    async def cenario():
+        servidor = await asyncio.start_server(responder, '127.0.0.1', 0)
+        pool = PoolConexoes('127.0.0.1', servidor.sockets[0].getsockname()[1], 1)
+        try:
+            respostas = [await pool.pedido('GET', '/') for _ in range(2)]
+        finally:
+            pool.fechar()
+            servidor.close()
+        return pool, respostas
+
+    pool, respostas = asyncio.run(cenario())
+    assert [r.json() for r in respostas] == [{'a': 1}, {'a': 1}]
+    assert pool.abertas == 1 and pool.pedidos == 2 and pool.taxa_reaproveitamento() == 0.5